@@ -130,6 +130,7 @@ def main():
     total = len(rows)
     found = 0
     not_found = 0
+    touched_categories = set()
 
     print(f"Persons to process: {total}{' (dry run)' if args.dry_run else ''}")
     print()
@@ -153,6 +154,7 @@ def main():
                 (url, source, pid),
             )
             conn.commit()
+            touched_categories.add(category)
 
         if url:
             found += 1
@@ -162,6 +164,11 @@ def main():
         # Polite rate limit — Wikipedia is fine at 2 req/s
         time.sleep(0.5)
 
+    # Newly imaged persons need a percentile and band before sessions can pick them
+    for cat in sorted(touched_categories):
+        cur.execute("SELECT ofta_prod.ofta_refresh_popularity_pct(%s)", (cat,))
+        conn.commit()
+
     print()
     print(f"Done. Found: {found}/{total}  |  Not found: {not_found}/{total}")
 
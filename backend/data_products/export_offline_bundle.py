@@ -20,6 +20,7 @@ load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+from ofta_core.utils.question_format import as_days
 from ofta_core.utils.util_db import OftaDBConnector
 
 DEFAULT_OUTPUT = os.path.join(
@@ -27,21 +28,31 @@ DEFAULT_OUTPUT = os.path.join(
 )
 
 
+def _hints(value) -> list:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            value = []
+    return value or []
+
+
 def main(output_path: str):
     db = OftaDBConnector()
 
     print("Fetching quizzable persons...")
+    # pop_pct is persisted by ofta_refresh_popularity_pct()
     persons_df = db.select_df("""
-        SELECT DISTINCT c.id, c.full_name, c.date_of_birth, c.star_sign,
-               c.primary_category, c.image_url, c.hints_easy,
-               PERCENT_RANK() OVER (
-                   PARTITION BY c.primary_category ORDER BY c.popularity_score
-               ) AS pop_pct
-        FROM ofta_prod.ofta_question_template qt
-        JOIN ofta_prod.ofta_person c
-          ON qt.person_id = c.id OR qt.person_id_a = c.id OR qt.person_id_b = c.id
-        WHERE qt.is_active = TRUE
-          AND c.image_url IS NOT NULL AND c.image_url != ''
+        SELECT c.id, c.full_name, c.date_of_birth, c.star_sign,
+               c.primary_category, c.image_url, c.hints_easy, c.pop_pct
+        FROM ofta_prod.ofta_person c
+        WHERE c.image_url IS NOT NULL AND c.image_url != ''
+          AND c.pop_pct IS NOT NULL
+          AND EXISTS (
+              SELECT 1 FROM ofta_prod.ofta_question_template qt
+              WHERE qt.is_active = TRUE
+                AND c.id IN (qt.person_id, qt.person_id_a, qt.person_id_b)
+          )
     """)
     print(f"  {len(persons_df)} persons")
 
@@ -68,48 +79,43 @@ def main(output_path: str):
     """)
     print(f"  {len(pairs_df)} WHO_OLDER pair templates")
 
-    def serialize_date(v):
-        if hasattr(v, 'isoformat'):
-            return v.isoformat()
-        return str(v) if v is not None else None
-
-    persons = []
-    for _, row in persons_df.iterrows():
-        hints = row['hints_easy']
-        if isinstance(hints, str):
-            import ast
-            try:
-                hints = json.loads(hints)
-            except Exception:
-                hints = []
-        persons.append({
-            "id":               str(row['id']),
-            "full_name":        row['full_name'],
-            "date_of_birth":    serialize_date(row['date_of_birth']),
-            "star_sign":        row['star_sign'],
-            "primary_category": row['primary_category'],
-            "image_url":        row['image_url'],
-            "hints_easy":       hints or [],
-            "pop_pct":          round(float(row['pop_pct']), 4),
-        })
+    # Column-wise, with the same date handling as the session question formatter
+    dobs = as_days(persons_df['date_of_birth'].tolist()).astype(str).tolist()
+    pop_pct = persons_df['pop_pct'].astype(float).round(4).tolist()
+    persons = [
+        {
+            "id":               str(pid),
+            "full_name":        name,
+            "date_of_birth":    None if dob == "NaT" else dob,
+            "star_sign":        sign,
+            "primary_category": category,
+            "image_url":        image_url,
+            "hints_easy":       _hints(hints),
+            "pop_pct":          pct,
+        }
+        for pid, name, dob, sign, category, image_url, hints, pct in zip(
+            persons_df['id'], persons_df['full_name'], dobs, persons_df['star_sign'],
+            persons_df['primary_category'], persons_df['image_url'], persons_df['hints_easy'], pop_pct,
+        )
+    ]
 
     single_templates = [
         {
-            "id":        str(row['id']),
-            "mode":      row['mode'],
-            "person_id": str(row['person_id']),
+            "id":        str(tid),
+            "mode":      mode,
+            "person_id": str(pid),
         }
-        for _, row in single_df.iterrows()
+        for tid, mode, pid in zip(single_df['id'], single_df['mode'], single_df['person_id'])
     ]
 
     pair_templates = [
         {
-            "id":          str(row['id']),
+            "id":          str(tid),
             "mode":        "WHO_OLDER",
-            "person_id_a": str(row['person_id_a']),
-            "person_id_b": str(row['person_id_b']),
+            "person_id_a": str(pid_a),
+            "person_id_b": str(pid_b),
         }
-        for _, row in pairs_df.iterrows()
+        for tid, pid_a, pid_b in zip(pairs_df['id'], pairs_df['person_id_a'], pairs_df['person_id_b'])
     ]
 
     bundle = {
@@ -0,0 +1,66 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_build_daily_pack(p_pack_date DATE)
+RETURNS BOOLEAN AS $$
+DECLARE
+    v_ids       UUID[];
+    v_questions JSONB;
+BEGIN
+    IF EXISTS (SELECT 1 FROM ofta_prod.ofta_daily_pack WHERE pack_date = p_pack_date) THEN
+        RETURN FALSE;
+    END IF;
+
+    -- The one daily selection rule, shared by /v1/packs/daily and DAILY_CHALLENGE
+    -- sessions: active DAILY_CHALLENGE templates whose person has an image,
+    -- easy band first, then a date-seeded order, so a rebuild picks the same set
+    WITH picked AS (
+        SELECT qt.id, qt.mode, qt.difficulty, qt.person_id, qt.person_id_a, qt.person_id_b,
+               ROW_NUMBER() OVER (
+                   ORDER BY (pe.difficulty_band IS DISTINCT FROM 'easy'),
+                            md5(qt.id::text || to_char(p_pack_date, 'YYYY-MM-DD'))
+               ) AS pos
+        FROM ofta_prod.ofta_question_template qt
+        JOIN ofta_prod.ofta_person pe ON qt.person_id = pe.id
+        WHERE qt.mode = 'DAILY_CHALLENGE' AND qt.is_active = TRUE
+          AND pe.image_url IS NOT NULL AND pe.image_url != ''
+        ORDER BY pos
+        LIMIT 10
+    )
+    SELECT array_agg(p.id ORDER BY p.pos),
+           jsonb_agg(jsonb_build_object(
+               'id',         p.id,
+               'mode',       p.mode,
+               'difficulty', p.difficulty,
+               'person',     CASE WHEN p.person_id IS NOT NULL THEN jsonb_build_object(
+                                 'id', c.id, 'full_name', c.full_name, 'primary_category', c.primary_category,
+                                 'nationality', c.nationality, 'hints_easy', c.hints_easy) END,
+               'person_a',   CASE WHEN p.person_id_a IS NOT NULL THEN jsonb_build_object(
+                                 'id', ca.id, 'full_name', ca.full_name, 'primary_category', ca.primary_category,
+                                 'nationality', ca.nationality, 'hints_easy', ca.hints_easy) END,
+               'person_b',   CASE WHEN p.person_id_a IS NOT NULL THEN jsonb_build_object(
+                                 'id', cb.id, 'full_name', cb.full_name, 'primary_category', cb.primary_category,
+                                 'nationality', cb.nationality, 'hints_easy', cb.hints_easy) END
+           ) ORDER BY p.pos)
+    INTO v_ids, v_questions
+    FROM picked p
+    LEFT JOIN ofta_prod.ofta_person c ON p.person_id = c.id
+    LEFT JOIN ofta_prod.ofta_person ca ON p.person_id_a = ca.id
+    LEFT JOIN ofta_prod.ofta_person cb ON p.person_id_b = cb.id;
+
+    IF v_ids IS NULL THEN
+        RETURN FALSE;
+    END IF;
+
+    -- A concurrent builder may have won; the first pack written is final
+    INSERT INTO ofta_prod.ofta_daily_pack (
+        pack_date, template_ids, questions, pack_hash, question_count
+    )
+    VALUES (
+        p_pack_date, v_ids, v_questions, md5(v_questions::text), cardinality(v_ids)
+    )
+    ON CONFLICT (pack_date) DO NOTHING;
+
+    RETURN FOUND;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION ofta_prod.ofta_build_daily_pack(DATE)
+    IS 'Materializes the daily pack for a date into ofta_daily_pack (template ids plus the questions payload); a no-op when the date already has a pack, so packs never change once built';
@@ -0,0 +1,20 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_bump_question_pool_version()
+RETURNS BIGINT AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    -- ofta_question_sample is renumbered by the API workers' periodic
+    -- ofta_refresh_question_sample() call, once per version rather than
+    -- once per bump (bulk edits bump for every person)
+    INSERT INTO ofta_prod.ofta_app_config AS cfg (key, value, updated_at_tms)
+    VALUES ('question_pool_version', '1'::jsonb, NOW())
+    ON CONFLICT (key) DO UPDATE
+    SET value = to_jsonb(cfg.value::text::bigint + 1), updated_at_tms = NOW()
+    RETURNING value::text::bigint INTO new_version;
+
+    RETURN new_version;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION ofta_prod.ofta_bump_question_pool_version()
+    IS 'Increments question_pool_version so every API worker rebuilds its question index; call after templates or person bands change';
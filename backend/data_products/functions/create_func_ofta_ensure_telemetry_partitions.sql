@@ -0,0 +1,26 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_ensure_telemetry_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', p_from)::date;
+    part_name   TEXT;
+    created     INTEGER := 0;
+BEGIN
+    WHILE month_start <= p_to LOOP
+        part_name := 'ofta_telemetry_event_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass('ofta_prod.' || part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE ofta_prod.%I PARTITION OF ofta_prod.ofta_telemetry_event '
+                'FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, (month_start + INTERVAL '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION ofta_prod.ofta_ensure_telemetry_partitions(DATE, DATE)
+    IS 'Creates the missing monthly ofta_telemetry_event partitions covering [p_from, p_to]; returns how many it created. The telemetry writer calls it daily';
@@ -0,0 +1,147 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_finalize_session(p_session_id UUID, p_user_id UUID)
+RETURNS JSONB AS $$
+DECLARE
+    v_session       ofta_prod.ofta_game_session%ROWTYPE;
+    v_questions     INTEGER;
+    v_correct       INTEGER;
+    v_total_score   INTEGER;
+    v_accuracy      DOUBLE PRECISION;
+    v_prev_streak   INTEGER;
+    v_last_update   TIMESTAMP;
+    v_daily_streak  INTEGER;
+    v_lifetime      BIGINT;
+    v_achievements  JSONB := '[]'::jsonb;
+BEGIN
+    SELECT * INTO v_session
+    FROM ofta_prod.ofta_game_session
+    WHERE id = p_session_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'not_found');
+    END IF;
+    IF v_session.user_id <> p_user_id THEN
+        RETURN jsonb_build_object('status', 'forbidden');
+    END IF;
+
+    -- A repeated /end (retry, double tap) gets the totals of the first one
+    -- instead of adding the game to ofta_user_stats again. ended_at_tms is
+    -- not the marker: write-behind end_session sets it before draining.
+    IF v_session.finalized_at_tms IS NOT NULL THEN
+        SELECT lifetime_score INTO v_lifetime
+        FROM ofta_prod.ofta_user_stats
+        WHERE user_id = p_user_id;
+
+        RETURN jsonb_build_object(
+            'status',           'ok',
+            'total_score',      v_session.total_score,
+            'questions_count',  v_session.questions_count,
+            'correct_count',    v_session.correct_count,
+            'best_streak',      v_session.best_streak,
+            'accuracy',         CASE WHEN v_session.questions_count > 0
+                                     THEN v_session.correct_count::DOUBLE PRECISION / v_session.questions_count * 100
+                                     ELSE 0 END,
+            'lifetime_score',   COALESCE(v_lifetime, 0),
+            'new_achievements', '[]'::jsonb
+        );
+    END IF;
+
+    -- Session totals (best_streak is kept current by every attempt insert)
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE is_correct), COALESCE(SUM(score_awarded), 0)
+    INTO v_questions, v_correct, v_total_score
+    FROM ofta_prod.ofta_question_attempt
+    WHERE session_id = p_session_id;
+
+    v_accuracy := CASE WHEN v_questions > 0 THEN v_correct::DOUBLE PRECISION / v_questions * 100 ELSE 0 END;
+
+    UPDATE ofta_prod.ofta_game_session
+    SET ended_at_tms     = NOW(),
+        finalized_at_tms = NOW(),
+        total_score      = v_total_score,
+        questions_count  = v_questions,
+        correct_count    = v_correct
+    WHERE id = p_session_id;
+
+    -- Daily play streak: same day keeps it, the next day extends it
+    SELECT current_streak, updated_at_tms INTO v_prev_streak, v_last_update
+    FROM ofta_prod.ofta_user_stats
+    WHERE user_id = p_user_id
+    FOR UPDATE;
+
+    v_daily_streak := CASE
+                        WHEN v_last_update IS NULL THEN 1
+                        WHEN v_last_update::date = CURRENT_DATE THEN COALESCE(v_prev_streak, 0)
+                        WHEN v_last_update::date = CURRENT_DATE - 1 THEN COALESCE(v_prev_streak, 0) + 1
+                        ELSE 1
+                      END;
+
+    INSERT INTO ofta_prod.ofta_user_stats AS s (
+        user_id, lifetime_score, best_streak, current_streak,
+        games_played, total_correct, total_questions, accuracy_pct, updated_at_tms
+    )
+    VALUES (
+        p_user_id, v_total_score, v_session.best_streak, v_daily_streak,
+        1, v_correct, v_questions, v_accuracy, NOW()
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        lifetime_score  = s.lifetime_score + v_total_score,
+        best_streak     = GREATEST(s.best_streak, v_session.best_streak),
+        current_streak  = v_daily_streak,
+        games_played    = s.games_played + 1,
+        total_correct   = s.total_correct + v_correct,
+        total_questions = s.total_questions + v_questions,
+        accuracy_pct    = (s.total_correct + v_correct)::float
+                          / NULLIF(s.total_questions + v_questions, 0) * 100,
+        updated_at_tms  = NOW()
+    RETURNING lifetime_score INTO v_lifetime;
+
+    -- Daily challenge completion (guard prevents double-count on same-day replay)
+    IF v_session.mode = 'DAILY_CHALLENGE' THEN
+        UPDATE ofta_prod.ofta_user_stats
+        SET daily_challenges = COALESCE(daily_challenges, 0) + 1,
+            last_daily_date  = CURRENT_DATE
+        WHERE user_id = p_user_id
+          AND (last_daily_date IS NULL OR last_daily_date < CURRENT_DATE);
+    END IF;
+
+    -- Unlock achievements whose conditions are now met; a failure here must
+    -- not lose the game, so it only rolls back this block
+    BEGIN
+        WITH unlocked AS (
+            INSERT INTO ofta_prod.ofta_user_achievement (user_id, achievement_id)
+            SELECT p_user_id, a.id
+            FROM ofta_prod.ofta_achievement a
+            JOIN ofta_prod.ofta_user_stats s ON s.user_id = p_user_id
+            WHERE (a.condition_type = 'games_played' AND s.games_played >= a.condition_value)
+               OR (a.condition_type = 'best_streak' AND s.best_streak >= a.condition_value)
+               OR (a.condition_type = 'daily_accuracy' AND v_session.mode = 'DAILY_CHALLENGE'
+                   AND v_accuracy >= a.condition_value)
+            ON CONFLICT (user_id, achievement_id) DO NOTHING
+            RETURNING achievement_id
+        )
+        SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                   'id', a.id, 'title', a.title, 'description', a.description, 'icon', a.icon
+               )), '[]'::jsonb)
+        INTO v_achievements
+        FROM unlocked u
+        JOIN ofta_prod.ofta_achievement a ON a.id = u.achievement_id;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE WARNING 'Achievement unlock check failed for session %: %', p_session_id, SQLERRM;
+        v_achievements := '[]'::jsonb;
+    END;
+
+    RETURN jsonb_build_object(
+        'status',           'ok',
+        'total_score',      v_total_score,
+        'questions_count',  v_questions,
+        'correct_count',    v_correct,
+        'best_streak',      v_session.best_streak,
+        'accuracy',         v_accuracy,
+        'lifetime_score',   v_lifetime,
+        'new_achievements', v_achievements
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION ofta_prod.ofta_finalize_session(UUID, UUID)
+    IS 'Ends a game session in one transaction: session totals, user stats, daily streak and achievements; returns the end_session payload as jsonb. Idempotent: an already finalized session returns its stored totals';
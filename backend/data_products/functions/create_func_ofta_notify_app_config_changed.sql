@@ -0,0 +1,19 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_notify_app_config_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('ofta_app_config_changed', OLD.key);
+    ELSE
+        PERFORM pg_notify('ofta_app_config_changed', NEW.key);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ofta_trigger_app_config_changed ON ofta_prod.ofta_app_config;
+CREATE TRIGGER ofta_trigger_app_config_changed
+    AFTER INSERT OR UPDATE OR DELETE ON ofta_prod.ofta_app_config
+    FOR EACH ROW EXECUTE FUNCTION ofta_prod.ofta_notify_app_config_changed();
+
+COMMENT ON FUNCTION ofta_prod.ofta_notify_app_config_changed()
+    IS 'NOTIFY ofta_app_config_changed with the key on every ofta_app_config write, so API workers reload their in-memory config';
@@ -0,0 +1,52 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_refresh_popularity_pct(p_category VARCHAR DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    changed INTEGER;
+    dropped INTEGER;
+BEGIN
+    -- One band per person: ranked within its primary_category among every
+    -- imaged person, whatever modes it has templates in.
+    -- Band thresholds mirror sessions.DIFFICULTY_CONFIG
+    WITH ranked AS (
+        SELECT id,
+               PERCENT_RANK() OVER (
+                   PARTITION BY primary_category ORDER BY popularity_score
+               ) AS pct
+        FROM ofta_prod.ofta_person
+        WHERE image_url IS NOT NULL AND image_url != ''
+          AND (p_category IS NULL OR primary_category = p_category)
+    )
+    UPDATE ofta_prod.ofta_person p
+    SET pop_pct = r.pct,
+        difficulty_band = CASE
+                            WHEN r.pct >= 0.67 THEN 'easy'
+                            WHEN r.pct >= 0.34 THEN 'medium'
+                            ELSE 'hard'
+                          END
+    FROM ranked r
+    WHERE p.id = r.id
+      AND p.pop_pct IS DISTINCT FROM r.pct;
+
+    GET DIAGNOSTICS changed = ROW_COUNT;
+
+    -- Persons that lost their image drop out of the ranking
+    UPDATE ofta_prod.ofta_person
+    SET pop_pct = NULL, difficulty_band = NULL
+    WHERE pop_pct IS NOT NULL
+      AND (image_url IS NULL OR image_url = '')
+      AND (p_category IS NULL OR primary_category = p_category);
+
+    GET DIAGNOSTICS dropped = ROW_COUNT;
+
+    -- API workers rebuild their question index from the new bands; nothing
+    -- to rebuild when no percentile moved
+    IF changed > 0 OR dropped > 0 THEN
+        PERFORM ofta_prod.ofta_bump_question_pool_version();
+    END IF;
+
+    RETURN changed + dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION ofta_prod.ofta_refresh_popularity_pct(VARCHAR)
+    IS 'Recomputes the persisted popularity percentile and difficulty band for one category (or all when NULL); call after popularity_score changes. Returns the number of persons updated and bumps question_pool_version only when it is non-zero';
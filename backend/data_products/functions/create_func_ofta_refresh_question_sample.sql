@@ -0,0 +1,70 @@
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_refresh_question_sample()
+RETURNS INTEGER AS $$
+DECLARE
+    numbered    INTEGER;
+    v_version   JSONB;
+BEGIN
+    -- Every API worker calls this periodically; one renumbers per content
+    -- version, however many bumps that version took, and the rest return
+    IF NOT pg_try_advisory_xact_lock(hashtext('ofta_refresh_question_sample')) THEN
+        RETURN NULL;
+    END IF;
+
+    -- Read before the templates: a bump landing meanwhile leaves the
+    -- recorded version behind, so the next call numbers again
+    SELECT COALESCE(
+               (SELECT value FROM ofta_prod.ofta_app_config WHERE key = 'question_pool_version'),
+               '0'::jsonb)
+    INTO v_version;
+
+    IF v_version = (SELECT value FROM ofta_prod.ofta_app_config WHERE key = 'question_sample_version') THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM ofta_prod.ofta_question_sample;
+    DELETE FROM ofta_prod.ofta_question_sample_bucket;
+
+    -- Same eligibility as the API's in-memory question pool: active, imaged,
+    -- banded, and for WHO_OLDER both persons in the same band
+    WITH eligible AS (
+        SELECT qt.id, qt.mode, pa.difficulty_band AS band,
+               ARRAY(
+                   SELECT DISTINCT c FROM unnest(ARRAY[pa.primary_category, pb.primary_category]) AS c
+                   WHERE c IS NOT NULL ORDER BY c
+               )::TEXT[] AS categories
+        FROM ofta_prod.ofta_question_template qt
+        JOIN ofta_prod.ofta_person pa
+          ON pa.id = CASE WHEN qt.mode = 'WHO_OLDER' THEN qt.person_id_a ELSE qt.person_id END
+        LEFT JOIN ofta_prod.ofta_person pb
+          ON qt.mode = 'WHO_OLDER' AND pb.id = qt.person_id_b
+        WHERE qt.is_active = TRUE
+          AND pa.image_url IS NOT NULL AND pa.image_url != ''
+          AND pa.difficulty_band IS NOT NULL
+          AND (qt.mode != 'WHO_OLDER' OR (
+                pb.image_url IS NOT NULL AND pb.image_url != ''
+                AND pb.difficulty_band = pa.difficulty_band))
+    )
+    INSERT INTO ofta_prod.ofta_question_sample (mode, band, seq, categories, template_id)
+    SELECT mode, band,
+           (ROW_NUMBER() OVER (PARTITION BY mode, band ORDER BY categories, id) - 1)::INTEGER,
+           categories, id
+    FROM eligible;
+
+    GET DIAGNOSTICS numbered = ROW_COUNT;
+
+    INSERT INTO ofta_prod.ofta_question_sample_bucket (mode, band, categories, seq_from, seq_to)
+    SELECT mode, band, categories, MIN(seq), MAX(seq)
+    FROM ofta_prod.ofta_question_sample
+    GROUP BY mode, band, categories;
+
+    INSERT INTO ofta_prod.ofta_app_config (key, value, updated_at_tms)
+    VALUES ('question_sample_version', v_version, NOW())
+    ON CONFLICT (key) DO UPDATE
+    SET value = EXCLUDED.value, updated_at_tms = NOW();
+
+    RETURN numbered;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION ofta_prod.ofta_refresh_question_sample()
+    IS 'Renumbers ofta_question_sample from the active templates when question_pool_version has moved since the last numbering (recorded as question_sample_version); returns NULL when there was nothing to do. Called periodically by the API workers';
@@ -165,6 +165,10 @@ async def run(category: str, batch_size: int, concurrency: int, dry_run: bool):
         conn.commit()
         print(f"DB updated: {updated}  |  Not matched: {not_found}")
 
+        cur.execute("SELECT ofta_prod.ofta_refresh_popularity_pct(%s)", (cat,))
+        print(f"Popularity percentiles refreshed: {cur.fetchone()[0]} changed")
+        conn.commit()
+
         cur.execute("""
             SELECT
                 ROUND(MIN(popularity_score)::numeric, 1) as min,
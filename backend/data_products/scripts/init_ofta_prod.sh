@@ -23,15 +23,20 @@ TABLE_ORDER=(
     ofta_user_account
     ofta_celebrity
     ofta_question_template
+    ofta_question_sample
     ofta_daily_pack
     ofta_game_session
     ofta_question_attempt
     ofta_leaderboard_daily
     ofta_user_stats
+    ofta_user_seen_filter
     ofta_achievement
     ofta_user_achievement
+    ofta_telemetry_label
     ofta_telemetry_event
     ofta_app_config
+    ofta_session_state
+    ofta_cache_entry
 )
 for t in "${TABLE_ORDER[@]}"; do
     f="$ROOT/tables/$t/create_$t.sql"
@@ -45,10 +50,16 @@ for f in "$ROOT"/functions/create_*.sql; do
     psql -v ON_ERROR_STOP=1 -f "$f"
 done
 
+echo "Creating telemetry partitions..."
+psql -v ON_ERROR_STOP=1 -c "SELECT ofta_prod.ofta_ensure_telemetry_partitions(CURRENT_DATE, CURRENT_DATE + 60);"
+
 echo "Seeding reference data..."
 for f in "$ROOT"/seed/seed_*.sql; do
     echo "  $f"
     psql -f "$f"
 done
 
+echo "Ranking popularity percentiles..."
+psql -v ON_ERROR_STOP=1 -c "SELECT ofta_prod.ofta_refresh_popularity_pct();"
+
 echo "ofta_prod ready."
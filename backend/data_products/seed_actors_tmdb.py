@@ -228,6 +228,9 @@ def ingest(dry_run: bool = False, pages: int = 10):
 
     if not dry_run:
         conn.commit()
+        for cat in ("Actor", "Actress"):
+            cur.execute("SELECT ofta_prod.ofta_refresh_popularity_pct(%s)", (cat,))
+        conn.commit()
 
     print(f"\nPersons: {inserted} inserted, {skipped} skipped, {errors} errors")
 
@@ -301,6 +304,10 @@ def generate_templates(cur, conn, person_ids: list):
             pairs_inserted += 1
 
     conn.commit()
+
+    # Running API workers pick up the new templates
+    cur.execute("SELECT ofta_prod.ofta_bump_question_pool_version()")
+    conn.commit()
     print(f"  Templates: {qt_inserted} single-person, {pairs_inserted} WHO_OLDER pairs")
 
 
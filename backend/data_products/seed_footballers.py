@@ -104,6 +104,8 @@ def main(dry_run: bool = False):
 
     if not dry_run:
         conn.commit()
+        cur.execute("SELECT ofta_prod.ofta_refresh_popularity_pct('Footballer')")
+        conn.commit()
     cur.close()
     conn.close()
 
@@ -274,6 +274,8 @@ def ingest(dry_run: bool = False, pages: int = 15):
 
     if not dry_run:
         conn.commit()
+        cur.execute("SELECT ofta_prod.ofta_refresh_popularity_pct('Musician')")
+        conn.commit()
 
     print(f"\nMusicians: {inserted} inserted, {skipped} skipped, {errors} errors")
     with_img = sum(1 for _, img in inserted_ids if img)
@@ -333,6 +335,10 @@ def generate_templates(cur, conn, person_ids: list):
             pairs += 1
 
     conn.commit()
+
+    # Running API workers pick up the new templates
+    cur.execute("SELECT ofta_prod.ofta_bump_question_pool_version()")
+    conn.commit()
     print(f"  Templates: {qt} single-person, {pairs} WHO_OLDER pairs")
 
 
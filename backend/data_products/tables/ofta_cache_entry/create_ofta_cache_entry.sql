@@ -0,0 +1,10 @@
+CREATE UNLOGGED TABLE IF NOT EXISTS ofta_prod.ofta_cache_entry (
+    cache_key               TEXT            PRIMARY KEY,
+    value                   JSONB           NOT NULL,
+    expires_at_tms          TIMESTAMP       NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ofta_cache_entry_expires ON ofta_prod.ofta_cache_entry(expires_at_tms);
+CREATE INDEX IF NOT EXISTS idx_ofta_cache_entry_key_prefix ON ofta_prod.ofta_cache_entry(cache_key text_pattern_ops);
+
+COMMENT ON TABLE ofta_prod.ofta_cache_entry IS 'Read-cache entries (leaderboard pages, daily packs) shared by API workers when CACHE_BACKEND=postgres; invalidations go out on NOTIFY ofta_cache_invalidate; unlogged, safe to lose';
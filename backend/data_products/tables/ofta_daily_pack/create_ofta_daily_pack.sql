@@ -1,6 +1,9 @@
 CREATE TABLE IF NOT EXISTS ofta_prod.ofta_daily_pack (
     pack_date           DATE            PRIMARY KEY,
-    pack_json_url       TEXT            NOT NULL,
+    pack_json_url       TEXT,
+    -- Materialized by ofta_build_daily_pack(); immutable once written
+    template_ids        UUID[]          NOT NULL,
+    questions           JSONB           NOT NULL,
     pack_hash           VARCHAR(64)     NOT NULL,
     question_count      INTEGER         NOT NULL,
     created_at_tms      TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP
@@ -8,4 +11,4 @@ CREATE TABLE IF NOT EXISTS ofta_prod.ofta_daily_pack (
 
 CREATE INDEX IF NOT EXISTS idx_ofta_pack_date ON ofta_prod.ofta_daily_pack(pack_date DESC);
 
-COMMENT ON TABLE ofta_prod.ofta_daily_pack IS 'Daily challenge question bundles';
+COMMENT ON TABLE ofta_prod.ofta_daily_pack IS 'Daily challenge question bundles, built ahead of time by ofta_build_daily_pack()';
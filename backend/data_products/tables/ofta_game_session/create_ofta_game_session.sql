@@ -5,10 +5,12 @@ CREATE TABLE IF NOT EXISTS ofta_prod.ofta_game_session (
     pack_date           DATE,
     started_at_tms      TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP,
     ended_at_tms        TIMESTAMP,
+    finalized_at_tms    TIMESTAMP,
     total_score         INTEGER         NOT NULL DEFAULT 0,
     questions_count     INTEGER         NOT NULL DEFAULT 0,
     correct_count       INTEGER         NOT NULL DEFAULT 0,
     best_streak         INTEGER         NOT NULL DEFAULT 0,
+    current_streak      INTEGER         NOT NULL DEFAULT 0,
     device_os           VARCHAR(50),
     client_version      VARCHAR(50)
 );
@@ -7,7 +7,7 @@ CREATE TABLE IF NOT EXISTS ofta_prod.ofta_leaderboard_daily (
     PRIMARY KEY (pack_date, user_id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_ofta_lb_daily_score ON ofta_prod.ofta_leaderboard_daily(pack_date, score DESC);
+CREATE INDEX IF NOT EXISTS idx_ofta_lb_daily_keyset ON ofta_prod.ofta_leaderboard_daily(pack_date, score DESC, user_id DESC);
 CREATE INDEX IF NOT EXISTS idx_ofta_lb_daily_user  ON ofta_prod.ofta_leaderboard_daily(user_id);
 
 COMMENT ON TABLE ofta_prod.ofta_leaderboard_daily IS 'Daily-challenge leaderboard entries per user per day';
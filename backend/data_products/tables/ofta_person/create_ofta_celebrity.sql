@@ -8,6 +8,10 @@ CREATE TABLE IF NOT EXISTS ofta_prod.ofta_person (
     nationality         VARCHAR(100),
     gender              VARCHAR(50),
     popularity_score    NUMERIC(5,2)    NOT NULL DEFAULT 50.0,
+    -- PERCENT_RANK of popularity_score within primary_category (persons with an image);
+    -- maintained by ofta_refresh_popularity_pct(), never written directly
+    pop_pct             DOUBLE PRECISION,
+    difficulty_band     VARCHAR(10),
     image_url           TEXT,
     image_license       VARCHAR(100),
     -- Generic attribute pairs (desc = label, value = array of values)
@@ -39,5 +43,6 @@ CREATE INDEX IF NOT EXISTS idx_ofta_person_category   ON ofta_prod.ofta_person(p
 CREATE INDEX IF NOT EXISTS idx_ofta_person_active     ON ofta_prod.ofta_person(is_active);
 CREATE INDEX IF NOT EXISTS idx_ofta_person_popularity ON ofta_prod.ofta_person(popularity_score DESC);
 CREATE INDEX IF NOT EXISTS idx_ofta_person_name       ON ofta_prod.ofta_person(full_name);
+CREATE INDEX IF NOT EXISTS idx_ofta_person_pop_pct    ON ofta_prod.ofta_person(primary_category, pop_pct);
 
 COMMENT ON TABLE ofta_prod.ofta_person IS 'Celebrities used as question subjects across all OFTA game modes';
@@ -16,5 +16,6 @@ CREATE TABLE IF NOT EXISTS ofta_prod.ofta_question_attempt (
 
 CREATE INDEX IF NOT EXISTS idx_ofta_attempt_session  ON ofta_prod.ofta_question_attempt(session_id);
 CREATE INDEX IF NOT EXISTS idx_ofta_attempt_question ON ofta_prod.ofta_question_attempt(question_template_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ofta_attempt_session_index ON ofta_prod.ofta_question_attempt(session_id, question_index);
 
 COMMENT ON TABLE ofta_prod.ofta_question_attempt IS 'Per-question attempt records within a game session';
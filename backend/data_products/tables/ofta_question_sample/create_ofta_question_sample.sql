@@ -0,0 +1,24 @@
+-- Filled by ofta_refresh_question_sample(). Within one (mode, band) the
+-- eligible templates are numbered 0..n-1 with no gaps, grouped by category
+-- set, so a uniform sample is k random ordinals looked up by primary key.
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_question_sample (
+    mode                VARCHAR(50)     NOT NULL,
+    band                VARCHAR(10)     NOT NULL,
+    seq                 INTEGER         NOT NULL,
+    categories          TEXT[]          NOT NULL,
+    template_id         UUID            NOT NULL,
+    PRIMARY KEY (mode, band, seq)
+);
+
+-- The seq range of each category set, read to draw ordinals under a category filter
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_question_sample_bucket (
+    mode                VARCHAR(50)     NOT NULL,
+    band                VARCHAR(10)     NOT NULL,
+    categories          TEXT[]          NOT NULL,
+    seq_from            INTEGER         NOT NULL,
+    seq_to              INTEGER         NOT NULL,
+    PRIMARY KEY (mode, band, categories)
+);
+
+COMMENT ON TABLE ofta_prod.ofta_question_sample IS 'Dense per-(mode, band) numbering of sessionable templates for indexed random sampling; rebuilt with every question pool version';
+COMMENT ON TABLE ofta_prod.ofta_question_sample_bucket IS 'seq range per category set in ofta_question_sample';
@@ -0,0 +1,9 @@
+CREATE UNLOGGED TABLE IF NOT EXISTS ofta_prod.ofta_session_state (
+    session_id              UUID            PRIMARY KEY,
+    state                   JSONB           NOT NULL,
+    expires_at_tms          TIMESTAMP       NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ofta_session_state_expires ON ofta_prod.ofta_session_state(expires_at_tms);
+
+COMMENT ON TABLE ofta_prod.ofta_session_state IS 'Live game-session state (issued questions, answer keys, progress) shared by API workers when SESSION_STATE_BACKEND=postgres; unlogged, safe to lose';
@@ -1,16 +1,36 @@
+-- Monthly partitions are created by ofta_ensure_telemetry_partitions(); rows
+-- outside every partition land in the default one.
 CREATE TABLE IF NOT EXISTS ofta_prod.ofta_telemetry_event (
-    id                  UUID            PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id             UUID,
-    event_type          VARCHAR(100)    NOT NULL,
-    event_data          JSONB,
-    client_ts_tms       TIMESTAMP,
     server_ts_tms       TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    device_os           VARCHAR(50),
-    app_version         VARCHAR(50)
-);
+    client_ts_tms       TIMESTAMP,
+    user_id             UUID,
+    event_type_id       INTEGER         NOT NULL,
+    device_os_id        INTEGER,
+    app_version_id      INTEGER,
+    event_data          JSONB
+) PARTITION BY RANGE (server_ts_tms);
+
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_telemetry_event_default
+    PARTITION OF ofta_prod.ofta_telemetry_event DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_ofta_telemetry_time ON ofta_prod.ofta_telemetry_event USING BRIN (server_ts_tms);
+CREATE INDEX IF NOT EXISTS idx_ofta_telemetry_type ON ofta_prod.ofta_telemetry_event(event_type_id, server_ts_tms);
+CREATE INDEX IF NOT EXISTS idx_ofta_telemetry_user ON ofta_prod.ofta_telemetry_event(user_id) WHERE user_id IS NOT NULL;
+
+COMMENT ON TABLE ofta_prod.ofta_telemetry_event IS 'Client-emitted analytics/telemetry events, partitioned by month; strings interned in ofta_telemetry_label (read through ofta_telemetry_event_v)';
 
-CREATE INDEX IF NOT EXISTS idx_ofta_telemetry_type ON ofta_prod.ofta_telemetry_event(event_type);
-CREATE INDEX IF NOT EXISTS idx_ofta_telemetry_time ON ofta_prod.ofta_telemetry_event(server_ts_tms DESC);
-CREATE INDEX IF NOT EXISTS idx_ofta_telemetry_user ON ofta_prod.ofta_telemetry_event(user_id);
+CREATE OR REPLACE VIEW ofta_prod.ofta_telemetry_event_v AS
+SELECT
+    e.server_ts_tms,
+    e.client_ts_tms,
+    e.user_id,
+    et.value AS event_type,
+    os.value AS device_os,
+    av.value AS app_version,
+    e.event_data
+FROM ofta_prod.ofta_telemetry_event e
+JOIN ofta_prod.ofta_telemetry_label et ON et.id = e.event_type_id
+LEFT JOIN ofta_prod.ofta_telemetry_label os ON os.id = e.device_os_id
+LEFT JOIN ofta_prod.ofta_telemetry_label av ON av.id = e.app_version_id;
 
-COMMENT ON TABLE ofta_prod.ofta_telemetry_event IS 'Client-emitted analytics/telemetry events';
+COMMENT ON VIEW ofta_prod.ofta_telemetry_event_v IS 'ofta_telemetry_event with its interned strings resolved';
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_telemetry_label (
+    id                  INTEGER         GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    kind                VARCHAR(20)     NOT NULL,
+    value               VARCHAR(100)    NOT NULL,
+    UNIQUE (kind, value)
+);
+
+COMMENT ON TABLE ofta_prod.ofta_telemetry_label IS 'Interned telemetry strings (kind = event_type, device_os or app_version); ofta_telemetry_event stores their ids';
@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_user_seen_filter (
+    user_id             UUID            PRIMARY KEY REFERENCES ofta_prod.ofta_user_account(id),
+    bits                INTEGER         NOT NULL,
+    current_count       INTEGER         NOT NULL DEFAULT 0,
+    current_bits        BYTEA           NOT NULL,
+    previous_bits       BYTEA           NOT NULL,
+    updated_at_tms      TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE ofta_prod.ofta_user_seen_filter IS 'Rolling two-generation Bloom filter of recently issued template ids per user; written lazily by the API, advisory';
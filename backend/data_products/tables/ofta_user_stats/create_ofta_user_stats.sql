@@ -13,7 +13,8 @@ CREATE TABLE IF NOT EXISTS ofta_prod.ofta_user_stats (
     updated_at_tms      TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX IF NOT EXISTS idx_ofta_stats_lifetime ON ofta_prod.ofta_user_stats(lifetime_score DESC);
+CREATE INDEX IF NOT EXISTS idx_ofta_stats_lifetime ON ofta_prod.ofta_user_stats(lifetime_score DESC, user_id DESC);
 CREATE INDEX IF NOT EXISTS idx_ofta_stats_streak   ON ofta_prod.ofta_user_stats(best_streak DESC);
+CREATE INDEX IF NOT EXISTS idx_ofta_stats_updated  ON ofta_prod.ofta_user_stats(updated_at_tms);
 
 COMMENT ON TABLE ofta_prod.ofta_user_stats IS 'Aggregated lifetime stats per user';
@@ -72,6 +72,14 @@ limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# ───────────────────────────
+#  Kill switches (maintenance_mode / feature_flags)
+# ───────────────────────────
+# Added before CORS so its 503s still carry CORS headers
+from ofta_core.utils.feature_gate import FeatureGateMiddleware
+
+app.add_middleware(FeatureGateMiddleware)
+
 # ───────────────────────────
 #  CORS (configurable via env)
 # ───────────────────────────
@@ -137,13 +145,52 @@ app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 #  Startup / shutdown
 # ───────────────────────────
 @app.on_event("startup")
-def on_startup() -> None:
+async def on_startup() -> None:
     logger.info("OFTA API starting up...")
+    from ofta_core.utils.util_async_db import get_async_db
+    from ofta_core.utils.question_pool import start_question_pool
+    from ofta_core.utils.attempt_writer import start_attempt_writer
+    from ofta_core.utils.rank_index import start_rank_index
+    from ofta_core.utils.shared_cache import start_cache_backend
+    from ofta_core.utils.pack_builder import start_pack_builder
+    from ofta_core.utils.telemetry_writer import start_telemetry_writer
+    from ofta_core.utils.app_config import start_app_config
+    from ofta_core.utils.seen_filter import start_seen_store
+    try:
+        await get_async_db().connect()
+    except Exception as e:
+        logger.warning(f"Async database pool not ready, will retry on first request: {e}")
+    await start_question_pool()
+    await start_rank_index()
+    await start_attempt_writer()
+    await start_cache_backend()
+    await start_pack_builder()
+    await start_telemetry_writer()
+    await start_app_config()
+    await start_seen_store()
 
 
 @app.on_event("shutdown")
-def on_shutdown() -> None:
+async def on_shutdown() -> None:
     logger.info("OFTA API shutting down...")
+    from ofta_core.utils.util_async_db import close_async_db
+    from ofta_core.utils.question_pool import stop_question_pool
+    from ofta_core.utils.attempt_writer import stop_attempt_writer
+    from ofta_core.utils.rank_index import stop_rank_index
+    from ofta_core.utils.shared_cache import stop_cache_backend
+    from ofta_core.utils.pack_builder import stop_pack_builder
+    from ofta_core.utils.telemetry_writer import stop_telemetry_writer
+    from ofta_core.utils.app_config import stop_app_config
+    from ofta_core.utils.seen_filter import stop_seen_store
+    await stop_seen_store()
+    await stop_app_config()
+    await stop_telemetry_writer()
+    await stop_pack_builder()
+    await stop_cache_backend()
+    await stop_attempt_writer()
+    await stop_rank_index()
+    await stop_question_pool()
+    await close_async_db()
 
 
 # ───────────────────────────
@@ -162,6 +209,24 @@ def root():
 def health():
     """Deep health check with database connectivity."""
     from ofta_core.utils.util_db import get_db_connector
+    from ofta_core.utils.util_async_db import get_async_db
+    from ofta_core.utils.question_pool import get_question_pool
+    from ofta_core.utils.user_identity import user_id_cache
+    from ofta_core.utils.firebase_auth import token_cache
+    from ofta_core.utils.attempt_writer import get_attempt_writer
+    from ofta_core.utils.session_state import get_session_store
+    from ofta_core.utils.rank_index import get_rank_index
+    from ofta_core.api.leaderboards import leaderboard_cache
+    from ofta_core.utils.pack_builder import daily_pack_cache
+    from ofta_core.utils.app_config import get_app_config
+    from ofta_core.utils.feature_gate import current_gate
+    from ofta_core.utils.shared_cache import get_cache_backend
+    from ofta_core.utils.response_cache import response_cache
+    from ofta_core.utils.telemetry_writer import get_telemetry_writer
+    from ofta_core.utils.seen_filter import get_seen_store
+    writer = get_attempt_writer()
+    telemetry = get_telemetry_writer()
+    seen = get_seen_store()
     try:
         db = get_db_connector()
         pool_status = db.get_pool_status()
@@ -176,7 +241,31 @@ def health():
         "database": {
             "connected": db_healthy,
             "pool": pool_status,
+            "async_pool": get_async_db().get_pool_status(),
+        },
+        "question_pool": {
+            "ready": get_question_pool().ready,
+            "version": get_question_pool().version,
+            "templates": get_question_pool().template_count(),
+        },
+        "rank_index": {
+            "ready": get_rank_index().ready,
+            "players": len(get_rank_index()),
+        },
+        "caches": {
+            "user_id": user_id_cache.stats(),
+            "firebase_token": token_cache.stats(),
+            "session_state": get_session_store().stats(),
+            "seen_filter": seen.stats() if seen is not None else {"running": False},
+            "leaderboards": leaderboard_cache.stats(),
+            "daily_packs": daily_pack_cache.stats(),
+            "config": get_app_config().stats(),
+            "responses": response_cache.stats(),
+            "shared": get_cache_backend().stats(),
         },
+        "feature_gate": current_gate().stats(),
+        "attempt_writer": writer.stats() if writer is not None else {"mode": "sync"},
+        "telemetry_writer": telemetry.stats() if telemetry is not None else {"running": False},
         "version": "0.0.1",
         "environment": os.getenv("ENVIRONMENT", "development"),
     }
@@ -0,0 +1,21 @@
+-- Migration 002: persisted popularity percentile on ofta_person
+-- Adds pop_pct (PERCENT_RANK within primary_category) and difficulty_band so
+-- session selection is an indexed range filter instead of a window function.
+-- Apply data_products/functions/create_func_ofta_refresh_popularity_pct.sql
+-- before running this migration.
+
+BEGIN;
+
+ALTER TABLE ofta_prod.ofta_person
+    ADD COLUMN IF NOT EXISTS pop_pct DOUBLE PRECISION;
+
+ALTER TABLE ofta_prod.ofta_person
+    ADD COLUMN IF NOT EXISTS difficulty_band VARCHAR(10);
+
+CREATE INDEX IF NOT EXISTS idx_ofta_person_pop_pct
+    ON ofta_prod.ofta_person(primary_category, pop_pct);
+
+-- Backfill every category
+SELECT ofta_prod.ofta_refresh_popularity_pct();
+
+COMMIT;
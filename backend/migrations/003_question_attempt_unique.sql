@@ -0,0 +1,25 @@
+-- Migration 003: one attempt per (session, question_index)
+-- The write-behind answer writer replays its journal after a crash, and its
+-- batched INSERT relies on ON CONFLICT DO NOTHING against this index to stay
+-- idempotent. It also stops a double-tapped answer from being scored twice.
+
+BEGIN;
+
+-- Keep the earliest attempt where duplicates already exist
+DELETE FROM ofta_prod.ofta_question_attempt
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY session_id, question_index
+                   ORDER BY answered_at_tms NULLS LAST, id
+               ) AS rn
+        FROM ofta_prod.ofta_question_attempt
+    ) ranked
+    WHERE rn > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ofta_attempt_session_index
+    ON ofta_prod.ofta_question_attempt(session_id, question_index);
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Migration 004: shared live-session state
+-- Backs SESSION_STATE_BACKEND=postgres. UNLOGGED: no WAL, truncated after a
+-- crash, which only sends in-flight sessions down the database path.
+
+BEGIN;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS ofta_prod.ofta_session_state (
+    session_id              UUID            PRIMARY KEY,
+    state                   JSONB           NOT NULL,
+    expires_at_tms          TIMESTAMP       NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ofta_session_state_expires
+    ON ofta_prod.ofta_session_state(expires_at_tms);
+
+COMMIT;
@@ -0,0 +1,26 @@
+-- Migration 005: running streak on ofta_game_session
+-- Every attempt insert now advances current_streak and best_streak in the
+-- same statement, so submit_answer and end_session no longer rescan
+-- ofta_question_attempt to count streaks.
+
+BEGIN;
+
+ALTER TABLE ofta_prod.ofta_game_session
+    ADD COLUMN IF NOT EXISTS current_streak INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill sessions still in progress from their recorded attempts
+UPDATE ofta_prod.ofta_game_session gs
+SET current_streak = last.current_streak,
+    best_streak    = GREATEST(gs.best_streak, last.best_streak)
+FROM (
+    SELECT DISTINCT ON (session_id)
+           session_id,
+           CASE WHEN is_correct THEN streak_at_time ELSE 0 END AS current_streak,
+           MAX(streak_at_time) OVER (PARTITION BY session_id) AS best_streak
+    FROM ofta_prod.ofta_question_attempt
+    ORDER BY session_id, question_index DESC
+) last
+WHERE gs.id = last.session_id
+  AND gs.ended_at_tms IS NULL;
+
+COMMIT;
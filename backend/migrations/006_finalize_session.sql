@@ -0,0 +1,13 @@
+-- Migration 006: single-transaction session finalization
+-- end_session now calls ofta_finalize_session(), which writes ofta_user_stats
+-- itself. The old trigger added the same game to ofta_user_stats a second
+-- time when ended_at_tms was set, so it goes.
+-- Apply data_products/functions/create_func_ofta_finalize_session.sql
+-- together with this migration, before deploying the API.
+
+BEGIN;
+
+DROP TRIGGER IF EXISTS ofta_trigger_update_user_stats ON ofta_prod.ofta_game_session;
+DROP FUNCTION IF EXISTS ofta_prod.ofta_update_user_stats_after_game();
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- Migration 007: rank index support
+-- API workers keep an in-memory rank index of lifetime scores and poll
+-- ofta_user_stats for rows changed since their last look; this index keeps
+-- that poll a short range scan. ofta_finalize_session() no longer counts
+-- players above the new score, so re-apply
+-- data_products/functions/create_func_ofta_finalize_session.sql as well.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_ofta_stats_updated
+    ON ofta_prod.ofta_user_stats(updated_at_tms);
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Migration 008: keyset pagination for leaderboards
+-- Boards page by (score, user_id) instead of OFFSET, so each page and each
+-- around-me lookup is a seek on these indexes rather than a scan from the top.
+
+BEGIN;
+
+DROP INDEX IF EXISTS ofta_prod.idx_ofta_lb_daily_score;
+CREATE INDEX IF NOT EXISTS idx_ofta_lb_daily_keyset
+    ON ofta_prod.ofta_leaderboard_daily(pack_date, score DESC, user_id DESC);
+
+DROP INDEX IF EXISTS ofta_prod.idx_ofta_stats_lifetime;
+CREATE INDEX IF NOT EXISTS idx_ofta_stats_lifetime
+    ON ofta_prod.ofta_user_stats(lifetime_score DESC, user_id DESC);
+
+COMMIT;
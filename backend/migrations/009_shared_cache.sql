@@ -0,0 +1,21 @@
+-- Migration 009: shared read cache
+-- Backs CACHE_BACKEND=postgres. Workers fill it on a local miss and delete
+-- from it (plus NOTIFY ofta_cache_invalidate) when a write makes entries stale.
+-- UNLOGGED: a crash only costs a cold cache. cache_key uses text_pattern_ops
+-- so prefix invalidations (LIKE 'ns:prefix|%') can use the index.
+
+BEGIN;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS ofta_prod.ofta_cache_entry (
+    cache_key               TEXT            PRIMARY KEY,
+    value                   JSONB           NOT NULL,
+    expires_at_tms          TIMESTAMP       NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_ofta_cache_entry_expires
+    ON ofta_prod.ofta_cache_entry(expires_at_tms);
+
+CREATE INDEX IF NOT EXISTS idx_ofta_cache_entry_key_prefix
+    ON ofta_prod.ofta_cache_entry(cache_key text_pattern_ops);
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Migration 010: materialized daily packs
+-- ofta_daily_pack now holds the pack itself (template ids in order plus the
+-- questions payload), written ahead of time by ofta_build_daily_pack(). The
+-- table was never written before, so existing rows (if any) are dropped and
+-- rebuilt with the same date-seeded selection the endpoint used.
+-- Run data_products/functions/create_func_ofta_build_daily_pack.sql after this.
+
+BEGIN;
+
+DELETE FROM ofta_prod.ofta_daily_pack;
+
+ALTER TABLE ofta_prod.ofta_daily_pack
+    ALTER COLUMN pack_json_url DROP NOT NULL,
+    ADD COLUMN IF NOT EXISTS template_ids UUID[] NOT NULL,
+    ADD COLUMN IF NOT EXISTS questions JSONB NOT NULL;
+
+COMMIT;
@@ -0,0 +1,12 @@
+-- Migration 011: one daily selection rule
+-- ofta_build_daily_pack() now picks DAILY_CHALLENGE templates (easy band
+-- first), the set DAILY_CHALLENGE sessions also read. Packs from today on
+-- were built with the previous rule and are rebuilt on the next request or
+-- builder pass; past packs stay as they were served.
+-- Apply data_products/functions/create_func_ofta_build_daily_pack.sql first.
+
+BEGIN;
+
+DELETE FROM ofta_prod.ofta_daily_pack WHERE pack_date >= CURRENT_DATE;
+
+COMMIT;
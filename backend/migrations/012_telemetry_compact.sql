@@ -0,0 +1,77 @@
+-- Migration 012: compact, partitioned telemetry
+-- ofta_telemetry_event becomes a table partitioned by month on server_ts_tms,
+-- without the UUID primary key. event_type, device_os and app_version are
+-- interned in ofta_telemetry_label and stored as integer ids. Readers that
+-- want the strings use the ofta_telemetry_event_v view.
+-- Existing rows are copied over; the old table is kept as
+-- ofta_telemetry_event_legacy until the copy has been checked, then dropped
+-- by hand.
+-- Apply data_products/functions/create_func_ofta_ensure_telemetry_partitions.sql
+-- before this migration.
+
+BEGIN;
+
+ALTER TABLE ofta_prod.ofta_telemetry_event RENAME TO ofta_telemetry_event_legacy;
+ALTER INDEX IF EXISTS ofta_prod.idx_ofta_telemetry_type RENAME TO idx_ofta_telemetry_legacy_type;
+ALTER INDEX IF EXISTS ofta_prod.idx_ofta_telemetry_time RENAME TO idx_ofta_telemetry_legacy_time;
+ALTER INDEX IF EXISTS ofta_prod.idx_ofta_telemetry_user RENAME TO idx_ofta_telemetry_legacy_user;
+
+CREATE TABLE ofta_prod.ofta_telemetry_label (
+    id                  INTEGER         GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    kind                VARCHAR(20)     NOT NULL,
+    value               VARCHAR(100)    NOT NULL,
+    UNIQUE (kind, value)
+);
+
+CREATE TABLE ofta_prod.ofta_telemetry_event (
+    server_ts_tms       TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    client_ts_tms       TIMESTAMP,
+    user_id             UUID,
+    event_type_id       INTEGER         NOT NULL,
+    device_os_id        INTEGER,
+    app_version_id      INTEGER,
+    event_data          JSONB
+) PARTITION BY RANGE (server_ts_tms);
+
+CREATE TABLE ofta_prod.ofta_telemetry_event_default
+    PARTITION OF ofta_prod.ofta_telemetry_event DEFAULT;
+
+CREATE INDEX idx_ofta_telemetry_time ON ofta_prod.ofta_telemetry_event USING BRIN (server_ts_tms);
+CREATE INDEX idx_ofta_telemetry_type ON ofta_prod.ofta_telemetry_event(event_type_id, server_ts_tms);
+CREATE INDEX idx_ofta_telemetry_user ON ofta_prod.ofta_telemetry_event(user_id) WHERE user_id IS NOT NULL;
+
+SELECT ofta_prod.ofta_ensure_telemetry_partitions(
+    COALESCE((SELECT MIN(server_ts_tms)::date FROM ofta_prod.ofta_telemetry_event_legacy), CURRENT_DATE),
+    CURRENT_DATE + 60
+);
+
+INSERT INTO ofta_prod.ofta_telemetry_label (kind, value)
+SELECT DISTINCT kind, value
+FROM ofta_prod.ofta_telemetry_event_legacy,
+     LATERAL (VALUES ('event_type', event_type), ('device_os', device_os), ('app_version', app_version)) AS l(kind, value)
+WHERE value IS NOT NULL;
+
+INSERT INTO ofta_prod.ofta_telemetry_event (
+    server_ts_tms, client_ts_tms, user_id, event_type_id, device_os_id, app_version_id, event_data
+)
+SELECT e.server_ts_tms, e.client_ts_tms, e.user_id, et.id, os.id, av.id, e.event_data
+FROM ofta_prod.ofta_telemetry_event_legacy e
+JOIN ofta_prod.ofta_telemetry_label et ON et.kind = 'event_type' AND et.value = e.event_type
+LEFT JOIN ofta_prod.ofta_telemetry_label os ON os.kind = 'device_os' AND os.value = e.device_os
+LEFT JOIN ofta_prod.ofta_telemetry_label av ON av.kind = 'app_version' AND av.value = e.app_version;
+
+CREATE VIEW ofta_prod.ofta_telemetry_event_v AS
+SELECT
+    e.server_ts_tms,
+    e.client_ts_tms,
+    e.user_id,
+    et.value AS event_type,
+    os.value AS device_os,
+    av.value AS app_version,
+    e.event_data
+FROM ofta_prod.ofta_telemetry_event e
+JOIN ofta_prod.ofta_telemetry_label et ON et.id = e.event_type_id
+LEFT JOIN ofta_prod.ofta_telemetry_label os ON os.id = e.device_os_id
+LEFT JOIN ofta_prod.ofta_telemetry_label av ON av.id = e.app_version_id;
+
+COMMIT;
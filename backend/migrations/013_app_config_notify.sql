@@ -0,0 +1,27 @@
+-- Migration 013: app config change notifications
+-- API workers keep the client config (min_client_version, feature_flags,
+-- maintenance_mode) in memory and reload it on NOTIFY ofta_app_config_changed,
+-- which a trigger sends with the key on every ofta_app_config write.
+-- Workers also poll MAX(updated_at_tms) as a fallback, so deploying the API
+-- before this migration only delays reloads.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION ofta_prod.ofta_notify_app_config_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('ofta_app_config_changed', OLD.key);
+    ELSE
+        PERFORM pg_notify('ofta_app_config_changed', NEW.key);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ofta_trigger_app_config_changed ON ofta_prod.ofta_app_config;
+CREATE TRIGGER ofta_trigger_app_config_changed
+    AFTER INSERT OR UPDATE OR DELETE ON ofta_prod.ofta_app_config
+    FOR EACH ROW EXECUTE FUNCTION ofta_prod.ofta_notify_app_config_changed();
+
+COMMIT;
@@ -0,0 +1,32 @@
+-- Migration 014: indexed random sampling for the session SQL fallback
+-- Workers whose question pool index is not built yet used to pick questions
+-- with ORDER BY RANDOM() over the whole eligible set. They now draw k random
+-- ordinals from a dense per-(mode, band) numbering and fetch those rows by
+-- primary key. ofta_bump_question_pool_version() renumbers on every content
+-- change.
+-- Apply data_products/functions/create_func_ofta_refresh_question_sample.sql
+-- and create_func_ofta_bump_question_pool_version.sql before this migration.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_question_sample (
+    mode                VARCHAR(50)     NOT NULL,
+    band                VARCHAR(10)     NOT NULL,
+    seq                 INTEGER         NOT NULL,
+    categories          TEXT[]          NOT NULL,
+    template_id         UUID            NOT NULL,
+    PRIMARY KEY (mode, band, seq)
+);
+
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_question_sample_bucket (
+    mode                VARCHAR(50)     NOT NULL,
+    band                VARCHAR(10)     NOT NULL,
+    categories          TEXT[]          NOT NULL,
+    seq_from            INTEGER         NOT NULL,
+    seq_to              INTEGER         NOT NULL,
+    PRIMARY KEY (mode, band, categories)
+);
+
+SELECT ofta_prod.ofta_refresh_question_sample();
+
+COMMIT;
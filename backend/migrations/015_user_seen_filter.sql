@@ -0,0 +1,20 @@
+-- Migration 015: per-user recently-seen filter for question selection
+-- start_session skips templates a player was recently issued. The API keeps
+-- a two-generation Bloom filter of template ids per user in memory and
+-- upserts it here in batches, so selection never reads ofta_question_attempt.
+-- Losing the table only means players may see repeats again.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ofta_prod.ofta_user_seen_filter (
+    user_id             UUID            PRIMARY KEY REFERENCES ofta_prod.ofta_user_account(id),
+    bits                INTEGER         NOT NULL,
+    current_count       INTEGER         NOT NULL DEFAULT 0,
+    current_bits        BYTEA           NOT NULL,
+    previous_bits       BYTEA           NOT NULL,
+    updated_at_tms      TIMESTAMP       NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE ofta_prod.ofta_user_seen_filter IS 'Rolling two-generation Bloom filter of recently issued template ids per user; written lazily by the API, advisory';
+
+COMMIT;
@@ -0,0 +1,21 @@
+-- Migration 016: finalize each session once
+-- ofta_finalize_session() added a game to ofta_user_stats every time it ran,
+-- so a repeated /end (client retry, double tap) counted the game twice. It
+-- now stamps finalized_at_tms and returns the stored totals when it is set.
+-- ended_at_tms cannot serve: write-behind end_session sets it before
+-- draining the session's answers.
+-- Apply data_products/functions/create_func_ofta_finalize_session.sql
+-- together with this migration.
+
+BEGIN;
+
+ALTER TABLE ofta_prod.ofta_game_session
+    ADD COLUMN IF NOT EXISTS finalized_at_tms TIMESTAMP;
+
+-- Sessions ended so far were finalized by the same call
+UPDATE ofta_prod.ofta_game_session
+SET finalized_at_tms = ended_at_tms
+WHERE ended_at_tms IS NOT NULL
+  AND finalized_at_tms IS NULL;
+
+COMMIT;
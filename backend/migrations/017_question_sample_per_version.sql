@@ -0,0 +1,17 @@
+-- Migration 017: renumber ofta_question_sample once per content version
+-- ofta_bump_question_pool_version() used to DELETE and renumber the whole
+-- sample on every bump, and bulk edits (backfill_images, per-person admin
+-- edits) bump once per person. The bump now only moves the version. API
+-- workers call ofta_refresh_question_sample() every
+-- QUESTION_POOL_REFRESH_SECONDS; it renumbers when question_pool_version has
+-- moved past question_sample_version, under an advisory lock so only one
+-- worker does the work.
+-- Apply data_products/functions/create_func_ofta_refresh_question_sample.sql
+-- and create_func_ofta_bump_question_pool_version.sql before this migration.
+
+BEGIN;
+
+-- Number the current content and record its version
+SELECT ofta_prod.ofta_refresh_question_sample();
+
+COMMIT;
@@ -5,15 +5,22 @@ These endpoints power the admin panel.
 """
 
 import os
+import asyncio
+import logging
 from fastapi import APIRouter, HTTPException, status, Depends, Header
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, ValidationError
+from typing import Any, Optional, List
 from datetime import datetime
 import json
 import uuid
 
+from ofta_core.utils.app_config import CLIENT_KEYS, DEFAULTS, reload_app_config, validate_config
+from ofta_core.utils.question_pool import bump_pool_version, reload_question_pool
+from ofta_core.utils.user_identity import forget_user
 from ofta_core.utils.util_db import get_db_connector
 
+logger = logging.getLogger(__name__)
+
 
 async def verify_admin_key(x_admin_key: Optional[str] = Header(None)):
     """Verify admin API key from X-Admin-Key header."""
@@ -28,6 +35,19 @@ async def verify_admin_key(x_admin_key: Optional[str] = Header(None)):
 router = APIRouter(dependencies=[Depends(verify_admin_key)])
 
 
+async def _refresh_question_pool(db, bump: bool = True) -> None:
+    """
+    Bump the pool version for other workers and rebuild this one's index.
+    Pass bump=False when the edit already went through a function that bumps.
+    """
+    if bump:
+        bump_pool_version(db)
+    try:
+        await asyncio.to_thread(reload_question_pool)
+    except Exception:
+        logger.exception("Question pool reload failed after admin edit")
+
+
 # ────────────────────────────────────────────────
 # Stats
 # ────────────────────────────────────────────────
@@ -35,29 +55,25 @@ router = APIRouter(dependencies=[Depends(verify_admin_key)])
 @router.get("/stats/persons")
 async def stats_persons():
     db = get_db_connector()
-    df = db.select_df("SELECT COUNT(*) as count FROM ofta_prod.ofta_person")
-    return {"count": int(df.iloc[0]['count']) if not df.empty else 0}
+    return {"count": int(db.fetch_scalar("SELECT COUNT(*) as count FROM ofta_prod.ofta_person") or 0)}
 
 
 @router.get("/stats/questions")
 async def stats_questions():
     db = get_db_connector()
-    df = db.select_df("SELECT COUNT(*) as count FROM ofta_prod.ofta_question_template")
-    return {"count": int(df.iloc[0]['count']) if not df.empty else 0}
+    return {"count": int(db.fetch_scalar("SELECT COUNT(*) as count FROM ofta_prod.ofta_question_template") or 0)}
 
 
 @router.get("/stats/users")
 async def stats_users():
     db = get_db_connector()
-    df = db.select_df("SELECT COUNT(*) as count FROM ofta_prod.ofta_user_account")
-    return {"count": int(df.iloc[0]['count']) if not df.empty else 0}
+    return {"count": int(db.fetch_scalar("SELECT COUNT(*) as count FROM ofta_prod.ofta_user_account") or 0)}
 
 
 @router.get("/stats/sessions")
 async def stats_sessions():
     db = get_db_connector()
-    df = db.select_df("SELECT COUNT(*) as count FROM ofta_prod.ofta_game_session")
-    return {"count": int(df.iloc[0]['count']) if not df.empty else 0}
+    return {"count": int(db.fetch_scalar("SELECT COUNT(*) as count FROM ofta_prod.ofta_game_session") or 0)}
 
 
 # ────────────────────────────────────────────────
@@ -86,7 +102,7 @@ class PersonUpdateRequest(BaseModel):
 @router.get("/persons")
 async def list_persons():
     db = get_db_connector()
-    df = db.select_df("""
+    rows = db.fetch_all("""
         SELECT id, full_name, date_of_birth, star_sign, primary_category,
                nationality, gender, popularity_score, is_active, created_at_tms
         FROM ofta_prod.ofta_person
@@ -94,7 +110,7 @@ async def list_persons():
     """)
 
     persons = []
-    for _, row in df.iterrows():
+    for row in rows:
         persons.append({
             "id": str(row['id']),
             "full_name": row['full_name'],
@@ -174,6 +190,21 @@ async def update_person(person_id: str, request: PersonUpdateRequest):
         f"UPDATE ofta_prod.ofta_person SET {set_clause} WHERE id = :id",
         params=params
     )
+    if request.popularity_score is not None:
+        # Re-rank only the person's own category
+        db.execute_query(
+            """
+            SELECT ofta_prod.ofta_refresh_popularity_pct(
+                (SELECT primary_category FROM ofta_prod.ofta_person WHERE id = :id)
+            )
+            """,
+            params={"id": person_id}
+        )
+    # ofta_refresh_popularity_pct() bumps the version only when a band or
+    # percentile moved; a name or active change needs its own bump
+    await _refresh_question_pool(
+        db, bump=request.is_active is not None or request.full_name is not None
+    )
 
     return {"status": "updated"}
 
@@ -190,7 +221,7 @@ class QuestionUpdateRequest(BaseModel):
 @router.get("/questions")
 async def list_questions():
     db = get_db_connector()
-    df = db.select_df("""
+    rows = db.fetch_all("""
         SELECT 
             qt.id, qt.mode, qt.difficulty, qt.is_active,
             c.full_name as person_name,
@@ -204,7 +235,7 @@ async def list_questions():
     """)
 
     questions = []
-    for _, row in df.iterrows():
+    for row in rows:
         questions.append({
             "id": str(row['id']),
             "mode": row['mode'],
@@ -243,6 +274,7 @@ async def update_question(question_id: str, request: QuestionUpdateRequest):
         f"UPDATE ofta_prod.ofta_question_template SET {set_clause} WHERE id = :id",
         params=params
     )
+    await _refresh_question_pool(db)
 
     return {"status": "updated"}
 
@@ -254,7 +286,7 @@ async def update_question(question_id: str, request: QuestionUpdateRequest):
 @router.get("/users")
 async def list_users():
     db = get_db_connector()
-    df = db.select_df("""
+    rows = db.fetch_all("""
         SELECT id, display_name, email, auth_provider, is_banned,
                created_at_tms, last_active_at_tms
         FROM ofta_prod.ofta_user_account
@@ -263,7 +295,7 @@ async def list_users():
     """)
 
     users = []
-    for _, row in df.iterrows():
+    for row in rows:
         users.append({
             "id": str(row['id']),
             "display_name": row.get('display_name'),
@@ -277,22 +309,54 @@ async def list_users():
     return {"users": users}
 
 
+class UserUpdateRequest(BaseModel):
+    is_banned: Optional[bool] = None
+
+
+@router.patch("/users/{user_id}")
+async def update_user(user_id: str, request: UserUpdateRequest):
+    db = get_db_connector()
+
+    if request.is_banned is None:
+        return {"status": "no changes"}
+
+    firebase_uid = db.fetch_scalar(
+        "SELECT firebase_uid FROM ofta_prod.ofta_user_account WHERE id = :id",
+        params={"id": user_id}
+    )
+    if firebase_uid is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    db.execute_query(
+        """
+        UPDATE ofta_prod.ofta_user_account
+        SET is_banned = :is_banned, updated_at_tms = NOW()
+        WHERE id = :id
+        """,
+        params={"id": user_id, "is_banned": request.is_banned}
+    )
+    # Cached uid lookups carry the ban flag
+    await forget_user(firebase_uid)
+
+    return {"status": "updated"}
+
+
 # ────────────────────────────────────────────────
 # Config CRUD
 # ────────────────────────────────────────────────
 
 class ConfigRequest(BaseModel):
     key: str
-    value: dict
+    value: Any      # maintenance_mode is a bare boolean
 
 
 @router.get("/config")
 async def list_config():
     db = get_db_connector()
-    df = db.select_df("SELECT key, value, updated_at_tms FROM ofta_prod.ofta_app_config ORDER BY key")
+    rows = db.fetch_all("SELECT key, value, updated_at_tms FROM ofta_prod.ofta_app_config ORDER BY key")
 
     configs = []
-    for _, row in df.iterrows():
+    for row in rows:
         configs.append({
             "key": row['key'],
             "value": row['value'],
@@ -304,6 +368,20 @@ async def list_config():
 
 @router.post("/config")
 async def upsert_config(request: ConfigRequest):
+    """
+    Insert or update one config key. The write moves updated_at_tms and fires
+    NOTIFY ofta_app_config_changed, so every worker reloads its copy.
+    """
+    if request.key in CLIENT_KEYS:
+        # Every client reads these as-is; refuse a value /v1/config cannot serve
+        try:
+            validate_config({**DEFAULTS, request.key: request.value})
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid value for {request.key}: {e.errors()[0]['msg']}"
+            )
+
     db = get_db_connector()
 
     db.execute_query(
@@ -314,6 +392,9 @@ async def upsert_config(request: ConfigRequest):
         """,
         params={"key": request.key, "value": json.dumps(request.value)}
     )
+    if request.key in CLIENT_KEYS:
+        # This worker answers the admin's next read without waiting for the NOTIFY
+        await reload_app_config()
 
     return {"status": "saved"}
 
@@ -326,7 +407,7 @@ async def upsert_config(request: ConfigRequest):
 async def analytics_sessions_per_day():
     """Get sessions count per day for the last 7 days."""
     db = get_db_connector()
-    df = db.select_df("""
+    rows = db.fetch_all("""
         SELECT
             DATE(started_at_tms) as day,
             COUNT(*) as count
@@ -337,7 +418,7 @@ async def analytics_sessions_per_day():
     """)
 
     days = []
-    for _, row in df.iterrows():
+    for row in rows:
         days.append({
             "date": str(row['day']),
             "count": int(row['count'])
@@ -349,7 +430,7 @@ async def analytics_sessions_per_day():
 async def analytics_score_distribution():
     """Get score distribution across all completed sessions."""
     db = get_db_connector()
-    df = db.select_df("""
+    rows = db.fetch_all("""
         SELECT
             CASE
                 WHEN total_score < 100 THEN '0-99'
@@ -367,7 +448,7 @@ async def analytics_score_distribution():
     """)
 
     buckets = []
-    for _, row in df.iterrows():
+    for row in rows:
         buckets.append({
             "bracket": row['bracket'],
             "count": int(row['count'])
@@ -380,20 +461,20 @@ async def analytics_active_users():
     """Get active user counts for different time periods."""
     db = get_db_connector()
 
-    dau = db.select_df(
+    dau = db.fetch_scalar(
         "SELECT COUNT(DISTINCT user_id) as cnt FROM ofta_prod.ofta_game_session WHERE started_at_tms >= NOW() - INTERVAL '1 day'"
     )
-    wau = db.select_df(
+    wau = db.fetch_scalar(
         "SELECT COUNT(DISTINCT user_id) as cnt FROM ofta_prod.ofta_game_session WHERE started_at_tms >= NOW() - INTERVAL '7 days'"
     )
-    mau = db.select_df(
+    mau = db.fetch_scalar(
         "SELECT COUNT(DISTINCT user_id) as cnt FROM ofta_prod.ofta_game_session WHERE started_at_tms >= NOW() - INTERVAL '30 days'"
     )
 
     return {
-        "dau": int(dau.iloc[0]['cnt']) if not dau.empty else 0,
-        "wau": int(wau.iloc[0]['cnt']) if not wau.empty else 0,
-        "mau": int(mau.iloc[0]['cnt']) if not mau.empty else 0,
+        "dau": int(dau or 0),
+        "wau": int(wau or 0),
+        "mau": int(mau or 0),
     }
 
 
@@ -15,6 +15,7 @@ from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from ofta_core.utils.firebase_auth import get_current_user, verify_firebase_token
+from ofta_core.utils.user_identity import forget_user, remember_user
 from ofta_core.utils.util_db import get_db_connector
 
 router = APIRouter()
@@ -97,7 +98,7 @@ async def register_user(
         )
     
     # Check if user already exists
-    existing_user = db.select_df(
+    existing_user = db.fetch_one(
         """
         SELECT * FROM ofta_prod.ofta_user_account
         WHERE firebase_uid = :firebase_uid
@@ -105,7 +106,7 @@ async def register_user(
         params={"firebase_uid": body.firebase_uid}
     )
     
-    if not existing_user.empty:
+    if existing_user is not None:
         # Update last_active_at_tms
         db.execute_query(
             """
@@ -115,9 +116,9 @@ async def register_user(
             """,
             params={"firebase_uid": body.firebase_uid}
         )
+        remember_user(body.firebase_uid, existing_user["id"], bool(existing_user["is_banned"]))
         
-        user = existing_user.iloc[0].to_dict()
-        return UserResponse(**user)
+        return UserResponse(**existing_user)
     
     # Create new user
     user_id = str(uuid.uuid4())
@@ -143,14 +144,14 @@ async def register_user(
             "auth_provider": body.auth_provider,
         }
     )
+    remember_user(body.firebase_uid, user_id)
     
     # Fetch created user
-    user_df = db.select_df(
+    user = db.fetch_one(
         "SELECT * FROM ofta_prod.ofta_user_account WHERE id = :id",
         params={"id": user_id}
     )
     
-    user = user_df.iloc[0].to_dict()
     return UserResponse(**user)
 
 
@@ -161,7 +162,7 @@ async def get_current_user_info(
     """Get current authenticated user's information."""
     db = get_db_connector()
     
-    user_df = db.select_df(
+    user = db.fetch_one(
         """
         SELECT * FROM ofta_prod.ofta_user_account
         WHERE firebase_uid = :firebase_uid
@@ -169,7 +170,7 @@ async def get_current_user_info(
         params={"firebase_uid": current_user["firebase_uid"]}
     )
     
-    if user_df.empty:
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found. Please register first."
@@ -185,7 +186,6 @@ async def get_current_user_info(
         params={"firebase_uid": current_user["firebase_uid"]}
     )
     
-    user = user_df.iloc[0].to_dict()
     return UserResponse(**user)
 
 
@@ -226,12 +226,11 @@ async def update_user_profile(
     db.execute_query(query, params=params)
     
     # Fetch updated user
-    user_df = db.select_df(
+    user = db.fetch_one(
         "SELECT * FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
         params={"firebase_uid": current_user["firebase_uid"]}
     )
     
-    user = user_df.iloc[0].to_dict()
     return UserResponse(**user)
 
 
@@ -265,5 +264,6 @@ async def delete_user_account(
             "anon_uid": f"deleted_{anon_hash}",
         }
     )
+    await forget_user(current_user["firebase_uid"])
 
     return None
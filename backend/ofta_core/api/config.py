@@ -3,26 +3,17 @@
 App configuration endpoints for OFTA
 """
 
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, Depends, Request
+from typing import Optional
 
-from ofta_core.utils.util_db import get_db_connector
+from ofta_core.utils.app_config import AppConfigResponse, get_app_config as current_app_config
 from ofta_core.utils.firebase_auth import get_optional_user
+from ofta_core.utils.response_cache import CachePolicy, send
 
 router = APIRouter()
 
-
-# ────────────────────────────────────────────────
-# Response Models
-# ────────────────────────────────────────────────
-
-class AppConfigResponse(BaseModel):
-    min_client_version: Dict[str, str]
-    feature_flags: Dict[str, bool]
-    maintenance_mode: bool
-    categories: list[str]
-    game_modes: list[str]
+# Clients and CDNs may keep it briefly; workers reload on every change
+CONFIG_POLICY = CachePolicy(max_age=30, public=True, stale_while_revalidate=300)
 
 
 # ────────────────────────────────────────────────
@@ -31,61 +22,19 @@ class AppConfigResponse(BaseModel):
 
 @router.get("/config", response_model=AppConfigResponse)
 async def get_app_config(
+    request: Request,
     current_user: Optional[dict] = Depends(get_optional_user)
 ):
     """
     Get app configuration.
-    Public endpoint (no auth required).
+    Public endpoint (no auth required). Served from this worker's in-memory
+    copy, which reloads when ofta_app_config changes.
     """
-    db = get_db_connector()
-    
-    # Fetch config from database
-    config_df = db.select_df(
-        """
-        SELECT key, value FROM ofta_prod.ofta_app_config
-        WHERE key IN ('min_client_version', 'feature_flags', 'maintenance_mode')
-        """
-    )
-    
-    config = {}
-    for _, row in config_df.iterrows():
-        config[row['key']] = row['value']
-    
-    # Default values if not in database
-    min_client_version = config.get('min_client_version', {"ios": "1.0.0", "android": "1.0.0"})
-    feature_flags = config.get('feature_flags', {
-        "reverse_mode": True,
-        "leaderboard": True,
-        "daily_challenge": True
-    })
-    maintenance_mode = config.get('maintenance_mode', False)
-    
-    # Static configuration
-    categories = [
-        "Film & TV",
-        "Music",
-        "Sports",
-        "Influencers",
-        "Legends",
-        "Models",
-        "Politics"
-    ]
-    
-    game_modes = [
-        "AGE_GUESS",
-        "WHO_OLDER",
-        "REVERSE_DOB",
-        "REVERSE_SIGN",
-        "DAILY_CHALLENGE"
-    ]
-    
-    return AppConfigResponse(
-        min_client_version=min_client_version,
-        feature_flags=feature_flags,
-        maintenance_mode=maintenance_mode,
-        categories=categories,
-        game_modes=game_modes
-    )
+    config = current_app_config()
+    if not config.ready:
+        # Not loaded on this worker yet; the poll replaces the defaults
+        config.use_defaults()
+    return send(request, config.encoded, CONFIG_POLICY)
 
 
 @router.get("/health")
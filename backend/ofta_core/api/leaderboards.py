@@ -3,41 +3,40 @@
 Leaderboard endpoints for OFTA
 """
 
-import time
+import base64
+import json
+import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Callable, Optional, List, Tuple
 from datetime import datetime, date
 
-from ofta_core.utils.firebase_auth import get_current_user, get_optional_user
-from ofta_core.utils.util_db import get_db_connector
+from ofta_core.utils.cache import LoadingCache
+from ofta_core.utils.firebase_auth import get_optional_user
+from ofta_core.utils.rank_index import get_rank_index
+from ofta_core.utils.response_cache import (
+    CachePolicy, cached_response, encode, response_cache, send,
+)
+from ofta_core.utils.shared_cache import get_cache_backend
+from ofta_core.utils.user_identity import get_current_user_id
+from ofta_core.utils.util_async_db import get_async_db
 
 router = APIRouter()
 
 
-# In-process TTL cache for leaderboard query rows. Cached data is user-neutral;
-# is_current_user/current_user_rank are computed per request from the rows.
-_CACHE: dict = {}
+# Leaderboard pages (rows, total_players), shared across workers. Cached data
+# is user-neutral; is_current_user/current_user_rank are computed per request.
+leaderboard_cache = LoadingCache(maxsize=1024, ttl=15, stale_ttl=30, name="leaderboards",
+                                 backend=get_cache_backend())
 
-
-def _cache_get(key):
-    hit = _CACHE.get(key)
-    if hit and hit[0] > time.time():
-        return hit[1]
-    _CACHE.pop(key, None)
-    return None
-
-
-def _cache_set(key, value, ttl: float):
-    if len(_CACHE) > 256:
-        _CACHE.clear()
-    _CACHE[key] = (time.time() + ttl, value)
-
-
-def _cache_drop_daily(pack_date: str):
-    for key in [k for k in _CACHE if k[0] == "daily" and k[1] == pack_date]:
-        _CACHE.pop(key, None)
+# HTTP caching for pages without the caller on them. Today's board and the
+# all-time board move with every submit; a past board only with a late one.
+# Whether a page is shared or personal depends on the caller, so boards vary
+# on Authorization.
+LIVE_BOARD = CachePolicy(max_age=15, public=True, stale_while_revalidate=30, vary="Authorization")
+PAST_BOARD = CachePolicy(max_age=3600, public=True, vary="Authorization")
+MY_BOARD = CachePolicy(vary="Authorization")
 
 
 # ────────────────────────────────────────────────
@@ -57,6 +56,7 @@ class DailyLeaderboardResponse(BaseModel):
     total_players: int
     current_user_rank: Optional[int] = None
     current_user_score: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class AllTimeLeaderboardEntry(BaseModel):
@@ -73,179 +73,504 @@ class AllTimeLeaderboardResponse(BaseModel):
     entries: List[AllTimeLeaderboardEntry]
     total_players: int
     current_user_rank: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 # ────────────────────────────────────────────────
-# Endpoints
+# Keyset pagination
 # ────────────────────────────────────────────────
+# Boards are ordered by (score DESC, user_id DESC). A cursor is the last entry
+# of the previous page: its key, which the next page seeks past on the index,
+# plus its rank and position, so RANK() numbering continues without counting
+# the players above it.
 
-@router.get("/daily/{pack_date}", response_model=DailyLeaderboardResponse)
-async def get_daily_leaderboard(
-    pack_date: str,
-    limit: int = 100,
-    offset: int = 0,
-    current_user: Optional[dict] = Depends(get_optional_user)
-):
-    """Get the daily leaderboard for a specific date."""
-    db = get_db_connector()
+AROUND_ME_MAX = 50
+
+
+def _encode_cursor(row: dict, score_key: str) -> str:
+    raw = json.dumps(
+        [int(row[score_key]), str(row['user_id']), row['rank'], row['position']],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    # Validate date
+
+def _decode_cursor(cursor: str) -> Tuple[int, str, int, int]:
     try:
-        target_date = datetime.strptime(pack_date, "%Y-%m-%d").date()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        score, user_id, rank, position = json.loads(raw)
+        return int(score), str(uuid.UUID(user_id)), int(rank), int(position)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _rank_rows(rows: List[dict], score_key: str, position: int,
+               prev: Optional[Tuple[int, int]] = None) -> List[dict]:
+    """
+    Number rows already in board order with RANK() semantics.
+
+    position is the board position of the first row; prev is (score, rank) of
+    the entry just above it, when known, so a run of ties keeps its rank.
+    """
+    for row in rows:
+        score = int(row[score_key])
+        rank = prev[1] if prev is not None and score == prev[0] else position + 1
+        row['rank'], row['position'] = rank, position
+        prev = (score, rank)
+        position += 1
+    return rows
+
+
+def _next_cursor(rows: List[dict], limit: int, score_key: str) -> Optional[str]:
+    return _encode_cursor(rows[-1], score_key) if rows and len(rows) >= limit else None
+
+
+def _is_firebase_user(current_user: Optional[dict]) -> Callable[[dict], bool]:
+    current_uid = current_user["firebase_uid"] if current_user else None
+    return lambda row: current_uid is not None and row['firebase_uid'] == current_uid
+
+
+def _daily_entries(rows: List[dict], is_me: Callable[[dict], bool]):
+    entries, my_rank, my_score = [], None, None
+    for row in rows:
+        me = is_me(row)
+        entries.append(LeaderboardEntry(
+            rank=int(row['rank']),
+            display_name=row['display_name'] or "Anonymous",
+            score=int(row['score']),
+            is_current_user=me,
+        ))
+        if me:
+            my_rank, my_score = int(row['rank']), int(row['score'])
+    return entries, my_rank, my_score
+
+
+def _all_time_entries(rows: List[dict], is_me: Callable[[dict], bool]):
+    entries, my_rank = [], None
+    for row in rows:
+        me = is_me(row)
+        entries.append(AllTimeLeaderboardEntry(
+            rank=int(row['rank']),
+            display_name=row['display_name'] or "Anonymous",
+            lifetime_score=int(row['lifetime_score']),
+            games_played=int(row['games_played']),
+            accuracy_pct=float(row['accuracy_pct']),
+            best_streak=int(row['best_streak']),
+            is_current_user=me,
+        ))
+        if me:
+            my_rank = int(row['rank'])
+    return entries, my_rank
+
+
+def _parse_pack_date(pack_date: str) -> date:
+    try:
+        return datetime.strptime(pack_date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid date format. Use YYYY-MM-DD"
         )
 
-    cache_key = ("daily", pack_date, limit, offset)
-    cached = _cache_get(cache_key)
-    if cached is None:
-        lb_df = db.select_df(
+
+async def _indexed_rows(db, page: List[Tuple[int, str, int]], offset: int) -> List[dict]:
+    """All-time rows for a rank-index page: order and ranks from the index, details by primary key."""
+    if not page:
+        return []
+    details = await db.select(
+        """
+        SELECT
+            us.user_id,
+            us.games_played,
+            us.accuracy_pct,
+            us.best_streak,
+            ua.display_name,
+            ua.firebase_uid
+        FROM ofta_prod.ofta_user_stats us
+        JOIN ofta_prod.ofta_user_account ua ON us.user_id = ua.id
+        WHERE us.user_id = ANY(CAST(:user_ids AS uuid[]))
+        """,
+        params={"user_ids": [user_id for _, user_id, _ in page]}
+    )
+    by_user = {str(d['user_id']): d for d in details}
+    return [
+        {**by_user[user_id], "lifetime_score": score, "rank": rank, "position": offset + i}
+        for i, (rank, user_id, score) in enumerate(page) if user_id in by_user
+    ]
+
+
+async def _load_daily_page(target_date: date, limit: int, offset: int,
+                           after: Optional[Tuple[int, str, int, int]]):
+    db = get_async_db()
+    if after:
+        score, user_id, rank, position = after
+        rows = await db.select(
             """
-            SELECT
-                lb.score,
-                ua.display_name,
-                ua.firebase_uid,
-                RANK() OVER (ORDER BY lb.score DESC) as rank
+            SELECT lb.user_id, lb.score, ua.display_name, ua.firebase_uid
+            FROM ofta_prod.ofta_leaderboard_daily lb
+            JOIN ofta_prod.ofta_user_account ua ON lb.user_id = ua.id
+            WHERE lb.pack_date = :pack_date
+              AND (lb.score, lb.user_id) < (CAST(:score AS integer), CAST(:user_id AS uuid))
+            ORDER BY lb.score DESC, lb.user_id DESC
+            LIMIT :limit
+            """,
+            params={"pack_date": target_date, "score": score, "user_id": user_id, "limit": limit}
+        )
+        _rank_rows(rows, 'score', position + 1, (score, rank))
+    else:
+        rows = await db.select(
+            """
+            SELECT lb.user_id, lb.score, ua.display_name, ua.firebase_uid
             FROM ofta_prod.ofta_leaderboard_daily lb
             JOIN ofta_prod.ofta_user_account ua ON lb.user_id = ua.id
             WHERE lb.pack_date = :pack_date
-            ORDER BY lb.score DESC
+            ORDER BY lb.score DESC, lb.user_id DESC
             LIMIT :limit OFFSET :offset
             """,
             params={"pack_date": target_date, "limit": limit, "offset": offset}
         )
-        total_df = db.select_df(
-            "SELECT COUNT(*) as cnt FROM ofta_prod.ofta_leaderboard_daily WHERE pack_date = :pack_date",
-            params={"pack_date": target_date}
+        prev = None
+        if offset and rows:
+            above = await db.fetch_scalar(
+                """
+                SELECT COUNT(*) FROM ofta_prod.ofta_leaderboard_daily
+                WHERE pack_date = :pack_date AND score > :score
+                """,
+                params={"pack_date": target_date, "score": rows[0]['score']}
+            )
+            prev = (int(rows[0]['score']), int(above or 0) + 1)
+        _rank_rows(rows, 'score', offset, prev)
+    total_players = await db.fetch_scalar(
+        "SELECT COUNT(*) as cnt FROM ofta_prod.ofta_leaderboard_daily WHERE pack_date = :pack_date",
+        params={"pack_date": target_date}
+    )
+    return rows, int(total_players or 0)
+
+
+async def _load_all_time_page(limit: int, offset: int,
+                              after: Optional[Tuple[int, str, int, int]]):
+    db = get_async_db()
+    rank_index = get_rank_index()
+    if rank_index.ready:
+        if after:
+            offset = rank_index.offset_after(after[0], after[1])
+        rows = await _indexed_rows(db, rank_index.page(offset, limit), offset)
+        return rows, len(rank_index)
+
+    # Index not built yet: keyset SQL
+    if after:
+        score, user_id, rank, position = after
+        rows = await db.select(
+            """
+            SELECT
+                us.user_id,
+                us.lifetime_score,
+                us.games_played,
+                us.accuracy_pct,
+                us.best_streak,
+                ua.display_name,
+                ua.firebase_uid
+            FROM ofta_prod.ofta_user_stats us
+            JOIN ofta_prod.ofta_user_account ua ON us.user_id = ua.id
+            WHERE us.games_played > 0
+              AND (us.lifetime_score, us.user_id) < (CAST(:score AS bigint), CAST(:user_id AS uuid))
+            ORDER BY us.lifetime_score DESC, us.user_id DESC
+            LIMIT :limit
+            """,
+            params={"score": score, "user_id": user_id, "limit": limit}
         )
-        total_players = int(total_df.iloc[0]['cnt']) if not total_df.empty else 0
-        rows = lb_df.to_dict('records')
-        # Past days are immutable; today keeps changing
-        ttl = 3600 if target_date < date.today() else 30
-        _cache_set(cache_key, (rows, total_players), ttl)
+        _rank_rows(rows, 'lifetime_score', position + 1, (score, rank))
     else:
-        rows, total_players = cached
+        rows = await db.select(
+            """
+            SELECT
+                us.user_id,
+                us.lifetime_score,
+                us.games_played,
+                us.accuracy_pct,
+                us.best_streak,
+                ua.display_name,
+                ua.firebase_uid
+            FROM ofta_prod.ofta_user_stats us
+            JOIN ofta_prod.ofta_user_account ua ON us.user_id = ua.id
+            WHERE us.games_played > 0
+            ORDER BY us.lifetime_score DESC, us.user_id DESC
+            LIMIT :limit OFFSET :offset
+            """,
+            params={"limit": limit, "offset": offset}
+        )
+        prev = None
+        if offset and rows:
+            above = await db.fetch_scalar(
+                """
+                SELECT COUNT(*) FROM ofta_prod.ofta_user_stats
+                WHERE games_played > 0 AND lifetime_score > :score
+                """,
+                params={"score": rows[0]['lifetime_score']}
+            )
+            prev = (int(rows[0]['lifetime_score']), int(above or 0) + 1)
+        _rank_rows(rows, 'lifetime_score', offset, prev)
+    total_players = await db.fetch_scalar(
+        "SELECT COUNT(*) as cnt FROM ofta_prod.ofta_user_stats WHERE games_played > 0"
+    )
+    return rows, int(total_players or 0)
 
-    current_uid = current_user["firebase_uid"] if current_user else None
 
-    entries = []
-    current_user_rank = None
-    current_user_score = None
+# ────────────────────────────────────────────────
+# Endpoints
+# ────────────────────────────────────────────────
 
-    for row in rows:
-        is_me = current_uid and row['firebase_uid'] == current_uid
-        entry = LeaderboardEntry(
-            rank=int(row['rank']),
-            display_name=row['display_name'] or "Anonymous",
-            score=int(row['score']),
-            is_current_user=bool(is_me),
+@router.get("/daily/{pack_date}", response_model=DailyLeaderboardResponse)
+async def get_daily_leaderboard(
+    request: Request,
+    pack_date: str,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """
+    Get the daily leaderboard for a specific date.
+    Pass the previous response's next_cursor to page; offset is kept for
+    older clients but costs a scan of every skipped entry.
+    """
+    target_date = _parse_pack_date(pack_date)
+
+    after = _decode_cursor(cursor) if cursor else None
+    # Past days are immutable; today keeps changing
+    past = target_date < date.today()
+    ttl = 3600 if past else 30
+    rows, total_players = await leaderboard_cache.get_or_load(
+        ("daily", pack_date, limit, offset, cursor),
+        lambda: _load_daily_page(target_date, limit, offset, after),
+        ttl=ttl,
+    )
+
+    def _response(is_me: Callable[[dict], bool]) -> DailyLeaderboardResponse:
+        entries, current_user_rank, current_user_score = _daily_entries(rows, is_me)
+        return DailyLeaderboardResponse(
+            pack_date=pack_date,
+            entries=entries,
+            total_players=total_players,
+            current_user_rank=current_user_rank,
+            current_user_score=current_user_score,
+            next_cursor=_next_cursor(rows, limit, 'score'),
+        )
+
+    is_me = _is_firebase_user(current_user)
+    if any(is_me(row) for row in rows):
+        return send(request, encode(_response(is_me)), MY_BOARD)
+    if not past:
+        return send(request, encode(_response(is_me)), LIVE_BOARD)
+
+    # Everyone not on this page gets the same final board: serve it encoded
+    async def _encode():
+        return encode(_response(lambda row: False))
+    encoded = await cached_response(
+        ("lb-daily", pack_date, limit, offset, cursor), _encode, ttl=ttl
+    )
+    return send(request, encoded, PAST_BOARD)
+
+
+@router.get("/daily/{pack_date}/around-me", response_model=DailyLeaderboardResponse)
+async def get_daily_around_me(
+    request: Request,
+    pack_date: str,
+    n: int = 5,
+    user_id: str = Depends(get_current_user_id)
+):
+    """The n entries above and below the current user on a daily board."""
+    db = get_async_db()
+    target_date = _parse_pack_date(pack_date)
+    n = max(1, min(n, AROUND_ME_MAX))
+
+    # Two short index seeks from the user's own key. The rank of the top row
+    # is still a count of the scores above it.
+    rows = await db.select(
+        """
+        WITH me AS (
+            SELECT score, user_id FROM ofta_prod.ofta_leaderboard_daily
+            WHERE pack_date = :pack_date AND user_id = :user_id
+        ), nearby AS (
+            (SELECT lb.score, lb.user_id
+             FROM ofta_prod.ofta_leaderboard_daily lb, me
+             WHERE lb.pack_date = :pack_date AND (lb.score, lb.user_id) > (me.score, me.user_id)
+             ORDER BY lb.score, lb.user_id
+             LIMIT :n)
+            UNION ALL
+            (SELECT lb.score, lb.user_id
+             FROM ofta_prod.ofta_leaderboard_daily lb, me
+             WHERE lb.pack_date = :pack_date AND (lb.score, lb.user_id) <= (me.score, me.user_id)
+             ORDER BY lb.score DESC, lb.user_id DESC
+             LIMIT :n + 1)
+        ), top AS (
+            SELECT score, user_id FROM nearby ORDER BY score DESC, user_id DESC LIMIT 1
+        )
+        SELECT
+            x.user_id, x.score, ua.display_name, ua.firebase_uid,
+            (SELECT COUNT(*) FROM ofta_prod.ofta_leaderboard_daily lb, top
+             WHERE lb.pack_date = :pack_date AND lb.score > top.score) AS above,
+            (SELECT COUNT(*) FROM ofta_prod.ofta_leaderboard_daily lb, top
+             WHERE lb.pack_date = :pack_date
+               AND (lb.score, lb.user_id) > (top.score, top.user_id)) AS position
+        FROM nearby x
+        JOIN ofta_prod.ofta_user_account ua ON x.user_id = ua.id
+        ORDER BY x.score DESC, x.user_id DESC
+        """,
+        params={"pack_date": target_date, "user_id": user_id, "n": n}
+    )
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No score submitted for this date"
         )
-        entries.append(entry)
+    first = rows[0]
+    _rank_rows(rows, 'score', int(first['position']), (int(first['score']), int(first['above']) + 1))
 
-        if is_me:
-            current_user_rank = int(row['rank'])
-            current_user_score = int(row['score'])
+    total_players = await db.fetch_scalar(
+        "SELECT COUNT(*) as cnt FROM ofta_prod.ofta_leaderboard_daily WHERE pack_date = :pack_date",
+        params={"pack_date": target_date}
+    )
+
+    entries, current_user_rank, current_user_score = _daily_entries(
+        rows, lambda row: str(row['user_id']) == user_id
+    )
 
-    return DailyLeaderboardResponse(
+    return send(request, encode(DailyLeaderboardResponse(
         pack_date=pack_date,
         entries=entries,
-        total_players=total_players,
+        total_players=int(total_players or 0),
         current_user_rank=current_user_rank,
         current_user_score=current_user_score,
-    )
+    )), MY_BOARD)
 
 
 @router.get("/all-time", response_model=AllTimeLeaderboardResponse)
 async def get_all_time_leaderboard(
+    request: Request,
     limit: int = 100,
     offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: Optional[dict] = Depends(get_optional_user)
 ):
-    """Get the all-time leaderboard based on lifetime scores."""
-    db = get_db_connector()
+    """
+    Get the all-time leaderboard based on lifetime scores.
+    Pass the previous response's next_cursor to page.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    rows, total_players = await leaderboard_cache.get_or_load(
+        ("alltime", limit, offset, cursor),
+        lambda: _load_all_time_page(limit, offset, after),
+    )
+
+    entries, current_user_rank = _all_time_entries(rows, _is_firebase_user(current_user))
+
+    encoded = encode(AllTimeLeaderboardResponse(
+        entries=entries,
+        total_players=total_players,
+        current_user_rank=current_user_rank,
+        next_cursor=_next_cursor(rows, limit, 'lifetime_score'),
+    ))
+    return send(request, encoded, MY_BOARD if current_user_rank is not None else LIVE_BOARD)
+
 
-    cache_key = ("alltime", limit, offset)
-    cached = _cache_get(cache_key)
-    if cached is None:
-        lb_df = db.select_df(
+@router.get("/all-time/around-me", response_model=AllTimeLeaderboardResponse)
+async def get_all_time_around_me(
+    request: Request,
+    n: int = 5,
+    user_id: str = Depends(get_current_user_id)
+):
+    """The n entries above and below the current user on the all-time board."""
+    db = get_async_db()
+    n = max(1, min(n, AROUND_ME_MAX))
+
+    rank_index = get_rank_index()
+    if rank_index.ready:
+        offset, page = rank_index.around(user_id, n)
+        rows = await _indexed_rows(db, page, offset)
+        total_players = len(rank_index)
+    else:
+        rows = await db.select(
             """
+            WITH me AS (
+                SELECT lifetime_score, user_id FROM ofta_prod.ofta_user_stats
+                WHERE user_id = :user_id AND games_played > 0
+            ), nearby AS (
+                (SELECT us.lifetime_score, us.user_id
+                 FROM ofta_prod.ofta_user_stats us, me
+                 WHERE us.games_played > 0
+                   AND (us.lifetime_score, us.user_id) > (me.lifetime_score, me.user_id)
+                 ORDER BY us.lifetime_score, us.user_id
+                 LIMIT :n)
+                UNION ALL
+                (SELECT us.lifetime_score, us.user_id
+                 FROM ofta_prod.ofta_user_stats us, me
+                 WHERE us.games_played > 0
+                   AND (us.lifetime_score, us.user_id) <= (me.lifetime_score, me.user_id)
+                 ORDER BY us.lifetime_score DESC, us.user_id DESC
+                 LIMIT :n + 1)
+            ), top AS (
+                SELECT lifetime_score, user_id FROM nearby
+                ORDER BY lifetime_score DESC, user_id DESC LIMIT 1
+            )
             SELECT
-                us.lifetime_score,
-                us.games_played,
-                us.accuracy_pct,
-                us.best_streak,
-                ua.display_name,
-                ua.firebase_uid,
-                RANK() OVER (ORDER BY us.lifetime_score DESC) as rank
-            FROM ofta_prod.ofta_user_stats us
-            JOIN ofta_prod.ofta_user_account ua ON us.user_id = ua.id
-            WHERE us.games_played > 0
-            ORDER BY us.lifetime_score DESC
-            LIMIT :limit OFFSET :offset
+                x.user_id, x.lifetime_score,
+                us.games_played, us.accuracy_pct, us.best_streak,
+                ua.display_name, ua.firebase_uid,
+                (SELECT COUNT(*) FROM ofta_prod.ofta_user_stats s, top
+                 WHERE s.games_played > 0
+                   AND s.lifetime_score > top.lifetime_score) AS above,
+                (SELECT COUNT(*) FROM ofta_prod.ofta_user_stats s, top
+                 WHERE s.games_played > 0
+                   AND (s.lifetime_score, s.user_id) > (top.lifetime_score, top.user_id)) AS position
+            FROM nearby x
+            JOIN ofta_prod.ofta_user_stats us ON us.user_id = x.user_id
+            JOIN ofta_prod.ofta_user_account ua ON x.user_id = ua.id
+            ORDER BY x.lifetime_score DESC, x.user_id DESC
             """,
-            params={"limit": limit, "offset": offset}
+            params={"user_id": user_id, "n": n}
         )
-        total_df = db.select_df(
+        if rows:
+            first = rows[0]
+            _rank_rows(rows, 'lifetime_score', int(first['position']),
+                       (int(first['lifetime_score']), int(first['above']) + 1))
+        total_players = await db.fetch_scalar(
             "SELECT COUNT(*) as cnt FROM ofta_prod.ofta_user_stats WHERE games_played > 0"
         )
-        total_players = int(total_df.iloc[0]['cnt']) if not total_df.empty else 0
-        rows = lb_df.to_dict('records')
-        _cache_set(cache_key, (rows, total_players), 15)
-    else:
-        rows, total_players = cached
-
-    current_uid = current_user["firebase_uid"] if current_user else None
-    current_user_rank = None
+        total_players = int(total_players or 0)
 
-    entries = []
-    for row in rows:
-        is_me = current_uid and row['firebase_uid'] == current_uid
-        entry = AllTimeLeaderboardEntry(
-            rank=int(row['rank']),
-            display_name=row['display_name'] or "Anonymous",
-            lifetime_score=int(row['lifetime_score']),
-            games_played=int(row['games_played']),
-            accuracy_pct=float(row['accuracy_pct']),
-            best_streak=int(row['best_streak']),
-            is_current_user=bool(is_me),
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No games played yet"
         )
-        entries.append(entry)
-        if is_me:
-            current_user_rank = int(row['rank'])
 
-    return AllTimeLeaderboardResponse(
+    entries, current_user_rank = _all_time_entries(rows, lambda row: str(row['user_id']) == user_id)
+
+    return send(request, encode(AllTimeLeaderboardResponse(
         entries=entries,
         total_players=total_players,
         current_user_rank=current_user_rank,
-    )
+    )), MY_BOARD)
 
 
 @router.post("/daily/{pack_date}/submit")
 async def submit_daily_score(
     pack_date: str,
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """
     Submit a user's daily challenge score to the leaderboard.
     Called automatically when a daily challenge session ends.
     """
-    db = get_db_connector()
-
-    # Get user
-    user_df = db.select_df(
-        "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-        params={"firebase_uid": current_user["firebase_uid"]}
-    )
-
-    if user_df.empty:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_id = user_df.iloc[0]['id']
+    db = get_async_db()
+    target_date = _parse_pack_date(pack_date)
 
     # Get user's daily session score
-    session_df = db.select_df(
+    score = await db.fetch_scalar(
         """
         SELECT total_score
         FROM ofta_prod.ofta_game_session
@@ -256,19 +581,19 @@ async def submit_daily_score(
         ORDER BY total_score DESC
         LIMIT 1
         """,
-        params={"user_id": user_id, "pack_date": pack_date}
+        params={"user_id": user_id, "pack_date": target_date}
     )
 
-    if session_df.empty:
+    if score is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No completed daily session found for this date"
         )
 
-    score = int(session_df.iloc[0]['total_score'])
+    score = int(score)
 
     # Upsert leaderboard entry (keep best score)
-    db.execute_query(
+    await db.execute(
         """
         INSERT INTO ofta_prod.ofta_leaderboard_daily (pack_date, user_id, score, submitted_at_tms)
         VALUES (:pack_date, :user_id, :score, NOW())
@@ -276,9 +601,10 @@ async def submit_daily_score(
         DO UPDATE SET score = GREATEST(ofta_prod.ofta_leaderboard_daily.score, EXCLUDED.score),
                       submitted_at_tms = NOW()
         """,
-        params={"pack_date": pack_date, "user_id": user_id, "score": score}
+        params={"pack_date": target_date, "user_id": user_id, "score": score}
     )
 
-    _cache_drop_daily(pack_date)
+    await leaderboard_cache.invalidate_prefix("daily", pack_date)
+    await response_cache.invalidate_prefix("lb-daily", pack_date)
 
     return {"status": "submitted", "score": score}
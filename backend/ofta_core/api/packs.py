@@ -3,17 +3,25 @@
 Daily Pack endpoints for OFTA
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, date
+import json
 import uuid
 
-from ofta_core.utils.firebase_auth import get_current_user, get_optional_user
-from ofta_core.utils.util_db import get_db_connector
+from ofta_core.utils.firebase_auth import get_current_user
+from ofta_core.utils.pack_builder import get_daily_pack as load_daily_pack
+from ofta_core.utils.response_cache import PERSONAL, CachePolicy, EncodedResponse, encode, make_etag, send
+from ofta_core.utils.user_identity import get_optional_user_id, resolve_user
+from ofta_core.utils.util_async_db import get_async_db
 
 router = APIRouter()
 
+# A served pack never changes; a signed-in caller's copy carries their score
+PAST_PACK = CachePolicy(max_age=31536000, public=True, immutable=True)
+CURRENT_PACK = CachePolicy(max_age=300, public=True)
+
 
 # ────────────────────────────────────────────────
 # Response Models
@@ -50,14 +58,16 @@ class DailyPackResponse(BaseModel):
 
 @router.get("/daily/{pack_date}", response_model=DailyPackResponse)
 async def get_daily_pack(
+    request: Request,
     pack_date: str,
-    current_user: Optional[dict] = Depends(get_optional_user)
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
     """
     Get the daily challenge pack for a specific date.
-    If no pack exists, generate one on the fly from random questions.
+    Packs are built ahead by the pack builder; a missing one is built on demand.
+    The questions are served as cached JSON; only the completion fields are per user.
     """
-    db = get_db_connector()
+    db = get_async_db()
 
     # Validate date format
     try:
@@ -68,145 +78,82 @@ async def get_daily_pack(
             detail="Invalid date format. Use YYYY-MM-DD"
         )
 
-    # Check if pack exists
-    pack_df = db.select_df(
-        "SELECT * FROM ofta_prod.ofta_daily_pack WHERE pack_date = :pack_date",
-        params={"pack_date": target_date}
-    )
-
-    # Generate a pack on the fly if none exists
-    # Use a deterministic seed based on date for consistency
-    questions_df = db.select_df(
-        """
-        SELECT
-            qt.id,
-            qt.mode,
-            qt.difficulty,
-            qt.person_id,
-            qt.person_id_a,
-            qt.person_id_b,
-            c.id as celeb_id,
-            c.full_name as celeb_name,
-            c.primary_category as celeb_category,
-            c.nationality as celeb_nationality,
-            c.hints_easy as celeb_hints,
-            ca.id as celeb_a_id,
-            ca.full_name as celeb_a_name,
-            ca.primary_category as celeb_a_category,
-            ca.nationality as celeb_a_nationality,
-            ca.hints_easy as celeb_a_hints,
-            cb.id as celeb_b_id,
-            cb.full_name as celeb_b_name,
-            cb.primary_category as celeb_b_category,
-            cb.nationality as celeb_b_nationality,
-            cb.hints_easy as celeb_b_hints
-        FROM ofta_prod.ofta_question_template qt
-        LEFT JOIN ofta_prod.ofta_person c ON qt.person_id = c.id
-        LEFT JOIN ofta_prod.ofta_person ca ON qt.person_id_a = ca.id
-        LEFT JOIN ofta_prod.ofta_person cb ON qt.person_id_b = cb.id
-        WHERE qt.is_active = TRUE
-        ORDER BY md5(qt.id::text || :date_seed)
-        LIMIT 10
-        """,
-        params={"date_seed": pack_date}
-    )
-
-    if questions_df.empty:
+    pack = await load_daily_pack(target_date)
+    if pack is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No questions available for daily pack on {pack_date}"
         )
 
-    # Format questions
-    questions = []
-    for _, row in questions_df.iterrows():
-        q = PackQuestion(
-            id=str(row['id']),
-            mode=row['mode'],
-            difficulty=row['difficulty'],
-        )
-
-        if row['person_id'] is not None:
-            q.person = PersonBrief(
-                id=str(row['celeb_id']),
-                full_name=row['celeb_name'],
-                primary_category=row['celeb_category'],
-                nationality=row.get('celeb_nationality'),
-                hints_easy=row.get('celeb_hints', []) or [],
-            )
-
-        if row['person_id_a'] is not None:
-            q.person_a = PersonBrief(
-                id=str(row['celeb_a_id']),
-                full_name=row['celeb_a_name'],
-                primary_category=row['celeb_a_category'],
-                nationality=row.get('celeb_a_nationality'),
-                hints_easy=row.get('celeb_a_hints', []) or [],
-            )
-            q.person_b = PersonBrief(
-                id=str(row['celeb_b_id']),
-                full_name=row['celeb_b_name'],
-                primary_category=row['celeb_b_category'],
-                nationality=row.get('celeb_b_nationality'),
-                hints_easy=row.get('celeb_b_hints', []) or [],
-            )
-
-        questions.append(q)
-
     # Check if user has already completed this daily
     is_completed = False
     user_score = None
-    if current_user:
-        user_df = db.select_df(
-            "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-            params={"firebase_uid": current_user["firebase_uid"]}
+    if user_id is not None:
+        score = await db.fetch_scalar(
+            """
+            SELECT score FROM ofta_prod.ofta_leaderboard_daily
+            WHERE pack_date = :pack_date AND user_id = :user_id
+            """,
+            params={"pack_date": target_date, "user_id": user_id}
         )
-        if not user_df.empty:
-            lb_df = db.select_df(
-                """
-                SELECT score FROM ofta_prod.ofta_leaderboard_daily
-                WHERE pack_date = :pack_date AND user_id = :user_id
-                """,
-                params={"pack_date": target_date, "user_id": user_df.iloc[0]['id']}
-            )
-            if not lb_df.empty:
-                is_completed = True
-                user_score = int(lb_df.iloc[0]['score'])
-
-    return DailyPackResponse(
-        pack_date=pack_date,
-        questions=questions,
-        question_count=len(questions),
-        is_completed=is_completed,
-        user_score=user_score,
+        if score is not None:
+            is_completed = True
+            user_score = int(score)
+
+    # Same shape as DailyPackResponse, without re-encoding the questions. The
+    # pack never changes, so its hash plus the caller's score is the version.
+    body = (
+        f'{{"pack_date":{json.dumps(pack_date)},"questions":{pack["questions"]},'
+        f'"question_count":{pack["question_count"]},"is_completed":{json.dumps(is_completed)},'
+        f'"user_score":{json.dumps(user_score)}}}'
     )
+    if user_id is not None:
+        policy = PERSONAL
+    elif target_date < date.today():
+        policy = PAST_PACK
+    else:
+        policy = CURRENT_PACK
+    encoded = EncodedResponse(body, make_etag(pack["pack_hash"], user_score), pack.get("created_at"))
+    return send(request, encoded, policy)
 
 
 @router.get("/daily/{pack_date}/status")
 async def get_pack_status(
+    request: Request,
     pack_date: str,
     current_user: dict = Depends(get_current_user)
 ):
     """Check if user has completed today's daily challenge."""
-    db = get_db_connector()
+    db = get_async_db()
 
-    user_df = db.select_df(
-        "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-        params={"firebase_uid": current_user["firebase_uid"]}
-    )
+    try:
+        target_date = datetime.strptime(pack_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use YYYY-MM-DD"
+        )
 
-    if user_df.empty:
-        return {"completed": False, "score": None}
+    # Unregistered callers just haven't completed it; banned ones are refused
+    # like on every other authenticated endpoint
+    identity = await resolve_user(current_user["firebase_uid"])
+    if identity is None:
+        return send(request, encode({"completed": False, "score": None}))
+    if identity.is_banned:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account suspended"
+        )
 
-    lb_df = db.select_df(
+    score = await db.fetch_scalar(
         """
         SELECT score FROM ofta_prod.ofta_leaderboard_daily
         WHERE pack_date = :pack_date AND user_id = :user_id
         """,
-        params={"pack_date": pack_date, "user_id": user_df.iloc[0]['id']}
+        params={"pack_date": target_date, "user_id": identity.user_id}
     )
 
-    if lb_df.empty:
-        return {"completed": False, "score": None}
+    if score is None:
+        return send(request, encode({"completed": False, "score": None}))
 
-    return {"completed": True, "score": int(lb_df.iloc[0]['score'])}
+    return send(request, encode({"completed": True, "score": int(score)}))
@@ -3,20 +3,34 @@
 Game session endpoints for OFTA
 """
 
-import os
 import json
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
+from functools import partial
 import uuid
 
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from ofta_core.utils.firebase_auth import get_current_user
-from ofta_core.utils.util_db import get_db_connector
+from ofta_core.utils.attempt_writer import (
+    DuplicateAnswerError, SessionClosedError, get_attempt_writer,
+)
+from ofta_core.utils.feature_gate import mode_enabled
+from ofta_core.utils.pack_builder import get_daily_pack
+from ofta_core.utils.question_format import format_questions
+from ofta_core.utils.question_pool import get_question_pool
+from ofta_core.utils.question_sampler import sample_templates
+from ofta_core.utils.rank_index import get_rank_index
+from ofta_core.utils.scoring import (
+    MIN_HUMAN_RESPONSE_MS, ScoredAnswer, answer_key_from_row, score_answer,
+)
+from ofta_core.utils.seen_filter import get_seen_store
+from ofta_core.utils.session_state import SessionState, get_session_store
+from ofta_core.utils.user_identity import get_current_user_id
+from ofta_core.utils.util_async_db import as_date, get_async_db
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +44,8 @@ limiter = Limiter(key_func=get_remote_address)
 
 VALID_DB_CATEGORIES = {"Footballer", "Actor", "Actress", "Musician"}
 
-# Percentile bounds within each category (PERCENT_RANK 0–1)
+# Percentile bounds within each category (ofta_person.pop_pct, 0–1), mirrored
+# by the difficulty_band thresholds in ofta_refresh_popularity_pct()
 # Easy   = top third by popularity (most recognisable)
 # Medium = middle third
 # Hard   = bottom third (most obscure)
@@ -121,147 +136,93 @@ class EndSessionResponse(BaseModel):
 async def start_session(
     request: Request,
     body: StartSessionRequest,
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """
     Start a new game session.
     Generates questions based on mode.
     """
-    db = get_db_connector()
-    
-    # Dev mock - only in development environment
-    is_dev = current_user.get("firebase_uid") == "dev_user_123"
-    if is_dev:
-        if os.getenv("ENVIRONMENT") != "development":
-            raise HTTPException(status_code=403, detail="Dev users not allowed in this environment")
-        user_id = "00000000-0000-0000-0000-000000000001"
-    else:
-        # Get user from database
-        user_df = db.select_df(
-            "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-            params={"firebase_uid": current_user["firebase_uid"]}
+    if not mode_enabled(body.mode):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{body.mode} is temporarily disabled",
         )
 
-        if user_df.empty:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found. Please register first."
-            )
+    # Validate date format
+    try:
+        pack_date = as_date(body.pack_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use YYYY-MM-DD"
+        )
 
-        user_id = user_df.iloc[0]['id']
+    db = get_async_db()
     session_id = str(uuid.uuid4())
     
-    import pandas as pd
     num_questions = 10
 
     db_cats = [c for c in (body.categories or []) if c in VALID_DB_CATEGORIES]
 
-    def _cat_filter(alias: str) -> str:
-        if not db_cats:
-            return ""
-        placeholders = ", ".join(f"'{c}'" for c in db_cats)
-        return f"AND {alias}.primary_category IN ({placeholders})"
-
-    daily_date_seed = body.pack_date or date.today().strftime('%Y-%m-%d')
-
-    def _fetch(mode: str, limit: int, pct_min: float, pct_max: float) -> "pd.DataFrame":
-        if mode == "WHO_OLDER":
-            return db.select_df(
-                f"""
-                WITH pool AS (
-                    SELECT DISTINCT c.id, c.primary_category, c.popularity_score
-                    FROM ofta_prod.ofta_question_template qt
-                    JOIN ofta_prod.ofta_person c ON qt.person_id_a = c.id OR qt.person_id_b = c.id
-                    WHERE qt.mode = 'WHO_OLDER' AND qt.is_active = TRUE
-                      AND c.image_url IS NOT NULL AND c.image_url != ''
-                ),
-                ranked AS (
-                    SELECT id,
-                           PERCENT_RANK() OVER (
-                               PARTITION BY primary_category ORDER BY popularity_score
-                           ) AS pop_pct
-                    FROM pool
-                )
-                SELECT qt.id, qt.mode, qt.person_id_a, qt.person_id_b, qt.difficulty,
-                       ca.full_name AS person_name_a, cb.full_name AS person_name_b,
-                       ca.image_url AS person_image_url_a, cb.image_url AS person_image_url_b,
-                       ca.hints_easy AS hints_a, cb.hints_easy AS hints_b,
-                       ca.date_of_birth AS dob_a, cb.date_of_birth AS dob_b
-                FROM ofta_prod.ofta_question_template qt
-                JOIN ofta_prod.ofta_person ca ON qt.person_id_a = ca.id
-                JOIN ofta_prod.ofta_person cb ON qt.person_id_b = cb.id
-                JOIN ranked ra ON ra.id = ca.id
-                JOIN ranked rb ON rb.id = cb.id
-                WHERE qt.mode = 'WHO_OLDER' AND qt.is_active = TRUE
-                  AND ca.image_url IS NOT NULL AND ca.image_url != ''
-                  AND cb.image_url IS NOT NULL AND cb.image_url != ''
-                  AND ra.pop_pct >= :pct_min AND ra.pop_pct < :pct_max
-                  AND rb.pop_pct >= :pct_min AND rb.pop_pct < :pct_max
-                  {_cat_filter('ca')} {_cat_filter('cb')}
-                ORDER BY RANDOM() LIMIT :limit
-                """,
-                params={"limit": limit, "pct_min": pct_min, "pct_max": pct_max},
-            )
-        is_daily = mode == "DAILY_CHALLENGE"
-        order_clause = "HASHTEXT(qt.id::text || :date_seed)" if is_daily else "RANDOM()"
-        params: dict = {"mode": mode, "limit": limit, "pct_min": pct_min, "pct_max": pct_max}
-        if is_daily:
-            params["date_seed"] = daily_date_seed
-        return db.select_df(
-            f"""
-            WITH pool AS (
-                SELECT DISTINCT c.id, c.primary_category, c.popularity_score
-                FROM ofta_prod.ofta_question_template qt
-                JOIN ofta_prod.ofta_person c ON qt.person_id = c.id
-                WHERE qt.mode = :mode AND qt.is_active = TRUE
-                  AND c.image_url IS NOT NULL AND c.image_url != ''
-            ),
-            ranked AS (
-                SELECT id,
-                       PERCENT_RANK() OVER (
-                           PARTITION BY primary_category ORDER BY popularity_score
-                       ) AS pop_pct
-                FROM pool
-            )
+    # DAILY_CHALLENGE rows when the pool index lacks a pack template
+    async def _fetch_by_ids(template_ids: List[str]) -> List[dict]:
+        return await db.select(
+            """
             SELECT qt.id, qt.mode, qt.person_id, qt.difficulty,
                    c.full_name AS person_name, c.image_url AS person_image_url,
                    c.hints_easy AS hints, c.star_sign, c.date_of_birth,
                    EXTRACT(YEAR FROM c.date_of_birth) AS dob_year
             FROM ofta_prod.ofta_question_template qt
             JOIN ofta_prod.ofta_person c ON qt.person_id = c.id
-            JOIN ranked r ON r.id = c.id
-            WHERE qt.mode = :mode AND qt.is_active = TRUE
-              AND c.image_url IS NOT NULL AND c.image_url != ''
-              AND r.pop_pct >= :pct_min AND r.pop_pct < :pct_max
-              {_cat_filter('c')}
-            ORDER BY {order_clause} LIMIT :limit
+            WHERE qt.id = ANY(CAST(:ids AS uuid[]))
+            ORDER BY array_position(CAST(:ids AS uuid[]), qt.id)
             """,
-            params=params,
+            params={"ids": template_ids},
         )
 
     diff = body.difficulty or "easy"
+    plan = (
+        [(b["key"], b["count"]) for b in ESCALATING_BATCHES]
+        if diff == "escalating" else [(diff, num_questions)]
+    )
 
-    if diff == "escalating":
-        batches, spreads = [], []
-        for batch in ESCALATING_BATCHES:
-            cfg = DIFFICULTY_CONFIG[batch["key"]]
-            df = _fetch(body.mode, batch["count"], cfg["pct_min"], cfg["pct_max"])
-            batches.append(df)
-            spreads.extend([cfg["spread"]] * len(df))
-        questions_df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+    question_pool = get_question_pool()
+    seen_store = get_seen_store()
+    rows, spreads = [], []
+    if body.mode == "DAILY_CHALLENGE":
+        # Everyone plays the persisted pack for the date (the same one
+        # /v1/packs/daily shows); categories and difficulty do not apply
+        pack = await get_daily_pack(pack_date or date.today())
+        if pack is not None:
+            picked = question_pool.by_ids(pack["template_ids"]) if question_pool.ready else None
+            if picked is not None:
+                rows = [t.to_row() for t in picked]
+            else:
+                rows = await _fetch_by_ids(pack["template_ids"])
+        spreads = [DIFFICULTY_CONFIG["easy"]["spread"]] * len(rows)
     else:
-        cfg = DIFFICULTY_CONFIG[diff]
-        questions_df = _fetch(body.mode, num_questions, cfg["pct_min"], cfg["pct_max"])
-        spreads = [cfg["spread"]] * len(questions_df)
-    
-    if questions_df.empty:
+        # Templates this player was recently issued go last
+        seen = await seen_store.get(user_id) if seen_store is not None else None
+        for key, count in plan:
+            cfg = DIFFICULTY_CONFIG[key]
+            if question_pool.ready:
+                # In-memory index: no DB round trip for question selection
+                picked = question_pool.sample(body.mode, key, count, db_cats, seen=seen)
+                batch = [t.to_row() for t in picked]
+            else:
+                # DB fallback: indexed random sample, see question_sampler
+                batch = await sample_templates(db, body.mode, key, count, db_cats, seen=seen)
+            rows.extend(batch)
+            spreads.extend([cfg["spread"]] * len(batch))
+
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No questions available for mode: {body.mode}"
         )
     
     # Create session
-    db.execute_query(
+    await db.execute(
         """
         INSERT INTO ofta_prod.ofta_game_session (
             id, user_id, mode, pack_date, started_at_tms
@@ -273,100 +234,27 @@ async def start_session(
             "id": session_id,
             "user_id": user_id,
             "mode": body.mode,
-            "pack_date": body.pack_date,
+            "pack_date": pack_date,
         }
     )
-    
-    # Format questions
-    questions = []
-    import random
-    
-    ZODIAC_SIGNS = [
-        "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
-        "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
-    ]
-    
-    for i, (_, row) in enumerate(questions_df.iterrows()):
-        question = QuestionResponse(
-            id=str(row['id']),
-            mode=row['mode'],
-            difficulty=row['difficulty'],
-            hints=row.get('hints', []) or []
-        )
 
-        if body.mode == "WHO_OLDER":
-            question.person_id_a = str(row['person_id_a'])
-            question.person_id_b = str(row['person_id_b'])
-            question.person_name_a = row['person_name_a']
-            question.person_name_b = row['person_name_b']
-            question.person_image_url_a = row.get('person_image_url_a')
-            question.person_image_url_b = row.get('person_image_url_b')
-            dob_a = row.get('dob_a')
-            dob_b = row.get('dob_b')
-            if dob_a is not None and dob_b is not None:
-                if isinstance(dob_a, str):
-                    dob_a = datetime.strptime(dob_a, '%Y-%m-%d').date()
-                elif hasattr(dob_a, 'to_pydatetime'):
-                    dob_a = dob_a.to_pydatetime().date()
-                if isinstance(dob_b, str):
-                    dob_b = datetime.strptime(dob_b, '%Y-%m-%d').date()
-                elif hasattr(dob_b, 'to_pydatetime'):
-                    dob_b = dob_b.to_pydatetime().date()
-                question.correct_answer = {
-                    "choice": "A" if dob_a < dob_b else "B",
-                    "year_a": dob_a.year,
-                    "year_b": dob_b.year,
-                }
-        else:
-            question.person_id = str(row['person_id'])
-            question.person_name = row['person_name']
-            question.person_image_url = row.get('person_image_url')
-
-            if body.mode == "REVERSE_SIGN":
-                correct_sign = row['star_sign']
-                decoys = [s for s in ZODIAC_SIGNS if s != correct_sign]
-                options = random.sample(decoys, 8) + [correct_sign]
-                random.shuffle(options)
-                question.options = options
-                question.correct_answer = {"sign": correct_sign}
-
-            elif body.mode == "REVERSE_DOB":
-                correct_year = int(row['dob_year'])
-                offsets = [-3, -2, -1, 1, 2, 3, 4, 5]
-                options = [correct_year + o for o in offsets] + [correct_year]
-                random.shuffle(options)
-                question.options = options
-                question.correct_answer = {"year": correct_year}
-
-            elif body.mode in ("AGE_GUESS", "DAILY_CHALLENGE"):
-                dob = row['date_of_birth']
-                if hasattr(dob, 'to_pydatetime'):
-                    dob = dob.to_pydatetime().date()
-                elif isinstance(dob, datetime):
-                    dob = dob.date()
-                elif isinstance(dob, str):
-                    dob = datetime.strptime(dob, '%Y-%m-%d').date()
-
-                today = date.today()
-                correct_age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-
-                spread = spreads[i]
-                pool = set()
-                s = spread
-                while len(pool) < 3:
-                    for d in range(-s, s + 1):
-                        v = correct_age + d
-                        if d != 0 and 16 <= v <= 100:
-                            pool.add(v)
-                    s += 1
-                distractors = random.sample(list(pool), 3)
-                options = distractors + [correct_age]
-                random.shuffle(options)
-                question.options = options
-                question.correct_answer = {"age": correct_age}
-        
-        questions.append(question)
-    
+    # Issued questions and answer keys, so submit_answer skips the lookups.
+    # The session row exists already; without state answers take the database path
+    try:
+        await get_session_store().put(SessionState(
+            session_id=session_id,
+            user_id=user_id,
+            mode=body.mode,
+            questions=[str(row['id']) for row in rows],
+            answer_keys={str(row['id']): answer_key_from_row(body.mode, row) for row in rows},
+        ))
+    except Exception as e:
+        logger.warning(f"Session state not stored for {session_id}: {e}")
+    if seen_store is not None:
+        seen_store.record(user_id, [str(row['id']) for row in rows])
+
+    questions = [QuestionResponse(**q) for q in format_questions(body.mode, rows, spreads)]
+
     return SessionResponse(
         id=session_id,
         mode=body.mode,
@@ -379,48 +267,91 @@ async def start_session(
 async def submit_answer(
     session_id: str,
     request: SubmitAnswerRequest,
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """
     Submit an answer for a question in a session.
     Returns scoring and correctness.
     """
-    db = get_db_connector()
-    
-    # Verify session belongs to user
-    session_df = db.select_df(
+    # Anti-cheat: flag suspiciously fast responses
+    if request.response_time_ms < MIN_HUMAN_RESPONSE_MS:
+        logger.warning(
+            f"Suspiciously fast answer: {request.response_time_ms}ms "
+            f"from session {session_id}, question {request.question_index}"
+        )
+
+    db = get_async_db()
+    writer = get_attempt_writer()
+    store = get_session_store()
+
+    # Session state: validate and score without the session/question queries
+    state = await store.get(session_id)
+    if state is not None:
+        if state.user_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized to submit answers for this session"
+            )
+        if state.closed:
+            raise _session_ended()
+        if state.issued_template(request.question_index) != request.question_template_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Question was not issued in this session"
+            )
+        if request.question_index in state.answered:
+            raise _already_answered()
+
+        scored = await _record_attempt(
+            db, writer, session_id, request,
+            partial(score_answer, state.mode, state.answer_keys[request.question_template_id],
+                    request.user_answer, request.hints_used, request.response_time_ms),
+            state.current_streak,
+        )
+        try:
+            await store.record_answer(
+                session_id, request.question_index, scored.is_correct,
+                scored.score_awarded, scored.streak_after,
+            )
+        except Exception as e:
+            # The attempt is recorded; the client still gets its score
+            logger.warning(f"Session state not updated for {session_id}: {e}")
+            await _drop_session_state(store, session_id)
+        return _answer_response(scored)
+
+    # No state (expired, evicted or held by another worker): database path
+    session = await db.fetch_one(
         """
-        SELECT gs.id, gs.mode, ua.firebase_uid
+        SELECT gs.id, gs.mode, gs.user_id, gs.ended_at_tms, gs.current_streak,
+               EXISTS (
+                   SELECT 1 FROM ofta_prod.ofta_question_attempt qa
+                   WHERE qa.session_id = gs.id AND qa.question_index = :question_index
+               ) AS answered
         FROM ofta_prod.ofta_game_session gs
-        JOIN ofta_prod.ofta_user_account ua ON gs.user_id = ua.id
         WHERE gs.id = :session_id
         """,
-        params={"session_id": session_id}
+        params={"session_id": session_id, "question_index": request.question_index}
     )
     
-    if session_df.empty:
+    if session is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Session not found"
         )
     
-    if session_df.iloc[0]['firebase_uid'] != current_user["firebase_uid"]:
+    if str(session['user_id']) != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to submit answers for this session"
         )
-    
-    mode = session_df.iloc[0]['mode']
 
-    # Anti-cheat: flag suspiciously fast responses
-    if request.response_time_ms < 200:
-        logger.warning(
-            f"Suspiciously fast answer: {request.response_time_ms}ms "
-            f"from session {session_id}, question {request.question_index}"
-        )
+    if session['ended_at_tms'] is not None:
+        raise _session_ended()
+    
+    mode = session['mode']
 
     # Get question and person data
-    question_df = db.select_df(
+    question = await db.fetch_one(
         """
         SELECT 
             qt.*,
@@ -437,394 +368,259 @@ async def submit_answer(
         params={"question_id": request.question_template_id}
     )
     
-    if question_df.empty:
+    if question is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Question not found"
         )
-    
-    question = question_df.iloc[0]
-    
-    # Calculate correctness and score
-    is_correct = False
-    correct_answer = {}
-    error_value = None
-    score_awarded = 0
-    
-    if mode in ("AGE_GUESS", "DAILY_CHALLENGE"):
-        dob = question['date_of_birth']
-        if isinstance(dob, str):
-            dob = datetime.strptime(dob, '%Y-%m-%d').date()
-
-        # Calendar age — must match start_session's calc exactly, days//365 drifts on leap years
-        today = date.today()
-        correct_age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-        user_age = request.user_answer.get('age', 0)
-        error_value = abs(correct_age - user_age)
-        
-        # Scoring: Perfect = 100, within 1 year = 80, within 2 = 60, etc.
-        if error_value == 0:
-            score_awarded = 100
-            is_correct = True
-        elif error_value <= 1:
-            score_awarded = 80
-            is_correct = True
-        elif error_value <= 2:
-            score_awarded = 60
-        elif error_value <= 3:
-            score_awarded = 40
-        elif error_value <= 5:
-            score_awarded = 20
-        
-        # Apply hint penalty
-        if request.hints_used > 0:
-            score_awarded = int(score_awarded * 0.8)
-        
-        correct_answer = {"age": correct_age}
-    
-    elif mode == "WHO_OLDER":
-        dob_a = question['dob_a']
-        dob_b = question['dob_b']
-        
-        if isinstance(dob_a, str):
-            dob_a = datetime.strptime(dob_a, '%Y-%m-%d').date()
-        if isinstance(dob_b, str):
-            dob_b = datetime.strptime(dob_b, '%Y-%m-%d').date()
-        
-        correct_choice = 'A' if dob_a < dob_b else 'B'
-        user_choice = request.user_answer.get('choice', '')
-        
-        is_correct = user_choice == correct_choice
-        score_awarded = 100 if is_correct else 0
-        correct_answer = {
-            "choice": correct_choice,
-            "year_a": dob_a.year if hasattr(dob_a, 'year') else None,
-            "year_b": dob_b.year if hasattr(dob_b, 'year') else None,
-        }
 
-    elif mode == "REVERSE_SIGN":
-        correct_sign = question['star_sign']
-        user_sign = request.user_answer.get('sign', '')
-        
-        is_correct = user_sign == correct_sign
-        score_awarded = 50 if is_correct else 0
-        correct_answer = {"sign": correct_sign}
-
-    elif mode == "REVERSE_DOB":
-        dob = question['date_of_birth']
-        if isinstance(dob, str):
-            dob = datetime.strptime(dob, '%Y-%m-%d').date()
-        
-        correct_year = dob.year
-        user_year = int(request.user_answer.get('year', 0))
-        
-        is_correct = user_year == correct_year
-        score_awarded = 50 if is_correct else 0
-        correct_answer = {"year": correct_year}
-    
-    # Anti-cheat: sub-200ms is below the human reaction floor — void the answer
-    if request.response_time_ms < 200:
-        is_correct = False
-        score_awarded = 0
-
-    # Calculate current streak from prior attempts in this session
-    streak_df = db.select_df(
-        """
-        SELECT is_correct
-        FROM ofta_prod.ofta_question_attempt
-        WHERE session_id = :session_id
-        ORDER BY question_index DESC
-        """,
-        params={"session_id": session_id}
+    if session['answered']:
+        raise _already_answered()
+
+    # Running streak kept on the session row by the attempt insert
+    current_streak = int(session['current_streak'] or 0)
+    if writer is not None:
+        # Answers still journaled, here or on another instance, are newer
+        pending = await writer.pending_rows(session_id)
+        if any(r['question_index'] == request.question_index for r in pending):
+            raise _already_answered()
+        if pending:
+            last = max(pending, key=lambda r: r['question_index'])
+            current_streak = last['streak_at_time'] if last['is_correct'] else 0
+
+    scored = await _record_attempt(
+        db, writer, session_id, request,
+        partial(score_answer, mode, answer_key_from_row(mode, question),
+                request.user_answer, request.hints_used, request.response_time_ms),
+        current_streak,
     )
-    current_streak = 0
-    for _, attempt_row in streak_df.iterrows():
-        if attempt_row['is_correct']:
-            current_streak += 1
-        else:
-            break
-
-    # Apply streak bonus multiplier
-    streak_bonus = 1.0
-    if is_correct:
-        current_streak += 1  # Include the current correct answer
-        if current_streak >= 10:
-            streak_bonus = 2.0
-        elif current_streak >= 5:
-            streak_bonus = 1.5
-        elif current_streak >= 3:
-            streak_bonus = 1.2
-
-        if streak_bonus > 1.0:
-            score_awarded = int(score_awarded * streak_bonus)
-
-    # Record attempt
-    db.execute_query(
-        """
-        INSERT INTO ofta_prod.ofta_question_attempt (
-            session_id, question_template_id, question_index,
-            shown_at_tms, answered_at_tms, response_time_ms,
-            user_answer, is_correct, error_value,
-            hints_used, score_awarded, streak_at_time
-        ) VALUES (
-            :session_id, :question_template_id, :question_index,
-            NOW(), NOW(), :response_time_ms,
-            CAST(:user_answer AS jsonb), :is_correct, :error_value,
-            :hints_used, :score_awarded, :streak_at_time
-        )
-        """,
-        params={
+    return _answer_response(scored)
+
+
+async def _record_attempt(db, writer, session_id: str, request: SubmitAnswerRequest,
+                          score, streak_before: int) -> ScoredAnswer:
+    """
+    Score and write one attempt, through the write-behind journal when it is running.
+
+    score(streak) scores the answer given the streak before it. streak_before
+    is the caller's view, which session state on another worker may have
+    outrun; in sync mode the session row decides, and the answer is rescored
+    when it disagrees.
+    """
+    def _attempt(scored) -> dict:
+        return {
             "session_id": session_id,
             "question_template_id": request.question_template_id,
             "question_index": request.question_index,
             "response_time_ms": request.response_time_ms,
             "user_answer": json.dumps(request.user_answer),
-            "is_correct": is_correct,
-            "error_value": error_value,
+            "is_correct": scored.is_correct,
+            "error_value": scored.error_value,
             "hints_used": request.hints_used,
-            "score_awarded": score_awarded,
-            "streak_at_time": current_streak,
+            "score_awarded": scored.score_awarded,
+            "streak_at_time": scored.streak_at_time,
         }
+
+    if writer is not None:
+        # Write-behind: acknowledged once journaled, flushed in batches
+        scored = score(streak_before)
+        now = datetime.utcnow().isoformat()
+        try:
+            await writer.submit({**_attempt(scored), "shown_at_tms": now, "answered_at_tms": now})
+        except SessionClosedError:
+            raise _session_ended()
+        except DuplicateAnswerError:
+            raise _already_answered()
+        return scored
+
+    # Each pass either records the answer or sees another answer of the
+    # session that landed meanwhile, so this ends within the session's length
+    while True:
+        scored = score(streak_before)
+        result = await db.fetch_one(
+            _INSERT_ATTEMPT_SQL, params={**_attempt(scored), "streak_before": streak_before}
+        )
+        if result is None:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to record answer"
+            )
+        if result['current_streak'] is None:
+            raise _session_ended()
+        if result['recorded']:
+            return scored
+        if result['current_streak'] == streak_before:
+            raise _already_answered()
+        streak_before = result['current_streak']
+
+
+# The session row is locked, so the streak it holds is the one this answer
+# follows; the insert only goes ahead while the session is open and that
+# streak is the one the answer was scored with. current_streak comes back
+# NULL when the session has ended (or does not exist).
+_INSERT_ATTEMPT_SQL = """
+    WITH s AS (
+        SELECT id, current_streak
+        FROM ofta_prod.ofta_game_session
+        WHERE id = :session_id AND ended_at_tms IS NULL
+        FOR UPDATE
+    ), ins AS (
+        INSERT INTO ofta_prod.ofta_question_attempt (
+            session_id, question_template_id, question_index,
+            shown_at_tms, answered_at_tms, response_time_ms,
+            user_answer, is_correct, error_value,
+            hints_used, score_awarded, streak_at_time
+        )
+        SELECT s.id, CAST(:question_template_id AS uuid), CAST(:question_index AS int),
+               NOW(), NOW(), CAST(:response_time_ms AS int),
+               CAST(:user_answer AS jsonb), CAST(:is_correct AS boolean), CAST(:error_value AS numeric),
+               CAST(:hints_used AS int), CAST(:score_awarded AS int), CAST(:streak_at_time AS int)
+        FROM s
+        WHERE s.current_streak = CAST(:streak_before AS int)
+        ON CONFLICT DO NOTHING
+        RETURNING session_id, is_correct, streak_at_time
+    ), upd AS (
+        UPDATE ofta_prod.ofta_game_session gs
+        SET current_streak = CASE WHEN ins.is_correct THEN ins.streak_at_time ELSE 0 END,
+            best_streak    = GREATEST(gs.best_streak, ins.streak_at_time)
+        FROM ins
+        WHERE gs.id = ins.session_id
+        RETURNING gs.id
+    )
+    SELECT (SELECT current_streak FROM s) AS current_streak,
+           EXISTS (SELECT 1 FROM upd) AS recorded
+"""
+
+
+def _session_ended() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Session has already ended"
+    )
+
+
+def _session_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Session not found"
+    )
+
+
+def _not_authorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Not authorized"
     )
 
+
+def _already_answered() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Answer already submitted for this question"
+    )
+
+
+async def _drop_session_state(store, session_id: str) -> None:
+    """Best effort: state that missed an answer must not validate the next one."""
+    try:
+        await store.delete(session_id)
+    except Exception as e:
+        logger.warning(f"Session state not dropped for {session_id}: {e}")
+
+
+def _answer_response(scored) -> AnswerResponse:
     return AnswerResponse(
-        is_correct=is_correct,
-        score_awarded=score_awarded,
-        correct_answer=correct_answer,
-        error_value=error_value,
-        streak_bonus=streak_bonus if streak_bonus > 1.0 else None,
+        is_correct=scored.is_correct,
+        score_awarded=scored.score_awarded,
+        correct_answer=scored.correct_answer,
+        error_value=scored.error_value,
+        streak_bonus=scored.streak_bonus if scored.streak_bonus > 1.0 else None,
     )
 
 
 @router.post("/{session_id}/end", response_model=EndSessionResponse)
 async def end_session(
     session_id: str,
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """
     End a game session and calculate final stats.
+    Finalization (session totals, user stats, daily streak, achievements)
+    is one ofta_finalize_session() call; the rank comes from the rank index.
     """
-    db = get_db_connector()
-    
-    # Verify session
-    session_df = db.select_df(
-        """
-        SELECT gs.id, gs.user_id, gs.mode, ua.firebase_uid
-        FROM ofta_prod.ofta_game_session gs
-        JOIN ofta_prod.ofta_user_account ua ON gs.user_id = ua.id
-        WHERE gs.id = :session_id
-        """,
-        params={"session_id": session_id}
-    )
-    
-    if session_df.empty:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Session not found"
+    db = get_async_db()
+    store = get_session_store()
+    writer = get_attempt_writer()
+
+    state = await store.get(session_id)
+    if state is not None and state.user_id != user_id:
+        raise _not_authorized()
+    # Refuse late answers before the attempts are aggregated. With the memory
+    # backend this only reaches this worker; in sync mode the attempt insert
+    # also checks ended_at_tms, and write-behind needs the shared backend.
+    await store.close(session_id)
+
+    if writer is not None:
+        # Journaled answers have to reach the table first. Mark the session
+        # ended before draining so a late answer is refused rather than
+        # flushed after the aggregate.
+        owner = await db.fetch_scalar(
+            """
+            WITH s AS (
+                SELECT id, user_id FROM ofta_prod.ofta_game_session WHERE id = :session_id
+            ), ended AS (
+                UPDATE ofta_prod.ofta_game_session gs
+                SET ended_at_tms = NOW()
+                FROM s
+                WHERE gs.id = s.id AND s.user_id = :user_id AND gs.ended_at_tms IS NULL
+            )
+            SELECT user_id FROM s
+            """,
+            params={"session_id": session_id, "user_id": user_id}
         )
-    
-    if session_df.iloc[0]['firebase_uid'] != current_user["firebase_uid"]:
+        if owner is None:
+            raise _session_not_found()
+        if str(owner) != user_id:
+            raise _not_authorized()
+        writer.close_session(session_id)
+        await writer.drain(session_id)
+
+    result = await db.fetch_scalar(
+        "SELECT ofta_prod.ofta_finalize_session(:session_id, :user_id)",
+        params={"session_id": session_id, "user_id": user_id}
+    )
+    if result is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to finalize session"
         )
-    
-    # Calculate stats
-    stats_df = db.select_df(
-        """
-        SELECT 
-            COUNT(*) as questions_count,
-            SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) as correct_count,
-            SUM(score_awarded) as total_score
-        FROM ofta_prod.ofta_question_attempt
-        WHERE session_id = :session_id
-        """,
-        params={"session_id": session_id}
-    )
-    
-    stats = stats_df.iloc[0]
-    total_score = int(stats['total_score'] or 0)
-    questions_count = int(stats['questions_count'] or 0)
-    correct_count = int(stats['correct_count'] or 0)
-    
-    # Calculate best streak
-    attempts_df = db.select_df(
-        """
-        SELECT is_correct
-        FROM ofta_prod.ofta_question_attempt
-        WHERE session_id = :session_id
-        ORDER BY question_index
-        """,
-        params={"session_id": session_id}
-    )
-    
-    best_streak = 0
-    current_streak = 0
-    for _, row in attempts_df.iterrows():
-        if row['is_correct']:
-            current_streak += 1
-            best_streak = max(best_streak, current_streak)
-        else:
-            current_streak = 0
-    
-    # Update session
-    db.execute_query(
-        """
-        UPDATE ofta_prod.ofta_game_session
-        SET 
-            ended_at_tms = NOW(),
-            total_score = :total_score,
-            questions_count = :questions_count,
-            correct_count = :correct_count,
-            best_streak = :best_streak
-        WHERE id = :session_id
-        """,
-        params={
-            "session_id": session_id,
-            "total_score": total_score,
-            "questions_count": questions_count,
-            "correct_count": correct_count,
-            "best_streak": best_streak,
-        }
-    )
-    
-    accuracy = (correct_count / questions_count * 100) if questions_count > 0 else 0
-    user_id = session_df.iloc[0]['user_id']
-    session_mode = session_df.iloc[0]['mode']
-
-    # Calculate daily streak before upsert
-    existing_df = db.select_df(
-        "SELECT current_streak, updated_at_tms FROM ofta_prod.ofta_user_stats WHERE user_id = :user_id",
-        params={"user_id": user_id}
-    )
-    today = date.today()
-    if existing_df.empty:
-        new_daily_streak = 1
+    if result['status'] == 'not_found':
+        raise _session_not_found()
+    if result['status'] == 'forbidden':
+        raise _not_authorized()
+
+    await store.delete(session_id)
+
+    lifetime_score = int(result['lifetime_score'])
+    rank_index = get_rank_index()
+    if rank_index.ready:
+        rank_index.update(user_id, lifetime_score)
+        global_rank = rank_index.rank_of_score(lifetime_score)
     else:
-        ex = existing_df.iloc[0]
-        last_updated = ex['updated_at_tms']
-        prev_streak = int(ex['current_streak'] or 0)
-        if last_updated is None:
-            new_daily_streak = 1
-        else:
-            last_date = last_updated.date() if hasattr(last_updated, 'date') else date.fromisoformat(str(last_updated)[:10])
-            if last_date == today:
-                new_daily_streak = prev_streak
-            elif last_date == today - timedelta(days=1):
-                new_daily_streak = prev_streak + 1
-            else:
-                new_daily_streak = 1
-
-    # Upsert user stats
-    db.execute_query(
-        """
-        INSERT INTO ofta_prod.ofta_user_stats AS s (
-            user_id, lifetime_score, best_streak, current_streak,
-            games_played, total_correct, total_questions, accuracy_pct, updated_at_tms
-        )
-        VALUES (
-            :user_id, :score, :best_streak, :daily_streak,
-            1, :correct, :total, :accuracy, NOW()
+        rank_above = await db.fetch_scalar(
+            "SELECT COUNT(*) FROM ofta_prod.ofta_user_stats WHERE lifetime_score > :score",
+            params={"score": lifetime_score}
         )
-        ON CONFLICT (user_id) DO UPDATE SET
-            lifetime_score  = s.lifetime_score + :score,
-            best_streak     = GREATEST(s.best_streak, :best_streak),
-            current_streak  = :daily_streak,
-            games_played    = s.games_played + 1,
-            total_correct   = s.total_correct + :correct,
-            total_questions = s.total_questions + :total,
-            accuracy_pct    = (s.total_correct + :correct)::float
-                              / NULLIF(s.total_questions + :total, 0) * 100,
-            updated_at_tms  = NOW()
-        """,
-        params={
-            "user_id":       user_id,
-            "score":         total_score,
-            "best_streak":   best_streak,
-            "daily_streak":  new_daily_streak,
-            "correct":       correct_count,
-            "total":         questions_count,
-            "accuracy":      accuracy,
-        }
-    )
-
-    # Record daily challenge completion (guard prevents double-count on same-day replay)
-    if session_mode == 'DAILY_CHALLENGE':
-        db.execute_query(
-            """
-            UPDATE ofta_prod.ofta_user_stats
-            SET daily_challenges = COALESCE(daily_challenges, 0) + 1,
-                last_daily_date = CURRENT_DATE
-            WHERE user_id = :user_id
-              AND (last_daily_date IS NULL OR last_daily_date < CURRENT_DATE)
-            """,
-            params={"user_id": user_id}
-        )
-
-    # Unlock any achievements whose conditions are now met
-    new_achievements = []
-    try:
-        eligible_df = db.select_df(
-            """
-            SELECT a.id, a.title, a.description, a.icon
-            FROM ofta_prod.ofta_achievement a
-            JOIN ofta_prod.ofta_user_stats s ON s.user_id = :user_id
-            LEFT JOIN ofta_prod.ofta_user_achievement ua
-                ON ua.achievement_id = a.id AND ua.user_id = :user_id
-            WHERE ua.achievement_id IS NULL
-              AND (
-                    (a.condition_type = 'games_played' AND s.games_played >= a.condition_value)
-                 OR (a.condition_type = 'best_streak' AND s.best_streak >= a.condition_value)
-                 OR (a.condition_type = 'daily_accuracy' AND :mode = 'DAILY_CHALLENGE'
-                     AND :accuracy >= a.condition_value)
-              )
-            """,
-            params={"user_id": user_id, "mode": session_mode, "accuracy": accuracy}
-        )
-        for _, ach in eligible_df.iterrows():
-            db.execute_query(
-                """
-                INSERT INTO ofta_prod.ofta_user_achievement (user_id, achievement_id)
-                VALUES (:user_id, :achievement_id)
-                ON CONFLICT (user_id, achievement_id) DO NOTHING
-                """,
-                params={"user_id": user_id, "achievement_id": ach['id']}
-            )
-            new_achievements.append(UnlockedAchievement(
-                id=ach['id'],
-                title=ach['title'],
-                description=ach['description'],
-                icon=ach.get('icon'),
-            ))
-    except Exception:
-        logger.exception("Achievement unlock check failed for session %s", session_id)
-
-    # Read fresh lifetime score and rank
-    user_stats_df = db.select_df(
-        "SELECT lifetime_score FROM ofta_prod.ofta_user_stats WHERE user_id = :user_id",
-        params={"user_id": user_id}
-    )
-    lifetime_score = int(user_stats_df.iloc[0]['lifetime_score']) if not user_stats_df.empty else total_score
-
-    # Calculate rank (simple count > score)
-    rank_df = db.select_df(
-        """
-        SELECT COUNT(*) as rank_above
-        FROM ofta_prod.ofta_user_stats
-        WHERE lifetime_score > :score
-        """,
-        params={"score": lifetime_score}
-    )
-    global_rank = int(rank_df.iloc[0]['rank_above']) + 1
+        global_rank = int(rank_above or 0) + 1
 
     return EndSessionResponse(
         session_id=session_id,
-        total_score=total_score,
-        questions_count=questions_count,
-        correct_count=correct_count,
-        best_streak=best_streak,
-        accuracy=accuracy,
+        total_score=int(result['total_score']),
+        questions_count=int(result['questions_count']),
+        correct_count=int(result['correct_count']),
+        best_streak=int(result['best_streak']),
+        accuracy=float(result['accuracy']),
         lifetime_score=lifetime_score,
         global_rank=global_rank,
-        new_achievements=new_achievements
+        new_achievements=[UnlockedAchievement(**a) for a in result['new_achievements']]
     )
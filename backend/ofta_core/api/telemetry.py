@@ -6,10 +6,11 @@ Telemetry / analytics endpoints for OFTA
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
 
-from ofta_core.utils.firebase_auth import get_optional_user
-from ofta_core.utils.util_db import get_db_connector
+from ofta_core.utils.telemetry_writer import encode_event_data, get_telemetry_writer, insert_events
+from ofta_core.utils.user_identity import get_optional_user_id
+from ofta_core.utils.util_async_db import get_async_db
 
 router = APIRouter()
 
@@ -18,23 +19,88 @@ router = APIRouter()
 # Request Models
 # ────────────────────────────────────────────────
 
+def _strip_nul(value):
+    """Postgres text and jsonb cannot hold U+0000, and one such event would fail its whole batch."""
+    if isinstance(value, str):
+        return value.replace("\x00", "")
+    if isinstance(value, dict):
+        return {_strip_nul(k): _strip_nul(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_strip_nul(v) for v in value]
+    return value
+
+
 class TelemetryEvent(BaseModel):
     event_type: str = Field(..., max_length=100)
     event_data: Optional[dict] = None
     client_ts_tms: Optional[str] = None
-    device_os: Optional[str] = None
-    app_version: Optional[str] = None
+    device_os: Optional[str] = Field(None, max_length=50)
+    app_version: Optional[str] = Field(None, max_length=50)
 
     @field_validator('event_data')
     @classmethod
     def validate_event_data_size(cls, v):
         if v and len(v) > 50:
             raise ValueError('event_data must not exceed 50 keys')
-        return v
+        return _strip_nul(v)
+
+    @field_validator('event_type', 'client_ts_tms', 'device_os', 'app_version')
+    @classmethod
+    def strip_nul(cls, v):
+        return _strip_nul(v)
+
+
+# Clients buffer events and upload them in few, large batches
+MAX_BATCH_EVENTS = 500
 
 
 class BatchEventsRequest(BaseModel):
-    events: List[TelemetryEvent] = Field(..., max_length=10)
+    events: List[TelemetryEvent] = Field(..., max_length=MAX_BATCH_EVENTS)
+
+
+def _parse_client_ts(value: str) -> datetime:
+    """ISO-8601 client timestamp as naive UTC (client_ts_tms is TIMESTAMP)."""
+    ts = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _event_row(event: TelemetryEvent, user_id: Optional[str], received: datetime) -> dict:
+    client_ts_tms = None
+    if event.client_ts_tms:
+        try:
+            client_ts_tms = _parse_client_ts(event.client_ts_tms)
+        except (ValueError, AttributeError):
+            client_ts_tms = None
+    return {
+        "user_id": user_id,
+        "event_type": event.event_type,
+        "event_data": encode_event_data(event.event_data),
+        "client_ts_tms": client_ts_tms,
+        # Receipt time, not flush time
+        "server_ts_tms": received,
+        "device_os": event.device_os,
+        "app_version": event.app_version,
+    }
+
+
+async def _ingest(rows: List[dict]) -> int:
+    """Queue rows for the background writer; returns how many were accepted."""
+    writer = get_telemetry_writer()
+    if writer is None:
+        # Writer not started (e.g. scripts): write through
+        await insert_events(get_async_db(), rows)
+        return len(rows)
+    accepted = writer.offer(rows)
+    if rows and not accepted:
+        # Queue full: push back so clients keep their buffer and retry later
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Telemetry queue full, retry later",
+            headers={"Retry-After": "5"},
+        )
+    return accepted
 
 
 # ────────────────────────────────────────────────
@@ -44,99 +110,27 @@ class BatchEventsRequest(BaseModel):
 @router.post("/events", status_code=status.HTTP_202_ACCEPTED)
 async def log_event(
     event: TelemetryEvent,
-    current_user: Optional[dict] = Depends(get_optional_user)
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
     """
     Log a single telemetry event.
     Accepts events from both authenticated and anonymous users.
     """
-    db = get_db_connector()
-
-    # Resolve user_id if authenticated
-    user_id = None
-    if current_user:
-        user_df = db.select_df(
-            "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-            params={"firebase_uid": current_user["firebase_uid"]}
-        )
-        if not user_df.empty:
-            user_id = user_df.iloc[0]['id']
-
-    # Parse client timestamp
-    client_ts_tms = None
-    if event.client_ts_tms:
-        try:
-            client_ts_tms = datetime.fromisoformat(event.client_ts_tms.replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            client_ts_tms = None
-
-    db.execute_query(
-        """
-        INSERT INTO ofta_prod.ofta_telemetry_event (
-            user_id, event_type, event_data, client_ts_tms,
-            device_os, app_version
-        ) VALUES (
-            :user_id, :event_type, :event_data::jsonb, :client_ts_tms,
-            :device_os, :app_version
-        )
-        """,
-        params={
-            "user_id": user_id,
-            "event_type": event.event_type,
-            "event_data": str(event.event_data) if event.event_data else None,
-            "client_ts_tms": client_ts_tms,
-            "device_os": event.device_os,
-            "app_version": event.app_version,
-        }
-    )
-
+    await _ingest([_event_row(event, user_id, datetime.utcnow())])
     return {"status": "accepted"}
 
 
 @router.post("/events/batch", status_code=status.HTTP_202_ACCEPTED)
 async def log_batch_events(
     request: BatchEventsRequest,
-    current_user: Optional[dict] = Depends(get_optional_user)
+    user_id: Optional[str] = Depends(get_optional_user_id)
 ):
-    """Log multiple telemetry events in a batch."""
-    db = get_db_connector()
-
-    # Resolve user_id once
-    user_id = None
-    if current_user:
-        user_df = db.select_df(
-            "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-            params={"firebase_uid": current_user["firebase_uid"]}
-        )
-        if not user_df.empty:
-            user_id = user_df.iloc[0]['id']
-
-    for event in request.events:
-        client_ts_tms = None
-        if event.client_ts_tms:
-            try:
-                client_ts_tms = datetime.fromisoformat(event.client_ts_tms.replace('Z', '+00:00'))
-            except (ValueError, AttributeError):
-                client_ts_tms = None
-
-        db.execute_query(
-            """
-            INSERT INTO ofta_prod.ofta_telemetry_event (
-                user_id, event_type, event_data, client_ts_tms,
-                device_os, app_version
-            ) VALUES (
-                :user_id, :event_type, :event_data::jsonb, :client_ts_tms,
-                :device_os, :app_version
-            )
-            """,
-            params={
-                "user_id": user_id,
-                "event_type": event.event_type,
-                "event_data": str(event.event_data) if event.event_data else None,
-                "client_ts_tms": client_ts_tms,
-                "device_os": event.device_os,
-                "app_version": event.app_version,
-            }
-        )
-
-    return {"status": "accepted", "count": len(request.events)}
+    """
+    Log multiple telemetry events in a batch.
+    count is how many were queued; when the queue is nearly full the rest are
+    dropped and reported in dropped.
+    """
+    received = datetime.utcnow()
+    rows = [_event_row(event, user_id, received) for event in request.events]
+    accepted = await _ingest(rows)
+    return {"status": "accepted", "count": accepted, "dropped": len(rows) - accepted}
@@ -3,12 +3,12 @@
 User stats and achievements endpoints for OFTA
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, status
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 
-from ofta_core.utils.firebase_auth import get_current_user
+from ofta_core.utils.user_identity import get_current_user_id
 from ofta_core.utils.util_db import get_db_connector
 
 router = APIRouter()
@@ -69,34 +69,20 @@ class GameHistoryResponse(BaseModel):
 
 @router.get("/stats", response_model=UserStatsResponse)
 async def get_user_stats(
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Get current user's aggregated stats."""
-    if current_user.get("firebase_uid") == "dev_user_123":
-        return UserStatsResponse()
-
     db = get_db_connector()
 
-    user_df = db.select_df(
-        "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-        params={"firebase_uid": current_user["firebase_uid"]}
-    )
-
-    if user_df.empty:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_id = user_df.iloc[0]['id']
-
-    stats_df = db.select_df(
+    stats = db.fetch_one(
         "SELECT * FROM ofta_prod.ofta_user_stats WHERE user_id = :user_id",
         params={"user_id": user_id}
     )
 
-    if stats_df.empty:
+    if stats is None:
         # No stats yet — return defaults
         return UserStatsResponse()
 
-    stats = stats_df.iloc[0]
     return UserStatsResponse(
         lifetime_score=int(stats.get('lifetime_score', 0) or 0),
         best_streak=int(stats.get('best_streak', 0) or 0),
@@ -113,23 +99,13 @@ async def get_user_stats(
 
 @router.get("/achievements", response_model=UserAchievementsResponse)
 async def get_user_achievements(
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Get user's achievements (unlocked and locked)."""
     db = get_db_connector()
 
-    user_df = db.select_df(
-        "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-        params={"firebase_uid": current_user["firebase_uid"]}
-    )
-
-    if user_df.empty:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_id = user_df.iloc[0]['id']
-
     # Get all achievements with user unlock status
-    ach_df = db.select_df(
+    ach_rows = db.fetch_all(
         """
         SELECT 
             a.id, a.title, a.description, a.icon,
@@ -144,7 +120,7 @@ async def get_user_achievements(
 
     achievements = []
     total_unlocked = 0
-    for _, row in ach_df.iterrows():
+    for row in ach_rows:
         unlocked = row['unlocked_at_tms'] is not None
         if unlocked:
             total_unlocked += 1
@@ -168,22 +144,12 @@ async def get_user_achievements(
 async def get_game_history(
     limit: int = 20,
     offset: int = 0,
-    current_user: dict = Depends(get_current_user)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Get user's game history."""
     db = get_db_connector()
 
-    user_df = db.select_df(
-        "SELECT id FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
-        params={"firebase_uid": current_user["firebase_uid"]}
-    )
-
-    if user_df.empty:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_id = user_df.iloc[0]['id']
-
-    games_df = db.select_df(
+    games_rows = db.fetch_all(
         """
         SELECT 
             id, mode, total_score, correct_count, questions_count,
@@ -196,16 +162,16 @@ async def get_game_history(
         params={"user_id": user_id, "limit": limit, "offset": offset}
     )
 
-    total_df = db.select_df(
+    total_games = db.fetch_scalar(
         """
-        SELECT COUNT(*) as cnt FROM ofta_prod.ofta_game_session
+        SELECT COUNT(*) FROM ofta_prod.ofta_game_session
         WHERE user_id = :user_id AND ended_at_tms IS NOT NULL
         """,
         params={"user_id": user_id}
     )
 
     games = []
-    for _, row in games_df.iterrows():
+    for row in games_rows:
         questions_count = int(row.get('questions_count', 0) or 0)
         correct_count = int(row.get('correct_count', 0) or 0)
         accuracy = (correct_count / questions_count * 100) if questions_count > 0 else 0
@@ -223,6 +189,6 @@ async def get_game_history(
 
     return GameHistoryResponse(
         games=games,
-        total_games=int(total_df.iloc[0]['cnt']) if not total_df.empty else 0,
+        total_games=int(total_games or 0),
         has_more=len(games) == limit,
     )
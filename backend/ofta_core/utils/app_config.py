@@ -0,0 +1,247 @@
+# ofta_core/utils/app_config.py
+"""
+Process-local copy of the client app config (ofta_app_config).
+
+min_client_version, feature_flags and maintenance_mode are loaded once at
+startup and kept in memory together with the encoded /v1/config response,
+so an app launch costs no query and no serialization.
+
+The copy is reloaded only when one of those keys changes. A trigger on
+ofta_app_config sends NOTIFY ofta_app_config_changed with the key for every
+write (admin upsert_config included). Every worker LISTENs for it. As a
+fallback for a dropped listener or a missed notification, each worker also
+polls MAX(updated_at_tms) of the keys every APP_CONFIG_REFRESH_SECONDS and
+reloads when it moved.
+
+Stored values are checked against AppConfigResponse before they are served.
+A failed or invalid reload keeps the current copy; when there is none yet
+the worker serves DEFAULTS (without Last-Modified) until the poll reloads.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from ofta_core.utils.response_cache import EncodedResponse, encode
+
+logger = logging.getLogger(__name__)
+
+CHANGE_CHANNEL = "ofta_app_config_changed"
+REFRESH_INTERVAL_SECONDS = int(os.getenv("APP_CONFIG_REFRESH_SECONDS", "60"))
+
+CLIENT_KEYS = ("min_client_version", "feature_flags", "maintenance_mode")
+
+# Used for keys missing from the table
+DEFAULTS: Dict[str, Any] = {
+    "min_client_version": {"ios": "1.0.0", "android": "1.0.0"},
+    "feature_flags": {
+        "reverse_mode": True,
+        "leaderboard": True,
+        "daily_challenge": True,
+    },
+    "maintenance_mode": False,
+}
+
+# Static configuration
+CATEGORIES = [
+    "Film & TV",
+    "Music",
+    "Sports",
+    "Influencers",
+    "Legends",
+    "Models",
+    "Politics",
+]
+
+GAME_MODES = [
+    "AGE_GUESS",
+    "WHO_OLDER",
+    "REVERSE_DOB",
+    "REVERSE_SIGN",
+    "DAILY_CHALLENGE",
+]
+
+
+class AppConfigResponse(BaseModel):
+    min_client_version: Dict[str, str]
+    feature_flags: Dict[str, bool]
+    maintenance_mode: bool
+    categories: list[str]
+    game_modes: list[str]
+
+
+def validate_config(values: Dict[str, Any]) -> AppConfigResponse:
+    """The /v1/config response for these client key values; raises ValidationError."""
+    return AppConfigResponse(
+        **{key: values[key] for key in CLIENT_KEYS},
+        categories=CATEGORIES,
+        game_modes=GAME_MODES,
+    )
+
+
+class AppConfig:
+    """The client config keys plus their encoded response (one per process)."""
+
+    def __init__(self) -> None:
+        self.values: Dict[str, Any] = {}
+        self.encoded: Optional[EncodedResponse] = None
+        self.last_modified: Optional[datetime] = None
+        self.reloads = 0
+        self.notifications = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.encoded is not None
+
+    def get(self, key: str) -> Any:
+        return self.values.get(key, DEFAULTS.get(key))
+
+    async def load(self, db) -> None:
+        # One aggregate row even for an empty table, so None can only mean
+        # the query failed; a failed reload must keep the current values
+        row = await db.fetch_one(
+            """
+            SELECT jsonb_object_agg(key, value) AS config, MAX(updated_at_tms) AS version
+            FROM ofta_prod.ofta_app_config
+            WHERE key = ANY(:keys)
+            """,
+            params={"keys": list(CLIENT_KEYS)},
+        )
+        if row is None:
+            self._serve_defaults_if_empty()
+            raise RuntimeError("ofta_app_config could not be read")
+        values = {key: DEFAULTS[key] for key in CLIENT_KEYS}
+        values.update(row["config"] or {})
+        try:
+            response = validate_config(values)
+        except ValidationError:
+            self._serve_defaults_if_empty()
+            raise
+        # Validator for If-Modified-Since: the newest edit of a served key
+        self._apply(response, row["version"])
+        self.reloads += 1
+
+    def use_defaults(self) -> None:
+        """Serve DEFAULTS until a load succeeds (no Last-Modified: nothing was read)."""
+        self._apply(validate_config(DEFAULTS), None)
+
+    def _serve_defaults_if_empty(self) -> None:
+        if not self.ready:
+            self.use_defaults()
+
+    def _apply(self, response: AppConfigResponse, last_modified: Optional[datetime]) -> None:
+        payload = response.model_dump()
+        self.encoded = encode(payload, last_modified=last_modified)
+        self.values = {key: payload[key] for key in CLIENT_KEYS}
+        self.last_modified = last_modified
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "last_modified": self.last_modified.isoformat() if self.last_modified else None,
+            "reloads": self.reloads,
+            "notifications": self.notifications,
+            "listening": _listener is not None,
+        }
+
+
+async def fetch_config_version(db) -> Optional[datetime]:
+    """MAX(updated_at_tms) of the client keys; moves on every write to them."""
+    return await db.fetch_scalar(
+        "SELECT MAX(updated_at_tms) FROM ofta_prod.ofta_app_config WHERE key = ANY(:keys)",
+        params={"keys": list(CLIENT_KEYS)},
+    )
+
+
+# ────────────────────────────────────────────────
+# Process singleton + change listener
+# ────────────────────────────────────────────────
+
+_app_config = AppConfig()
+_listener = None
+_watch_task: Optional[asyncio.Task] = None
+_reload_task: Optional[asyncio.Task] = None
+_reload_again = False
+
+
+def get_app_config() -> AppConfig:
+    return _app_config
+
+
+async def reload_app_config() -> None:
+    from ofta_core.utils.util_async_db import get_async_db
+    await _app_config.load(get_async_db())
+
+
+async def _reload_after_notify() -> None:
+    global _reload_again
+    while True:
+        _reload_again = False
+        try:
+            await reload_app_config()
+        except Exception:
+            logger.exception("App config reload failed; the poll will retry")
+            return
+        if not _reload_again:
+            return
+
+
+def _on_notify(key: str) -> None:
+    global _reload_task, _reload_again
+    if key not in CLIENT_KEYS:
+        return
+    _app_config.notifications += 1
+    if _reload_task is not None and not _reload_task.done():
+        # The running reload may have read the rows before this edit
+        _reload_again = True
+        return
+    _reload_task = asyncio.get_running_loop().create_task(_reload_after_notify())
+
+
+async def _listen() -> None:
+    global _listener
+    from ofta_core.utils.util_async_db import get_async_db
+    try:
+        _listener = await get_async_db().listen(CHANGE_CHANNEL, _on_notify)
+    except Exception as e:
+        logger.warning(f"App config change notifications not received on this worker: {e}")
+
+
+async def _watch_config_version() -> None:
+    from ofta_core.utils.util_async_db import get_async_db
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+        try:
+            if _listener is None or _listener.is_closed():
+                await _listen()
+            version = await fetch_config_version(get_async_db())
+            if not _app_config.ready or version != _app_config.last_modified:
+                await reload_app_config()
+        except Exception:
+            logger.exception("App config refresh failed; keeping current config")
+
+
+async def start_app_config() -> None:
+    """Initial load, listener and fallback poll. A failed load leaves DEFAULTS served until the poll."""
+    global _watch_task
+    try:
+        await reload_app_config()
+    except Exception as e:
+        logger.warning(f"App config not loaded at startup, serving defaults: {e}")
+    await _listen()
+    if _watch_task is None:
+        _watch_task = asyncio.create_task(_watch_config_version())
+
+
+async def stop_app_config() -> None:
+    global _watch_task, _listener
+    if _watch_task is not None:
+        _watch_task.cancel()
+        _watch_task = None
+    if _listener is not None:
+        await _listener.close()
+        _listener = None
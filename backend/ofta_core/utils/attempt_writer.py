@@ -0,0 +1,531 @@
+# ofta_core/utils/attempt_writer.py
+"""
+Write-behind ingestion for ofta_question_attempt.
+
+With ANSWER_WRITE_MODE=write_behind, submit_answer hands its attempt row to
+the process AttemptWriter instead of inserting it:
+
+1. The row is appended to a journal segment and fsync'd (group commit: one
+   fsync covers every answer that arrived meanwhile). submit() returns only
+   after that, so an acknowledged answer survives a crash.
+2. A flusher seals the current segment every FLUSH_INTERVAL seconds (or at
+   BATCH_SIZE rows, or on drain) and writes it with one multi-row INSERT per
+   chunk. A segment file is deleted once its rows are committed.
+3. end_session calls drain(session_id), which returns after every
+   acknowledged answer of that session is in Postgres, including answers
+   still journaled by other instances.
+
+Journal layout: ANSWER_JOURNAL_DIR/<instance>/ holds one instance's lock
+file and segments. The directory must be durable and shared by every
+instance serving the API (e.g. a Filestore/NFS mount on Cloud Run, where /tmp
+is in-memory and dies with the instance). On Cloud Run, write-behind refuses
+to start without an explicitly configured journal outside /tmp, and without
+SESSION_STATE_BACKEND=postgres: a journaled answer is only checked against
+session state, so every instance has to see the same closed flag and streak.
+
+Rejected rows: a chunk the database refuses because of its data (SQLSTATE
+class 22/23, or a field that cannot be converted) is retried row by row.
+Rows that still fail are appended to ANSWER_JOURNAL_DIR/quarantine-<instance>.jsonl
+with the error and counted in stats()["rows_quarantined"]; the segment is
+then done. Other errors (connection, server) leave the segment for retry.
+
+Recovery: on startup, instance directories whose lock is no longer held are
+replayed. Inserts use ON CONFLICT DO NOTHING against the
+(session_id, question_index) unique index, so replays, and peers inserting
+each other's rows during a drain, are idempotent.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from ofta_core.utils.cache import TTLCache
+from ofta_core.utils.util_async_db import is_data_error
+
+logger = logging.getLogger(__name__)
+
+ANSWER_WRITE_MODE = os.getenv("ANSWER_WRITE_MODE", "sync")
+JOURNAL_DIR = os.getenv("ANSWER_JOURNAL_DIR", "/tmp/ofta-answer-journal")
+BATCH_SIZE = int(os.getenv("ANSWER_WRITE_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("ANSWER_WRITE_FLUSH_SECONDS", "0.25"))
+
+_LOCK_NAME = "writer.lock"
+
+# One statement for any batch size: the batch goes in as parallel arrays.
+# Rows that actually land also advance the session's streak columns, so a
+# replayed row is never counted twice.
+_INSERT_SQL = """
+    WITH ins AS (
+        INSERT INTO ofta_prod.ofta_question_attempt (
+            session_id, question_template_id, question_index,
+            shown_at_tms, answered_at_tms, response_time_ms,
+            user_answer, is_correct, error_value,
+            hints_used, score_awarded, streak_at_time
+        )
+        SELECT * FROM unnest(
+            CAST(:session_id AS uuid[]), CAST(:question_template_id AS uuid[]),
+            CAST(:question_index AS int[]),
+            CAST(:shown_at_tms AS timestamp[]), CAST(:answered_at_tms AS timestamp[]),
+            CAST(:response_time_ms AS int[]),
+            CAST(:user_answer AS jsonb[]), CAST(:is_correct AS boolean[]),
+            CAST(:error_value AS numeric[]),
+            CAST(:hints_used AS int[]), CAST(:score_awarded AS int[]),
+            CAST(:streak_at_time AS int[])
+        )
+        ON CONFLICT DO NOTHING
+        RETURNING session_id, question_index, is_correct, streak_at_time
+    ),
+    latest AS (
+        SELECT DISTINCT ON (session_id)
+               session_id,
+               CASE WHEN is_correct THEN streak_at_time ELSE 0 END AS current_streak,
+               MAX(streak_at_time) OVER (PARTITION BY session_id) AS best_streak
+        FROM ins
+        ORDER BY session_id, question_index DESC
+    )
+    UPDATE ofta_prod.ofta_game_session gs
+    SET current_streak = latest.current_streak,
+        best_streak    = GREATEST(gs.best_streak, latest.best_streak)
+    FROM latest
+    WHERE gs.id = latest.session_id
+"""
+_COLUMNS = (
+    "session_id", "question_template_id", "question_index",
+    "shown_at_tms", "answered_at_tms", "response_time_ms",
+    "user_answer", "is_correct", "error_value",
+    "hints_used", "score_awarded", "streak_at_time",
+)
+
+
+class SessionClosedError(Exception):
+    """The session is being finalized; no more answers are accepted."""
+
+
+class DuplicateAnswerError(Exception):
+    """This question index of the session was already submitted."""
+
+
+def write_behind_enabled() -> bool:
+    return ANSWER_WRITE_MODE == "write_behind"
+
+
+def journal_dir_problem() -> Optional[str]:
+    """Why the configured journal cannot guarantee durability here, or None."""
+    if not os.getenv("K_SERVICE"):
+        return None
+    if "ANSWER_JOURNAL_DIR" not in os.environ:
+        return "ANSWER_JOURNAL_DIR is not set"
+    if os.path.realpath(JOURNAL_DIR).startswith("/tmp"):
+        return "ANSWER_JOURNAL_DIR is under /tmp, which is in-memory on Cloud Run"
+    return None
+
+
+def session_state_problem() -> Optional[str]:
+    """Why session state cannot stop answers after end_session on another instance, or None."""
+    from ofta_core.utils import session_state
+    if os.getenv("K_SERVICE") and session_state.SESSION_STATE_BACKEND != "postgres":
+        return "SESSION_STATE_BACKEND is not postgres, so ended sessions and streaks are per instance"
+    return None
+
+
+def _columnar(rows: List[dict]) -> dict:
+    params = {c: [r.get(c) for r in rows] for c in _COLUMNS}
+    for c in ("shown_at_tms", "answered_at_tms"):
+        params[c] = [datetime.fromisoformat(v) if v else None for v in params[c]]
+    return params
+
+
+def _read_segment(path: str, session_id: Optional[str] = None) -> List[dict]:
+    """Complete lines of a segment; a line still being appended is skipped."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return []  # flushed and unlinked meanwhile
+    rows = []
+    needle = session_id.encode() if session_id else None
+    for line in data.split(b"\n")[:-1]:
+        if not line or (needle is not None and needle not in line):
+            continue
+        row = json.loads(line)
+        if session_id is None or row["session_id"] == session_id:
+            rows.append(row)
+    return rows
+
+
+class AttemptWriter:
+    """Journal-then-batch writer for question attempts (one per process)."""
+
+    def __init__(self, db, journal_dir: str = JOURNAL_DIR, instance_id: str = None,
+                 batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL) -> None:
+        self.db = db
+        self.journal_dir = journal_dir
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.instance_dir = os.path.join(journal_dir, self.instance_id)
+        # A file, not a directory, so peers never take it for a journal
+        self.quarantine_path = os.path.join(journal_dir, f"quarantine-{self.instance_id}.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._incoming: List[Tuple[dict, asyncio.Future]] = []
+        self._current_rows: List[dict] = []
+        self._current_fd: Optional[int] = None
+        self._current_path: Optional[str] = None
+        self._segment_seq = 0
+        self._sealed: List[Tuple[str, List[dict]]] = []
+        self._drain_waiters: List[asyncio.Future] = []
+        self._journal_wake = asyncio.Event()
+        self._flush_wake = asyncio.Event()
+        self._journal_lock = asyncio.Lock()
+        # Batches taken from _incoming / batches written (or failed), in order
+        self._batches_taken = 0
+        self._batches_done = 0
+        self._batch_done = asyncio.Condition()
+        self._lock_fd: Optional[int] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closed = TTLCache(maxsize=100000, ttl=3600, name="closed_sessions")
+        self._answered = TTLCache(maxsize=1000000, ttl=3600, name="answered_questions")
+        self.rows_flushed = 0
+        self.peer_rows_absorbed = 0
+        self.flush_failures = 0
+        self.rows_quarantined = 0
+
+    # ── Lifecycle ──────────────────────────────────
+
+    async def start(self) -> None:
+        os.makedirs(self.instance_dir, exist_ok=True)
+        self._lock_fd = os.open(os.path.join(self.instance_dir, _LOCK_NAME),
+                                os.O_CREAT | os.O_RDWR, 0o600)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        await self._replay_orphans()
+        self._open_segment()
+        self._tasks = [
+            asyncio.create_task(self._journal_loop()),
+            asyncio.create_task(self._flush_loop()),
+        ]
+        logger.info(f"Attempt writer started (journal={self.instance_dir}, batch={self.batch_size})")
+
+    async def stop(self) -> None:
+        """Journal what is queued, flush everything, release the journal."""
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._current_fd is not None:
+            os.close(self._current_fd)
+            if not self._current_rows:
+                os.unlink(self._current_path)
+            self._current_fd = None
+        if self._lock_fd is not None and not self._sealed and not self._current_rows:
+            os.unlink(os.path.join(self.instance_dir, _LOCK_NAME))
+            os.close(self._lock_fd)
+            self._lock_fd = None
+            try:
+                os.rmdir(self.instance_dir)
+            except OSError:
+                pass
+
+    # ── Public API ─────────────────────────────────
+
+    async def submit(self, row: dict) -> None:
+        """
+        Queue one attempt row; returns once it is durable in the journal.
+
+        Raises:
+            SessionClosedError: end_session has started draining this session
+            DuplicateAnswerError: a concurrent request already took this index
+        """
+        if self._closed.get(row["session_id"]) is not None:
+            raise SessionClosedError(row["session_id"])
+        key = (row["session_id"], row["question_index"])
+        if self._answered.get(key) is not None:
+            raise DuplicateAnswerError(key)
+        self._answered.set(key, True)
+        fut = asyncio.get_running_loop().create_future()
+        self._incoming.append((row, fut))
+        self._journal_wake.set()
+        try:
+            await fut
+        except Exception:
+            self._answered.invalidate(key)  # not journaled; the client may retry
+            raise
+
+    def close_session(self, session_id: str) -> None:
+        """Refuse further submits for a session about to be finalized."""
+        self._closed.set(session_id, True)
+
+    async def drain(self, session_id: Optional[str] = None) -> None:
+        """
+        Return once every acknowledged row has been committed to Postgres.
+
+        With a session_id, rows of that session still journaled by other
+        instances are inserted too, so the caller sees the whole session no
+        matter which instance took its answers.
+        """
+        if self._tasks:
+            fut = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(fut)
+            self._journal_wake.set()
+            self._flush_wake.set()
+            await fut
+        if session_id is not None:
+            rows = await asyncio.to_thread(self._peer_rows, session_id)
+            if rows:
+                await self._insert(rows)
+                self.peer_rows_absorbed += len(rows)
+
+    async def pending_rows(self, session_id: str) -> List[dict]:
+        """Rows of a session that may not be in Postgres yet, from any instance."""
+        local = [r for r, _ in self._incoming if r["session_id"] == session_id]
+        local += [r for r in self._current_rows if r["session_id"] == session_id]
+        for _, rows in self._sealed:
+            local += [r for r in rows if r["session_id"] == session_id]
+        return local + await asyncio.to_thread(self._peer_rows, session_id)
+
+    def stats(self) -> dict:
+        return {
+            "mode": ANSWER_WRITE_MODE,
+            "instance": self.instance_id,
+            "pending_rows": len(self._current_rows) + sum(len(r) for _, r in self._sealed),
+            "rows_flushed": self.rows_flushed,
+            "peer_rows_absorbed": self.peer_rows_absorbed,
+            "flush_failures": self.flush_failures,
+            "rows_quarantined": self.rows_quarantined,
+        }
+
+    # ── Journal ────────────────────────────────────
+
+    def _open_segment(self) -> None:
+        self._segment_seq += 1
+        self._current_path = os.path.join(
+            self.instance_dir, f"attempts-{int(time.time())}-{self._segment_seq:06d}.jsonl"
+        )
+        self._current_fd = os.open(self._current_path, os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o600)
+        self._current_rows = []
+
+    def _append(self, fd: int, payload: bytes) -> None:
+        os.write(fd, payload)
+        os.fsync(fd)
+
+    async def _journal_loop(self) -> None:
+        while True:
+            await self._journal_wake.wait()
+            self._journal_wake.clear()
+            batch, self._incoming = self._incoming, []
+            if not batch:
+                continue
+            self._batches_taken += 1
+            try:
+                await self._journal_batch(batch)
+            finally:
+                async with self._batch_done:
+                    self._batches_done += 1
+                    self._batch_done.notify_all()
+            if len(self._current_rows) >= self.batch_size:
+                self._flush_wake.set()
+
+    async def _journal_batch(self, batch: List[Tuple[dict, asyncio.Future]]) -> None:
+        payload = b"".join(
+            json.dumps(row, default=str).encode() + b"\n" for row, _ in batch
+        )
+        try:
+            async with self._journal_lock:
+                await asyncio.to_thread(self._append, self._current_fd, payload)
+                self._current_rows.extend(row for row, _ in batch)
+        except Exception as e:
+            logger.exception("Attempt journal write failed")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def _journaled_so_far(self) -> None:
+        """Wait until everything submitted before now has been through the journal."""
+        if not self._incoming:
+            return
+        # The next batch taken holds all of it; later submits are not waited for
+        target = self._batches_taken + 1
+        async with self._batch_done:
+            await self._batch_done.wait_for(lambda: self._batches_done >= target)
+
+    # ── Flush ──────────────────────────────────────
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wake.clear()
+            # Let the journal loop take anything submitted before a drain
+            await self._journaled_so_far()
+            waiters, self._drain_waiters = self._drain_waiters, []
+            try:
+                async with self._journal_lock:
+                    self._seal_current()
+                await self._flush_sealed()
+            except Exception as e:
+                self.flush_failures += 1
+                logger.exception("Attempt flush failed; rows stay journaled for retry")
+                for fut in waiters:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(None)
+
+    def _seal_current(self) -> None:
+        if not self._current_rows:
+            return
+        os.close(self._current_fd)
+        self._sealed.append((self._current_path, self._current_rows))
+        self._open_segment()
+
+    async def _flush_sealed(self) -> None:
+        while self._sealed:
+            path, rows = self._sealed[0]
+            await self._insert(rows)
+            os.unlink(path)
+            self._sealed.pop(0)
+
+    async def _insert(self, rows: List[dict]) -> None:
+        for i in range(0, len(rows), self.batch_size):
+            chunk = rows[i:i + self.batch_size]
+            try:
+                await self.db.execute(_INSERT_SQL, params=_columnar(chunk))
+            except Exception as e:
+                if not is_data_error(e):
+                    raise
+                # Some row can never go in; find it so the rest are not held up
+                await self._insert_one_by_one(chunk)
+                continue
+            self.rows_flushed += len(chunk)
+
+    async def _insert_one_by_one(self, rows: List[dict]) -> None:
+        for row in rows:
+            try:
+                await self.db.execute(_INSERT_SQL, params=_columnar([row]))
+            except Exception as e:
+                if not is_data_error(e):
+                    raise
+                await asyncio.to_thread(self._quarantine, row, e)
+                continue
+            self.rows_flushed += 1
+
+    def _quarantine(self, row: dict, error: Exception) -> None:
+        """Set a rejected row aside (outside any segment) so the journal keeps moving."""
+        record = {"row": row, "error": f"{type(error).__name__}: {error}",
+                  "quarantined_at": datetime.utcnow().isoformat()}
+        fd = os.open(self.quarantine_path, os.O_CREAT | os.O_WRONLY | os.O_APPEND, 0o600)
+        try:
+            self._append(fd, json.dumps(record, default=str).encode() + b"\n")
+        finally:
+            os.close(fd)
+        self.rows_quarantined += 1
+        logger.error(
+            f"Quarantined attempt {row.get('session_id')}#{row.get('question_index')} "
+            f"in {self.quarantine_path}: {error}"
+        )
+
+    # ── Peers & recovery ───────────────────────────
+
+    def _peer_segments(self) -> Dict[str, List[str]]:
+        peers = {}
+        try:
+            names = os.listdir(self.journal_dir)
+        except FileNotFoundError:
+            return peers
+        for name in names:
+            path = os.path.join(self.journal_dir, name)
+            if name == self.instance_id or not os.path.isdir(path):
+                continue
+            peers[path] = sorted(
+                os.path.join(path, f) for f in os.listdir(path) if f.endswith(".jsonl")
+            )
+        return peers
+
+    def _peer_rows(self, session_id: str) -> List[dict]:
+        rows = []
+        for segments in self._peer_segments().values():
+            for path in segments:
+                rows.extend(_read_segment(path, session_id))
+        return rows
+
+    async def _replay_orphans(self) -> None:
+        """Insert segments whose writer is gone (including our own leftovers)."""
+        dirs = dict(self._peer_segments())
+        dirs[self.instance_dir] = sorted(
+            os.path.join(self.instance_dir, f)
+            for f in os.listdir(self.instance_dir) if f.endswith(".jsonl")
+        )
+        for instance_dir, segments in dirs.items():
+            fd = None
+            if instance_dir != self.instance_dir:
+                try:
+                    fd = os.open(os.path.join(instance_dir, _LOCK_NAME), os.O_RDWR)
+                except FileNotFoundError:
+                    continue  # instance still starting up
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue  # live instance
+            try:
+                for path in segments:
+                    rows = _read_segment(path)
+                    if rows:
+                        await self._insert(rows)
+                        logger.warning(f"Replayed {len(rows)} journaled attempts from {path}")
+                    os.unlink(path)
+                if fd is not None:
+                    os.unlink(os.path.join(instance_dir, _LOCK_NAME))
+                    try:
+                        os.rmdir(instance_dir)
+                    except OSError:
+                        pass
+            finally:
+                if fd is not None:
+                    os.close(fd)
+
+
+# ────────────────────────────────────────────────
+# Process singleton
+# ────────────────────────────────────────────────
+
+_attempt_writer: Optional[AttemptWriter] = None
+
+
+def get_attempt_writer() -> Optional[AttemptWriter]:
+    """The running writer, or None in sync mode."""
+    return _attempt_writer
+
+
+async def start_attempt_writer() -> None:
+    global _attempt_writer
+    if not write_behind_enabled() or _attempt_writer is not None:
+        return
+    problem = journal_dir_problem() or session_state_problem()
+    if problem:
+        logger.error(f"Write-behind answers disabled, staying in sync mode: {problem}")
+        return
+    from ofta_core.utils.util_async_db import get_async_db
+    writer = AttemptWriter(get_async_db())
+    await writer.start()
+    _attempt_writer = writer
+
+
+async def stop_attempt_writer() -> None:
+    global _attempt_writer
+    if _attempt_writer is not None:
+        await _attempt_writer.stop()
+        _attempt_writer = None
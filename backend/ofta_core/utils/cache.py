@@ -0,0 +1,267 @@
+# ofta_core/utils/cache.py
+"""
+Small in-process caches shared by the API modules.
+
+TTLCache is a plain bounded map. LoadingCache wraps a loader around the same
+LRU/TTL policy for read endpoints: concurrent misses share one load, and a
+recently expired value is served while one background refresh runs. Given a
+shared backend (see shared_cache), it also reads and fills that tier and
+hears about invalidations made on other workers.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def key_str(key: Hashable) -> str:
+    """Flat string form of a key for the shared tier; tuples are joined with "|"."""
+    if isinstance(key, tuple):
+        return "|".join(str(part) for part in key)
+    return str(key)
+
+
+def matches_prefix(key: str, prefix: str) -> bool:
+    return key == prefix or key.startswith(prefix + "|")
+
+
+class TTLCache:
+    """
+    Bounded LRU map whose entries also expire after ``ttl`` seconds.
+
+    Meant to be used from the event loop thread; no locking is done.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache") -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class LoadingCache:
+    """
+    Async read-through cache with LRU eviction and per-key TTL.
+
+    get_or_load(key, loader) returns the cached value while it is fresh.
+    For stale_ttl seconds after that the old value is still returned, and
+    a single background load refreshes it. On a miss, every concurrent caller
+    for the key awaits the same load (single-flight). A failed load is not
+    cached; the callers waiting on it get the exception.
+
+    With a backend, a load first checks the shared tier and only runs the
+    loader when that misses too; what it loads is written back there. The
+    value is JSON round-tripped either way, so every worker sees the same
+    types. invalidate_prefix() reaches the other workers' local copies.
+    Each load takes a fresh epoch for its key and invalidate() clears it, so
+    a load that started before an invalidation stores its value nowhere:
+    not locally, and not in the shared tier it would refill with old data.
+
+    Meant to be used from the event loop thread; no locking is done.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0.0, name: str = "cache",
+                 backend=None) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._epochs: Dict[Hashable, int] = {}   # key -> epoch of its current load
+        self._next_epoch = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.shared_hits = 0
+        self.load_errors = 0
+        self.evictions = 0
+        self.stale_loads = 0
+        if backend is not None:
+            backend.subscribe(name, self._drop_prefix)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+    ) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is not _MISSING:
+            fresh_until, stale_until, value = entry
+            now = time.monotonic()
+            if now < fresh_until:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            if now < stale_until:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_load(key, loader, ttl)
+                return value
+            del self._data[key]
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start_load(key, loader, ttl)
+        else:
+            self.coalesced += 1
+        # Shielded: a caller that goes away does not cancel the shared load
+        return await asyncio.shield(task)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        fresh_until = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (fresh_until, fresh_until + self.stale_ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a key; a load already running for it will not be stored."""
+        self._data.pop(key, None)
+        self._inflight.pop(key, None)
+        self._epochs.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in list(self._data) + list(self._inflight) if predicate(k)]:
+            self.invalidate(key)
+
+    async def invalidate_prefix(self, *parts: Hashable) -> None:
+        """Drop every key starting with parts, here and on every worker sharing the backend."""
+        prefix = key_str(parts)
+        self._drop_prefix(prefix)
+        if self.backend is not None:
+            await self.backend.invalidate_prefix(self.name, prefix)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._inflight.clear()
+        self._epochs.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "shared_hits": self.shared_hits,
+            "load_errors": self.load_errors,
+            "evictions": self.evictions,
+            "stale_loads": self.stale_loads,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                    ttl: Optional[float]) -> asyncio.Task:
+        self._next_epoch += 1
+        self._epochs[key] = self._next_epoch
+        task = asyncio.ensure_future(self._load(key, loader, ttl, self._next_epoch))
+        self._inflight[key] = task
+        self.loads += 1
+        task.add_done_callback(lambda t: self._finish_load(key, t, ttl))
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                    ttl: Optional[float], epoch: int) -> Any:
+        if self.backend is None:
+            return await loader()
+        value = await self.backend.get(self.name, key_str(key))
+        if value is not None:
+            self.shared_hits += 1
+            return value
+        data = json.dumps(await loader(), default=str)
+        if self._epochs.get(key) == epoch:
+            await self.backend.set(self.name, key_str(key), data, self.ttl if ttl is None else ttl)
+        else:
+            # Invalidated while loading: the shared entry was deleted after
+            # this load read the source, so writing it back would revive it
+            self.stale_loads += 1
+        return json.loads(data)
+
+    def _drop_prefix(self, prefix: str) -> None:
+        self.invalidate_where(lambda k: matches_prefix(key_str(k), prefix))
+
+    def _finish_load(self, key: Hashable, task: asyncio.Task, ttl: Optional[float]) -> None:
+        current = self._inflight.get(key) is task
+        if current:
+            del self._inflight[key]
+            self._epochs.pop(key, None)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            self.load_errors += 1
+            logger.warning(f"{self.name} cache load failed for {key!r}: {exc}")
+            return
+        if current:
+            self.set(key, task.result(), ttl)
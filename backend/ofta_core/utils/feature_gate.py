@@ -0,0 +1,124 @@
+# ofta_core/utils/feature_gate.py
+"""
+Kill switches driven by the in-memory app config.
+
+maintenance_mode and feature_flags (see app_config) are compiled into a Gate
+once per config reload. FeatureGateMiddleware then answers requests for a
+switched-off part of the API with a prebuilt 503 before routing, auth or any
+database work, so flipping a flag with admin upsert_config sheds that load
+within one NOTIFY.
+
+- maintenance_mode: every path except MAINTENANCE_EXEMPT (clients still
+  read /v1/config to learn about it, admins still reach /admin to end it).
+- a flag in FLAG_PREFIXES set to false: every path under its prefixes.
+- a flag in FLAG_MODES set to false: start_session refuses those modes
+  (the mode is in the request body, so the middleware cannot see it).
+
+Flags that are missing or true leave everything open.
+"""
+
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from starlette.responses import Response
+
+from ofta_core.utils.app_config import get_app_config
+
+# Feature flag -> path prefixes it switches off
+FLAG_PREFIXES: Dict[str, Tuple[str, ...]] = {
+    "leaderboard": ("/v1/leaderboards",),
+    "daily_challenge": ("/v1/packs",),
+}
+
+# Feature flag -> session modes it switches off
+FLAG_MODES: Dict[str, Tuple[str, ...]] = {
+    "reverse_mode": ("REVERSE_DOB", "REVERSE_SIGN"),
+    "daily_challenge": ("DAILY_CHALLENGE",),
+}
+
+MAINTENANCE_EXEMPT = ("/v1/config", "/admin", "/health", "/docs", "/redoc", "/openapi.json")
+
+RETRY_AFTER_SECONDS = 60
+
+
+def _unavailable(detail: str, **extra) -> Response:
+    body = json.dumps({"detail": detail, **extra}, separators=(",", ":"))
+    return Response(
+        content=body,
+        status_code=503,
+        media_type="application/json",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS), "Cache-Control": "no-store"},
+    )
+
+
+class Gate(NamedTuple):
+    maintenance: Optional[Response]
+    blocked: Tuple[Tuple[str, Response], ...]       # (path prefix, response)
+    disabled_modes: frozenset
+
+    def check(self, path: str) -> Optional[Response]:
+        """The prebuilt response for a switched-off path, or None to let it through."""
+        if self.maintenance is not None and not path.startswith(MAINTENANCE_EXEMPT):
+            return self.maintenance
+        for prefix, response in self.blocked:
+            if path.startswith(prefix):
+                return response
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "maintenance": self.maintenance is not None,
+            "blocked_prefixes": [prefix for prefix, _ in self.blocked],
+            "disabled_modes": sorted(self.disabled_modes),
+        }
+
+
+OPEN = Gate(None, (), frozenset())
+
+
+def build_gate(maintenance_mode, feature_flags) -> Gate:
+    flags = feature_flags if isinstance(feature_flags, dict) else {}
+    off = [flag for flag, enabled in flags.items() if enabled is False]
+    maintenance = None
+    if maintenance_mode is True:
+        maintenance = _unavailable("Service under maintenance", maintenance_mode=True)
+    blocked: List[Tuple[str, Response]] = []
+    for flag in off:
+        if flag in FLAG_PREFIXES:
+            response = _unavailable("This feature is temporarily disabled", feature=flag)
+            blocked.extend((prefix, response) for prefix in FLAG_PREFIXES[flag])
+    modes = frozenset(m for flag in off for m in FLAG_MODES.get(flag, ()))
+    return Gate(maintenance, tuple(blocked), modes)
+
+
+_gate = OPEN
+_gate_reloads = 0
+
+
+def current_gate() -> Gate:
+    """The gate for the loaded config, rebuilt only after a reload."""
+    global _gate, _gate_reloads
+    config = get_app_config()
+    if config.reloads != _gate_reloads:
+        _gate = build_gate(config.get("maintenance_mode"), config.get("feature_flags"))
+        _gate_reloads = config.reloads
+    return _gate
+
+
+def mode_enabled(mode: str) -> bool:
+    return mode not in current_gate().disabled_modes
+
+
+class FeatureGateMiddleware:
+    """Pure ASGI middleware: one prefix check per request, no body buffering."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http":
+            response = current_gate().check(scope["path"])
+            if response is not None:
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -4,6 +4,8 @@ Firebase Authentication utilities for OFTA
 """
 
 import os
+import time
+import hashlib
 import logging
 from typing import Optional
 from fastapi import HTTPException, status, Depends
@@ -12,6 +14,8 @@ import firebase_admin
 from firebase_admin import credentials, auth
 from dotenv import load_dotenv
 
+from ofta_core.utils.cache import TTLCache
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -56,6 +60,29 @@ except Exception as e:
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
+# Verified ID tokens, keyed by sha256 of the raw token. Entries never outlive
+# the token's own exp claim.
+TOKEN_CACHE_MAX_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "600"))
+token_cache = TTLCache(
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", "20000")),
+    ttl=TOKEN_CACHE_MAX_TTL_SECONDS,
+    name="firebase_token",
+)
+
+
+def _verify_id_token_cached(token: str) -> dict:
+    """auth.verify_id_token, skipped while a previous verification is still valid."""
+    key = hashlib.sha256(token.encode()).digest()
+    decoded = token_cache.get(key)
+    if decoded is not None:
+        return decoded
+
+    decoded = auth.verify_id_token(token)
+    ttl = min(TOKEN_CACHE_MAX_TTL_SECONDS, float(decoded.get("exp", 0)) - time.time())
+    if ttl > 0:
+        token_cache.set(key, decoded, ttl=ttl)
+    return decoded
+
 
 async def verify_firebase_token(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -93,8 +120,8 @@ async def verify_firebase_token(
         }
 
     try:
-        # Verify the token
-        decoded_token = auth.verify_id_token(token)
+        # Verify the token (cached until exp)
+        decoded_token = _verify_id_token_cached(token)
         return decoded_token
         
     except auth.InvalidIdTokenError:
@@ -0,0 +1,154 @@
+# ofta_core/utils/pack_builder.py
+"""
+The daily pack: built ahead of time into ofta_daily_pack, read from one cache.
+
+ofta_build_daily_pack() holds the only daily selection rule. Both
+/v1/packs/daily and DAILY_CHALLENGE sessions read the result through
+get_daily_pack(), so the two cannot disagree and neither ranks templates
+per request.
+
+Each worker checks on startup, then hourly, that today and the next
+DAILY_PACK_DAYS_AHEAD days have a pack, and builds the missing ones with
+ofta_build_daily_pack(). The function is a no-op for a date that already has
+a pack, so workers racing on the same date are harmless and a pack never
+changes once served. The midnight spike then only reads a built row.
+
+A request may also build a missing pack, but only for dates in
+[today - DAILY_PACK_DAYS_BACK, today + DAILY_PACK_DAYS_AHEAD]; every built
+pack is a permanent row. A date outside the window with no pack is
+remembered on this worker for MISSING_PACK_TTL_SECONDS; misses never enter
+the shared tier.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import List, Optional
+
+from ofta_core.utils.cache import LoadingCache, TTLCache
+from ofta_core.utils.shared_cache import get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+DAILY_PACK_DAYS_AHEAD = int(os.getenv("DAILY_PACK_DAYS_AHEAD", "7"))
+DAILY_PACK_DAYS_BACK = int(os.getenv("DAILY_PACK_DAYS_BACK", "30"))
+MISSING_PACK_TTL_SECONDS = float(os.getenv("MISSING_PACK_TTL_SECONDS", "60"))
+BUILD_INTERVAL_SECONDS = float(os.getenv("DAILY_PACK_BUILD_INTERVAL_SECONDS", "3600"))
+
+
+# A built pack never changes, so entries only leave by LRU
+daily_pack_cache = LoadingCache(maxsize=64, ttl=86400, name="daily_packs", backend=get_cache_backend())
+# Dates without a pack, so repeated requests for them skip the database
+missing_packs = TTLCache(maxsize=1024, ttl=MISSING_PACK_TTL_SECONDS, name="daily_packs_missing")
+
+
+class PackMissing(LookupError):
+    """No pack exists for the date, and none can be built on demand."""
+
+
+def buildable(pack_date: date) -> bool:
+    """Packs are built on demand from DAILY_PACK_DAYS_BACK ago up to the builder's horizon."""
+    today = date.today()
+    return (today - timedelta(days=DAILY_PACK_DAYS_BACK)
+            <= pack_date <= today + timedelta(days=DAILY_PACK_DAYS_AHEAD))
+
+
+async def build_pack(db, pack_date: date) -> bool:
+    """Build one date's pack if it has none; True when this call wrote it."""
+    built = await db.fetch_scalar(
+        "SELECT ofta_prod.ofta_build_daily_pack(:pack_date)",
+        params={"pack_date": pack_date},
+    )
+    return bool(built)
+
+
+async def ensure_packs(db, start: date, days: int) -> List[date]:
+    """Build every missing pack in [start, start + days]; returns the dates built."""
+    wanted = [start + timedelta(days=i) for i in range(days + 1)]
+    rows = await db.select(
+        "SELECT pack_date FROM ofta_prod.ofta_daily_pack WHERE pack_date = ANY(:dates)",
+        params={"dates": wanted},
+    )
+    have = {r["pack_date"] for r in rows}
+    built = []
+    for pack_date in wanted:
+        if pack_date not in have and await build_pack(db, pack_date):
+            built.append(pack_date)
+    if built:
+        logger.info(f"Daily packs built: {', '.join(d.isoformat() for d in built)}")
+    return built
+
+
+async def _load_pack(pack_date: date) -> dict:
+    from ofta_core.utils.util_async_db import get_async_db
+    db = get_async_db()
+    query = """
+        SELECT template_ids, questions, question_count, pack_hash, created_at_tms
+        FROM ofta_prod.ofta_daily_pack
+        WHERE pack_date = :pack_date
+    """
+    row = await db.fetch_one(query, params={"pack_date": pack_date})
+    if row is None and buildable(pack_date):
+        # Not built ahead (a recent date, or the builder has not run yet)
+        await build_pack(db, pack_date)
+        row = await db.fetch_one(query, params={"pack_date": pack_date})
+    if row is None:
+        # Raised rather than returned, so nothing is cached in either tier
+        raise PackMissing(pack_date)
+    return {
+        "template_ids": [str(t) for t in row["template_ids"]],
+        "questions": json.dumps(row["questions"], separators=(",", ":")),
+        "question_count": int(row["question_count"]),
+        "pack_hash": row["pack_hash"],
+        "created_at": row["created_at_tms"].isoformat(),
+    }
+
+
+async def get_daily_pack(pack_date: date) -> Optional[dict]:
+    """
+    The pack for a date as {"template_ids": [...], "questions": <JSON text>,
+    "question_count": n, "pack_hash": ..., "created_at": <ISO>}, or None when there is none (nothing eligible, or a
+    date outside the build window that was never built).
+    """
+    key = pack_date.isoformat()
+    if missing_packs.get(key):
+        return None
+    try:
+        return await daily_pack_cache.get_or_load(key, lambda: _load_pack(pack_date))
+    except PackMissing:
+        if not buildable(pack_date):
+            # Inside the window a miss may be a failed read; retry it next time
+            missing_packs.set(key, True)
+        return None
+
+
+# ────────────────────────────────────────────────
+# Background builder
+# ────────────────────────────────────────────────
+
+_build_task: Optional[asyncio.Task] = None
+
+
+async def _build_ahead() -> None:
+    from ofta_core.utils.util_async_db import get_async_db
+    while True:
+        try:
+            await ensure_packs(get_async_db(), date.today(), DAILY_PACK_DAYS_AHEAD)
+        except Exception:
+            logger.exception("Daily pack build failed; packs will be built on first request")
+        await asyncio.sleep(BUILD_INTERVAL_SECONDS)
+
+
+async def start_pack_builder() -> None:
+    global _build_task
+    if _build_task is None:
+        _build_task = asyncio.create_task(_build_ahead())
+
+
+async def stop_pack_builder() -> None:
+    global _build_task
+    if _build_task is not None:
+        _build_task.cancel()
+        _build_task = None
@@ -0,0 +1,170 @@
+# ofta_core/utils/question_format.py
+"""
+Batch formatting of question rows into client questions.
+
+format_questions() takes the rows of one session or export, all in the
+sessions row shape (question pool to_row(), the SQL sampler or a DataFrame's
+records), and extracts each column once. Dates become one datetime64[D]
+array. Ages, years, WHO_OLDER choices, distractor sets and option shuffles
+are then computed over numpy arrays for the whole batch instead of row by
+row.
+
+Dates may be date/datetime objects, pandas Timestamps or ISO text; they all
+go through as_days(), so no caller parses them itself.
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+ZODIAC_SIGNS = [
+    "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+    "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces",
+]
+_SIGNS = np.array(ZODIAC_SIGNS, dtype=object)
+
+SIGN_DECOYS = 8
+DOB_OFFSETS = np.array([-3, -2, -1, 1, 2, 3, 4, 5, 0])   # 0 is the answer
+AGE_DISTRACTORS = 3
+MIN_AGE, MAX_AGE = 16, 100
+# Widest distractor offset considered; far more than any real age needs
+_AGE_WINDOW = 120
+
+
+def as_days(values: Sequence[Any]) -> np.ndarray:
+    """Dates as datetime64[D]; None and NaN become NaT."""
+    return np.array(
+        ["NaT" if v is None or v != v else str(v)[:10] for v in values],
+        dtype="datetime64[D]",
+    )
+
+
+def years_of(days: np.ndarray) -> np.ndarray:
+    return days.astype("datetime64[Y]").astype(int) + 1970
+
+
+def ages_on(dobs: np.ndarray, today: date) -> np.ndarray:
+    """Completed years on today for each date of birth."""
+    months = dobs.astype("datetime64[M]")
+    month_day = (months.astype(int) % 12 + 1) * 100 + (dobs - months).astype(int) + 1
+    before_birthday = (today.month * 100 + today.day) < month_day
+    return today.year - years_of(dobs) - before_birthday
+
+
+def _shuffle_rows(options: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    order = np.argsort(rng.random(options.shape), axis=1)
+    return np.take_along_axis(options, order, axis=1)
+
+
+def age_options(ages: np.ndarray, spreads: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    AGE_DISTRACTORS distinct ages within the row's spread of the answer
+    (widened until enough fall in MIN_AGE..MAX_AGE), plus the answer, shuffled.
+    """
+    offsets = np.arange(-_AGE_WINDOW, _AGE_WINDOW + 1)
+    candidates = ages[:, None] + offsets
+    valid = (offsets != 0) & (candidates >= MIN_AGE) & (candidates <= MAX_AGE)
+
+    # Smallest spread >= the requested one that leaves enough valid offsets
+    widths = np.arange(1, _AGE_WINDOW + 1)
+    per_width = valid[:, _AGE_WINDOW + widths].astype(int) + valid[:, _AGE_WINDOW - widths]
+    enough = (np.cumsum(per_width, axis=1) >= AGE_DISTRACTORS) & (widths >= spreads[:, None])
+    spread = widths[np.argmax(enough, axis=1)]
+
+    keys = rng.random(candidates.shape)
+    keys[~(valid & (np.abs(offsets) <= spread[:, None]))] = 2.0
+    picked = np.argpartition(keys, AGE_DISTRACTORS - 1, axis=1)[:, :AGE_DISTRACTORS]
+    options = np.concatenate([np.take_along_axis(candidates, picked, axis=1), ages[:, None]], axis=1)
+    return _shuffle_rows(options, rng)
+
+
+def sign_options(signs: Sequence[Optional[str]], rng: np.random.Generator) -> np.ndarray:
+    """SIGN_DECOYS other signs plus the answer, shuffled."""
+    answer = np.array([ZODIAC_SIGNS.index(s) if s in ZODIAC_SIGNS else -1 for s in signs])
+    keys = rng.random((len(answer), len(ZODIAC_SIGNS)))
+    rows = np.flatnonzero(answer >= 0)
+    keys[rows, answer[rows]] = 2.0
+    decoys = _SIGNS[np.argsort(keys, axis=1)[:, :SIGN_DECOYS]]
+    options = np.concatenate([decoys, np.array(signs, dtype=object)[:, None]], axis=1)
+    return _shuffle_rows(options, rng)
+
+
+def year_options(years: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """The answer and DOB_OFFSETS around it, shuffled."""
+    return _shuffle_rows(years[:, None] + DOB_OFFSETS, rng)
+
+
+def format_questions(
+    mode: str,
+    rows: Sequence[dict],
+    spreads: Optional[Sequence[int]] = None,
+    today: Optional[date] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> List[Dict[str, Any]]:
+    """
+    QuestionResponse fields for each row of a session in mode. spreads
+    (AGE_GUESS / DAILY_CHALLENGE) is the distractor spread per row.
+    """
+    if not rows:
+        return []
+    rng = rng or np.random.default_rng()
+    today = today or date.today()
+
+    questions = [
+        {
+            "id": str(row["id"]),
+            "mode": row["mode"],
+            "difficulty": row["difficulty"],
+            "hints": row.get("hints", []) or [],
+        }
+        for row in rows
+    ]
+
+    if mode == "WHO_OLDER":
+        dob_a = as_days([row.get("dob_a") for row in rows])
+        dob_b = as_days([row.get("dob_b") for row in rows])
+        known = (~np.isnat(dob_a) & ~np.isnat(dob_b)).tolist()
+        choices = np.where(dob_a < dob_b, "A", "B").tolist()
+        years_a = years_of(dob_a).tolist()
+        years_b = years_of(dob_b).tolist()
+        for i, (q, row) in enumerate(zip(questions, rows)):
+            q.update(
+                person_id_a=str(row["person_id_a"]),
+                person_id_b=str(row["person_id_b"]),
+                person_name_a=row["person_name_a"],
+                person_name_b=row["person_name_b"],
+                person_image_url_a=row.get("person_image_url_a"),
+                person_image_url_b=row.get("person_image_url_b"),
+            )
+            if known[i]:
+                q["correct_answer"] = {"choice": choices[i], "year_a": years_a[i], "year_b": years_b[i]}
+        return questions
+
+    for q, row in zip(questions, rows):
+        q.update(
+            person_id=str(row["person_id"]),
+            person_name=row["person_name"],
+            person_image_url=row.get("person_image_url"),
+        )
+
+    if mode == "REVERSE_SIGN":
+        signs = [row["star_sign"] for row in rows]
+        options = sign_options(signs, rng).tolist()
+        answers = [{"sign": s} for s in signs]
+    elif mode == "REVERSE_DOB":
+        years = np.array([row["dob_year"] for row in rows], dtype=float).astype(int)
+        options = year_options(years, rng).tolist()
+        answers = [{"year": y} for y in years.tolist()]
+    elif mode in ("AGE_GUESS", "DAILY_CHALLENGE"):
+        ages = ages_on(as_days([row["date_of_birth"] for row in rows]), today)
+        spread = np.asarray(spreads if spreads is not None else [1] * len(rows), dtype=int)
+        options = age_options(ages, spread, rng).tolist()
+        answers = [{"age": a} for a in ages.tolist()]
+    else:
+        return questions
+
+    for q, opts, answer in zip(questions, options, answers):
+        q["options"] = opts
+        q["correct_answer"] = answer
+    return questions
@@ -0,0 +1,287 @@
+# ofta_core/utils/question_pool.py
+"""
+Process-local index of active question templates for OFTA sessions.
+
+The index is built once at startup and rebuilt whenever the content version
+stored in ofta_app_config ('question_pool_version') changes. Picking the
+questions for a new session is then an in-memory random sample instead of the
+per-request pool/percentile CTEs in sessions._fetch.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from datetime import date, datetime
+from typing import Container, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from ofta_core.utils.seen_filter import OVERSAMPLE, prefer_unseen
+
+logger = logging.getLogger(__name__)
+
+POOL_VERSION_KEY = "question_pool_version"
+REFRESH_INTERVAL_SECONDS = int(os.getenv("QUESTION_POOL_REFRESH_SECONDS", "60"))
+
+
+class PersonRecord(NamedTuple):
+    id: str
+    full_name: str
+    image_url: str
+    primary_category: str
+    star_sign: Optional[str]
+    date_of_birth: date
+    hints: Tuple[str, ...]
+
+
+class TemplateRecord(NamedTuple):
+    id: str
+    mode: str
+    difficulty: int
+    person: PersonRecord
+    person_b: Optional[PersonRecord] = None
+
+    def to_row(self) -> dict:
+        """Flatten into the same row shape sessions._fetch returns."""
+        if self.person_b is not None:
+            a, b = self.person, self.person_b
+            return {
+                "id": self.id, "mode": self.mode, "difficulty": self.difficulty,
+                "person_id_a": a.id, "person_id_b": b.id,
+                "person_name_a": a.full_name, "person_name_b": b.full_name,
+                "person_image_url_a": a.image_url, "person_image_url_b": b.image_url,
+                "hints_a": list(a.hints), "hints_b": list(b.hints),
+                "dob_a": a.date_of_birth, "dob_b": b.date_of_birth,
+            }
+        p = self.person
+        return {
+            "id": self.id, "mode": self.mode, "difficulty": self.difficulty,
+            "person_id": p.id, "person_name": p.full_name,
+            "person_image_url": p.image_url, "hints": list(p.hints),
+            "star_sign": p.star_sign, "date_of_birth": p.date_of_birth,
+            "dob_year": p.date_of_birth.year,
+        }
+
+
+def _as_date(v) -> date:
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    if hasattr(v, "to_pydatetime"):
+        return v.to_pydatetime().date()
+    return datetime.strptime(str(v)[:10], "%Y-%m-%d").date()
+
+
+class QuestionPool:
+    """
+    Active templates bucketed by (mode, difficulty band) and then by the set of
+    person categories they involve, so category filters are a subset test per
+    bucket.
+    """
+
+    def __init__(self) -> None:
+        self.version: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+        self._buckets: Dict[Tuple[str, str], Dict[FrozenSet[str], List[TemplateRecord]]] = {}
+        self._by_id: Dict[str, TemplateRecord] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def template_count(self) -> int:
+        return sum(len(b) for cats in self._buckets.values() for b in cats.values())
+
+    # ── Build ──────────────────────────────────────
+
+    def load(self, db) -> None:
+        """
+        Rebuild the index from the database and swap it in atomically.
+
+        A failed read raises and leaves the current index (or none) in place;
+        an empty index must never come from a query error.
+        """
+        version = fetch_pool_version(db)
+
+        # difficulty_band is persisted by ofta_refresh_popularity_pct()
+        person_rows = db.fetch_all(
+            """
+            SELECT c.id, c.full_name, c.image_url, c.primary_category,
+                   c.star_sign, c.date_of_birth, c.hints_easy, c.difficulty_band
+            FROM ofta_prod.ofta_person c
+            WHERE c.image_url IS NOT NULL AND c.image_url != ''
+              AND c.difficulty_band IS NOT NULL
+              AND EXISTS (
+                  SELECT 1 FROM ofta_prod.ofta_question_template qt
+                  WHERE qt.is_active = TRUE
+                    AND c.id IN (qt.person_id, qt.person_id_a, qt.person_id_b)
+              )
+            """,
+            raise_errors=True,
+        )
+        template_rows = db.fetch_all(
+            """
+            SELECT id, mode, difficulty, person_id, person_id_a, person_id_b
+            FROM ofta_prod.ofta_question_template
+            WHERE is_active = TRUE
+            """,
+            raise_errors=True,
+        )
+
+        persons: Dict[str, PersonRecord] = {}
+        band_of: Dict[str, str] = {}
+        for row in person_rows:
+            pid = str(row["id"])
+            persons[pid] = PersonRecord(
+                id=pid,
+                full_name=row["full_name"],
+                image_url=row["image_url"],
+                primary_category=row["primary_category"],
+                star_sign=row["star_sign"],
+                date_of_birth=_as_date(row["date_of_birth"]),
+                hints=tuple(row["hints_easy"] or ()),
+            )
+            band_of[pid] = row["difficulty_band"]
+
+        buckets: Dict[Tuple[str, str], Dict[FrozenSet[str], List[TemplateRecord]]] = {}
+        by_id: Dict[str, TemplateRecord] = {}
+        for row in template_rows:
+            mode = row["mode"]
+            if mode == "WHO_OLDER":
+                # Both sides of a pair must sit in the same band
+                a = persons.get(str(row["person_id_a"]))
+                b = persons.get(str(row["person_id_b"]))
+                if a is None or b is None or band_of[a.id] != band_of[b.id]:
+                    continue
+                band = band_of[a.id]
+                cats = frozenset((a.primary_category, b.primary_category))
+                record = TemplateRecord(str(row["id"]), mode, int(row["difficulty"]), a, b)
+            else:
+                p = persons.get(str(row["person_id"]))
+                if p is None:
+                    continue
+                band = band_of[p.id]
+                cats = frozenset((p.primary_category,))
+                record = TemplateRecord(str(row["id"]), mode, int(row["difficulty"]), p)
+            buckets.setdefault((mode, band), {}).setdefault(cats, []).append(record)
+            by_id[record.id] = record
+
+        self._buckets = buckets
+        self._by_id = by_id
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+        logger.info(
+            f"Question pool loaded: {self.template_count()} templates, "
+            f"{len(persons)} persons, version={version}"
+        )
+
+    # ── Selection ──────────────────────────────────
+
+    def _candidates(self, mode: str, band: str, categories: Optional[List[str]]) -> List[TemplateRecord]:
+        wanted = frozenset(categories) if categories else None
+        out: List[TemplateRecord] = []
+        for cats, bucket in self._buckets.get((mode, band), {}).items():
+            if wanted is None or cats <= wanted:
+                out.extend(bucket)
+        return out
+
+    def sample(
+        self,
+        mode: str,
+        band: str,
+        k: int,
+        categories: Optional[List[str]] = None,
+        rng: random.Random = None,
+        seen: Optional[Container[str]] = None,
+    ) -> List[TemplateRecord]:
+        """Uniform random sample of up to k templates for one mode/band, unseen ones first."""
+        candidates = self._candidates(mode, band, categories)
+        draw = k * OVERSAMPLE if seen is not None else k
+        picked = (rng or random).sample(candidates, min(draw, len(candidates)))
+        return prefer_unseen(picked, k, seen, key=lambda t: t.id)
+
+    def by_ids(self, template_ids: List[str]) -> Optional[List[TemplateRecord]]:
+        """Templates in the given order, or None when any is not indexed."""
+        picked = [self._by_id.get(str(t)) for t in template_ids]
+        return None if None in picked else picked
+
+
+# ────────────────────────────────────────────────
+# Versioning
+# ────────────────────────────────────────────────
+
+def fetch_pool_version(db) -> str:
+    """Current content version; absent key means version '0'. Raises if the read fails."""
+    value = db.fetch_scalar(
+        "SELECT value FROM ofta_prod.ofta_app_config WHERE key = :key",
+        params={"key": POOL_VERSION_KEY},
+        raise_errors=True,
+    )
+    return str(value) if value is not None else "0"
+
+
+def bump_pool_version(db) -> None:
+    """Signal every worker that active templates or their persons changed."""
+    db.execute_query("SELECT ofta_prod.ofta_bump_question_pool_version()")
+
+
+def refresh_question_sample(db) -> None:
+    """
+    Renumber the SQL sampler's ofta_question_sample if the content version
+    moved since it was last numbered. A no-op in the database otherwise, and
+    for all but one worker when several call it at once.
+    """
+    db.execute_query("SELECT ofta_prod.ofta_refresh_question_sample()")
+
+
+# ────────────────────────────────────────────────
+# Process singleton + background refresh
+# ────────────────────────────────────────────────
+
+_question_pool = QuestionPool()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_question_pool() -> QuestionPool:
+    return _question_pool
+
+
+def reload_question_pool() -> None:
+    """Rebuild this worker's index now (used after a local version bump)."""
+    from ofta_core.utils.util_db import get_db_connector
+    _question_pool.load(get_db_connector())
+
+
+async def _watch_pool_version() -> None:
+    from ofta_core.utils.util_db import get_db_connector
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+        try:
+            db = get_db_connector()
+            version = await asyncio.to_thread(fetch_pool_version, db)
+            if version != _question_pool.version or not _question_pool.ready:
+                await asyncio.to_thread(_question_pool.load, db)
+        except Exception:
+            logger.exception("Question pool refresh failed; keeping current index")
+        try:
+            await asyncio.to_thread(refresh_question_sample, get_db_connector())
+        except Exception:
+            logger.exception("Question sample refresh failed; the SQL sampler keeps the old numbering")
+
+
+async def start_question_pool() -> None:
+    """Initial build plus the version watcher. Failures leave the SQL fallback in place."""
+    global _refresh_task
+    try:
+        await asyncio.to_thread(reload_question_pool)
+    except Exception as e:
+        logger.warning(f"Question pool build deferred, sessions will query the DB: {e}")
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_watch_pool_version())
+
+
+async def stop_question_pool() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
@@ -0,0 +1,151 @@
+# ofta_core/utils/question_sampler.py
+"""
+SQL question sampling, used by start_session while the in-memory question
+pool is not built.
+
+ofta_question_sample numbers the eligible templates of each (mode, band)
+0..n-1 without gaps, grouped by category set, and
+ofta_question_sample_bucket holds each set's seq range. A sample reads the
+buckets, keeps the ones inside the category filter, draws k distinct
+ordinals uniformly from their union and fetches exactly those rows by
+primary key. No query sorts or scans the eligible set, and every eligible
+template is equally likely.
+
+The API workers renumber once per content version (question_pool's
+watcher), so the numbering can trail a change by
+QUESTION_POOL_REFRESH_SECONDS; a template deactivated meanwhile is still
+filtered out when its row is fetched. The buckets and the rows are read in
+separate statements, so a renumbering can commit in between and move the
+picked ordinals onto other templates: the fetch rechecks each row's
+category set against the filter, and such a sample just comes back short.
+
+A (mode, band) with no buckets falls back to the old ORDER BY RANDOM() query,
+so a database where ofta_refresh_question_sample() has not run yet still
+serves sessions.
+"""
+
+import random
+from typing import Container, List, Optional, Sequence, Tuple
+
+from ofta_core.utils.seen_filter import OVERSAMPLE, prefer_unseen
+
+_PAIR_COLUMNS = """
+    qt.id, qt.mode, qt.person_id_a, qt.person_id_b, qt.difficulty,
+    ca.full_name AS person_name_a, cb.full_name AS person_name_b,
+    ca.image_url AS person_image_url_a, cb.image_url AS person_image_url_b,
+    ca.hints_easy AS hints_a, cb.hints_easy AS hints_b,
+    ca.date_of_birth AS dob_a, cb.date_of_birth AS dob_b
+"""
+_SINGLE_COLUMNS = """
+    qt.id, qt.mode, qt.person_id, qt.difficulty,
+    c.full_name AS person_name, c.image_url AS person_image_url,
+    c.hints_easy AS hints, c.star_sign, c.date_of_birth,
+    EXTRACT(YEAR FROM c.date_of_birth) AS dob_year
+"""
+
+
+def pick_ordinals(ranges: Sequence[Tuple[int, int]], k: int, rng: random.Random = None) -> List[int]:
+    """k distinct seqs drawn uniformly from the union of inclusive [seq_from, seq_to] ranges."""
+    sizes = [hi - lo + 1 for lo, hi in ranges]
+    total = sum(sizes)
+    picked = []
+    for i in (rng or random).sample(range(total), min(k, total)):
+        for (lo, _), size in zip(ranges, sizes):
+            if i < size:
+                picked.append(lo + i)
+                break
+            i -= size
+    return picked
+
+
+async def sample_templates(
+    db,
+    mode: str,
+    band: str,
+    k: int,
+    categories: Optional[List[str]] = None,
+    rng: random.Random = None,
+    seen: Optional[Container[str]] = None,
+) -> List[dict]:
+    """Up to k random eligible templates of one mode/band, in sessions row shape, unseen ones first."""
+    draw = k * OVERSAMPLE if seen is not None else k
+    buckets = await db.select(
+        """
+        SELECT categories, seq_from, seq_to FROM ofta_prod.ofta_question_sample_bucket
+        WHERE mode = :mode AND band = :band
+        """,
+        params={"mode": mode, "band": band},
+    )
+    if not buckets:
+        rows = await _sorted_sample(db, mode, band, draw, categories)
+        return prefer_unseen(rows, k, seen, key=lambda r: str(r["id"]))
+
+    wanted = set(categories) if categories else None
+    ranges = [
+        (int(b["seq_from"]), int(b["seq_to"])) for b in buckets
+        if wanted is None or set(b["categories"]) <= wanted
+    ]
+    seqs = pick_ordinals(ranges, draw, rng)
+    if not seqs:
+        return []
+
+    if mode == "WHO_OLDER":
+        columns = _PAIR_COLUMNS
+        joins = """
+            JOIN ofta_prod.ofta_person ca ON qt.person_id_a = ca.id
+            JOIN ofta_prod.ofta_person cb ON qt.person_id_b = cb.id
+        """
+    else:
+        columns = _SINGLE_COLUMNS
+        joins = "JOIN ofta_prod.ofta_person c ON qt.person_id = c.id"
+    # In draw order, which is already random
+    rows = await db.select(
+        f"""
+        SELECT {columns}
+        FROM ofta_prod.ofta_question_sample s
+        JOIN ofta_prod.ofta_question_template qt ON qt.id = s.template_id
+        {joins}
+        WHERE s.mode = :mode AND s.band = :band AND s.seq = ANY(CAST(:seqs AS int[]))
+          AND qt.is_active = TRUE
+          AND (cardinality(CAST(:cats AS text[])) = 0 OR s.categories <@ CAST(:cats AS text[]))
+        ORDER BY array_position(CAST(:seqs AS int[]), s.seq)
+        """,
+        params={"mode": mode, "band": band, "seqs": seqs, "cats": categories or []},
+    )
+    return prefer_unseen(rows, k, seen, key=lambda r: str(r["id"]))
+
+
+async def _sorted_sample(db, mode: str, band: str, k: int, categories: Optional[List[str]]) -> List[dict]:
+    """ORDER BY RANDOM() over the eligible set; only until the numbering is built."""
+    params = {"mode": mode, "band": band, "limit": k, "cats": categories or []}
+    if mode == "WHO_OLDER":
+        return await db.select(
+            f"""
+            SELECT {_PAIR_COLUMNS}
+            FROM ofta_prod.ofta_question_template qt
+            JOIN ofta_prod.ofta_person ca ON qt.person_id_a = ca.id
+            JOIN ofta_prod.ofta_person cb ON qt.person_id_b = cb.id
+            WHERE qt.mode = :mode AND qt.is_active = TRUE
+              AND ca.image_url IS NOT NULL AND ca.image_url != ''
+              AND cb.image_url IS NOT NULL AND cb.image_url != ''
+              AND ca.difficulty_band = :band AND cb.difficulty_band = :band
+              AND (cardinality(CAST(:cats AS text[])) = 0
+                   OR (ca.primary_category = ANY(CAST(:cats AS text[]))
+                       AND cb.primary_category = ANY(CAST(:cats AS text[]))))
+            ORDER BY RANDOM() LIMIT :limit
+            """,
+            params=params,
+        )
+    return await db.select(
+        f"""
+        SELECT {_SINGLE_COLUMNS}
+        FROM ofta_prod.ofta_question_template qt
+        JOIN ofta_prod.ofta_person c ON qt.person_id = c.id
+        WHERE qt.mode = :mode AND qt.is_active = TRUE
+          AND c.image_url IS NOT NULL AND c.image_url != ''
+          AND c.difficulty_band = :band
+          AND (cardinality(CAST(:cats AS text[])) = 0 OR c.primary_category = ANY(CAST(:cats AS text[])))
+        ORDER BY RANDOM() LIMIT :limit
+        """,
+        params=params,
+    )
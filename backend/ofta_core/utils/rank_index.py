@@ -0,0 +1,304 @@
+# ofta_core/utils/rank_index.py
+"""
+Process-local rank index over ofta_user_stats.lifetime_score.
+
+Answers "rank of score X" (RANK() semantics: 1 + players strictly above) and
+"page N of the all-time leaderboard" in logarithmic time, instead of a range
+COUNT(*) in end_session and RANK() OVER ... LIMIT/OFFSET per leaderboard miss.
+
+ofta_user_stats is the persisted snapshot: the index is built from it at
+startup, then kept current two ways:
+- end_session applies the lifetime score it just wrote (this worker, at once)
+- a watcher polls rows whose updated_at_tms moved (every other worker)
+plus a periodic full rebuild, so drift from out-of-band edits heals itself.
+"""
+
+import asyncio
+import logging
+import os
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = float(os.getenv("RANK_INDEX_REFRESH_SECONDS", "5"))
+REBUILD_INTERVAL_SECONDS = float(os.getenv("RANK_INDEX_REBUILD_SECONDS", "900"))
+# Re-read a little history on each poll: updated_at_tms is the writer's
+# transaction start, so a slow commit can land behind the high-water mark.
+_POLL_OVERLAP = timedelta(seconds=30)
+
+Key = Tuple[int, str]   # (lifetime_score, user_id); the leaderboard reads it backwards
+
+
+class RankIndex:
+    """
+    Order-statistics structure: a sorted list split into buckets of about LOAD
+    keys, with a Fenwick tree over bucket sizes for positional lookups.
+
+    Leaderboard order is score DESC, user_id DESC, the same order the SQL
+    keyset queries use, so a cursor means the same thing on either path.
+    """
+
+    LOAD = 512
+
+    def __init__(self) -> None:
+        self._lists: List[List[Key]] = []
+        self._maxes: List[Key] = []
+        self._tree: List[int] = []
+        self._scores: Dict[str, int] = {}
+        self.loaded_at: Optional[datetime] = None
+        self.synced_to: Optional[datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    # ── Build ──────────────────────────────────────
+
+    def load(self, rows) -> None:
+        """Replace the contents with (user_id, lifetime_score) pairs."""
+        scores = {str(uid): int(score) for uid, score in rows}
+        keys = sorted((score, uid) for uid, score in scores.items())
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._lists]
+        self._scores = scores
+        self._build_tree()
+        self.loaded_at = datetime.utcnow()
+
+    # ── Updates ────────────────────────────────────
+
+    def update(self, user_id: str, score: int) -> None:
+        user_id, score = str(user_id), int(score)
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._remove((old, user_id))
+        self._insert((score, user_id))
+        self._scores[user_id] = score
+
+    def discard(self, user_id: str) -> None:
+        old = self._scores.pop(str(user_id), None)
+        if old is not None:
+            self._remove((old, str(user_id)))
+
+    # ── Queries ────────────────────────────────────
+
+    def count_above(self, score: int) -> int:
+        """Players with a lifetime score strictly greater than score."""
+        return len(self._scores) - self._count_below((int(score) + 1, ""))
+
+    def rank_of_score(self, score: int) -> int:
+        return self.count_above(score) + 1
+
+    def rank_of_user(self, user_id: str) -> Optional[int]:
+        score = self._scores.get(str(user_id))
+        return None if score is None else self.rank_of_score(score)
+
+    def score_of(self, user_id: str) -> Optional[int]:
+        return self._scores.get(str(user_id))
+
+    def page(self, offset: int, limit: int) -> List[Tuple[int, str, int]]:
+        """(rank, user_id, score) for leaderboard positions offset .. offset+limit-1."""
+        n = len(self._scores)
+        if offset < 0 or limit <= 0 or offset >= n:
+            return []
+        i, j = self._locate(n - 1 - offset)
+        out: List[Tuple[int, str, int]] = []
+        position, last_score, rank = offset, None, 0
+        while i >= 0 and len(out) < limit:
+            bucket = self._lists[i]
+            while j >= 0 and len(out) < limit:
+                score, user_id = bucket[j]
+                if score != last_score:
+                    # The first key of a score sits at its RANK() - 1, except
+                    # when the page starts mid-run of tied scores
+                    last_score = score
+                    rank = position + 1 if out else self.rank_of_score(score)
+                out.append((rank, user_id, score))
+                position += 1
+                j -= 1
+            i -= 1
+            if i >= 0:
+                j = len(self._lists[i]) - 1
+        return out
+
+    def offset_after(self, score: int, user_id: str) -> int:
+        """Leaderboard position just past the entry (score, user_id), i.e. a cursor."""
+        return len(self._scores) - self._count_below((int(score), str(user_id)))
+
+    def around(self, user_id: str, n: int) -> Tuple[int, List[Tuple[int, str, int]]]:
+        """(offset, page) of up to n entries either side of a player, the player included."""
+        score = self._scores.get(str(user_id))
+        if score is None:
+            return 0, []
+        position = len(self._scores) - 1 - self._count_below((score, str(user_id)))
+        start = max(0, position - n)
+        return start, self.page(start, position - start + 1 + n)
+
+    # ── Internals ──────────────────────────────────
+
+    def _count_below(self, key: Key) -> int:
+        """Number of keys less than key."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            return len(self._scores)
+        return self._prefix(i) + bisect_left(self._lists[i], key)
+
+    def _insert(self, key: Key) -> None:
+        if not self._lists:
+            self._lists, self._maxes = [[key]], [key]
+            self._build_tree()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._lists):
+            i -= 1
+            self._lists[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._lists[i], key)
+        self._tree_add(i, 1)
+        if len(self._lists[i]) > 2 * self.LOAD:
+            bucket = self._lists[i]
+            self._lists[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[i:i + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+            self._build_tree()
+
+    def _remove(self, key: Key) -> None:
+        i = bisect_left(self._maxes, key)
+        bucket = self._lists[i]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i], self._maxes[i]
+            self._build_tree()
+
+    def _build_tree(self) -> None:
+        tree = [0] + [len(bucket) for bucket in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int) -> None:
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, i: int) -> int:
+        """Number of keys in buckets [0, i)."""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """(bucket, offset in bucket) of the key at a global position."""
+        i, step = 0, 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = i + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                i = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return i, position
+
+
+# ────────────────────────────────────────────────
+# Process singleton + background refresh
+# ────────────────────────────────────────────────
+
+_rank_index = RankIndex()
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def get_rank_index() -> RankIndex:
+    return _rank_index
+
+
+async def _load_rank_index(db) -> None:
+    """
+    Build a fresh index and swap it in. A failed read raises instead of
+    reading as "no players", so the current index (or, before the first
+    build, the COUNT fallback in end_session) stays in use.
+    """
+    global _rank_index
+    rows = await db.fetch_all(
+        """
+        SELECT user_id, lifetime_score, updated_at_tms
+        FROM ofta_prod.ofta_user_stats
+        WHERE games_played > 0
+        """,
+        raise_errors=True,
+    )
+    index = RankIndex()
+    await asyncio.to_thread(index.load, [(r["user_id"], r["lifetime_score"]) for r in rows])
+    index.synced_to = max((r["updated_at_tms"] for r in rows), default=None)
+    _rank_index = index
+    logger.info(f"Rank index loaded: {len(index)} players")
+
+
+async def _apply_changes(db) -> None:
+    """Fold in stats rows written by other workers since the last poll."""
+    index = _rank_index
+    since = index.synced_to - _POLL_OVERLAP if index.synced_to else datetime.min
+    rows = await db.fetch_all(
+        """
+        SELECT user_id, lifetime_score, games_played, updated_at_tms
+        FROM ofta_prod.ofta_user_stats
+        WHERE updated_at_tms > :since
+        """,
+        params={"since": since},
+    )
+    for r in rows:
+        if r["games_played"] > 0:
+            index.update(r["user_id"], r["lifetime_score"])
+        else:
+            index.discard(r["user_id"])
+        if index.synced_to is None or r["updated_at_tms"] > index.synced_to:
+            index.synced_to = r["updated_at_tms"]
+
+
+async def _watch_user_stats() -> None:
+    from ofta_core.utils.util_async_db import get_async_db
+    while True:
+        await asyncio.sleep(REFRESH_INTERVAL_SECONDS)
+        try:
+            db = get_async_db()
+            index = _rank_index
+            if not index.ready or (
+                datetime.utcnow() - index.loaded_at
+            ).total_seconds() > REBUILD_INTERVAL_SECONDS:
+                await _load_rank_index(db)
+            else:
+                await _apply_changes(db)
+        except Exception:
+            logger.exception("Rank index refresh failed; keeping current index")
+
+
+async def start_rank_index() -> None:
+    """Initial build plus the change watcher. Failures leave the SQL fallback in place."""
+    global _refresh_task
+    from ofta_core.utils.util_async_db import get_async_db
+    try:
+        await _load_rank_index(get_async_db())
+    except Exception as e:
+        logger.warning(f"Rank index build deferred, ranks will query the DB: {e}")
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_watch_user_stats())
+
+
+async def stop_rank_index() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
@@ -0,0 +1,138 @@
+# ofta_core/utils/response_cache.py
+"""
+Encoded response bodies and HTTP caching for read endpoints.
+
+A route builds its response model once per resource version and keeps the
+JSON text plus an ETag here. Later requests skip the database, the model
+building and the serialization.
+
+Each route also declares a CachePolicy (the Cache-Control it sends) and
+derives its validators from the data version: the pack hash, the board page
+contents, or ofta_app_config.updated_at_tms. send() answers a matching
+If-None-Match, or failing that If-Modified-Since, with a bodiless 304.
+
+The cache shares the cross-worker tier (see shared_cache), so
+invalidating a resource reaches every worker.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+from ofta_core.utils.cache import LoadingCache
+from ofta_core.utils.shared_cache import get_cache_backend
+
+
+class EncodedResponse(NamedTuple):
+    body: str
+    etag: str
+    last_modified: Optional[str] = None     # ISO timestamp of the data version, when known
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """What a route allows clients and shared caches (CDN) to do with its responses."""
+
+    max_age: int = 0
+    public: bool = False
+    immutable: bool = False
+    stale_while_revalidate: int = 0
+    # Request headers the body depends on, for the Vary header
+    vary: Optional[str] = None
+
+    def cache_control(self) -> str:
+        parts = ["public" if self.public else "private"]
+        parts.append(f"max-age={self.max_age}" if self.max_age else "no-cache")
+        if self.stale_while_revalidate:
+            parts.append(f"stale-while-revalidate={self.stale_while_revalidate}")
+        if self.immutable:
+            parts.append("immutable")
+        return ", ".join(parts)
+
+
+# Per-user responses: only the client may keep them, and it must revalidate
+PERSONAL = CachePolicy()
+
+
+response_cache = LoadingCache(maxsize=2048, ttl=3600, name="responses", backend=get_cache_backend())
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from a resource version (or from the body itself)."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def encode(payload: Any, etag: Optional[str] = None,
+           last_modified: Optional[datetime] = None) -> EncodedResponse:
+    if isinstance(payload, BaseModel):
+        body = payload.model_dump_json()
+    else:
+        body = json.dumps(payload, separators=(",", ":"), default=str)
+    return EncodedResponse(
+        body, etag or make_etag(body), last_modified.isoformat() if last_modified else None
+    )
+
+
+async def cached_response(
+    key: Hashable,
+    build: Callable[[], Awaitable[EncodedResponse]],
+    ttl: Optional[float] = None,
+) -> EncodedResponse:
+    # The shared tier hands back a list
+    return EncodedResponse(*await response_cache.get_or_load(key, build, ttl=ttl))
+
+
+def _last_modified(encoded: EncodedResponse) -> Optional[datetime]:
+    if not encoded.last_modified:
+        return None
+    value = datetime.fromisoformat(encoded.last_modified)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)   # *_tms columns are UTC
+    return value.replace(microsecond=0)
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    header = request.headers.get("if-none-match")
+    if header:
+        if header.strip() == "*":
+            return True
+        # Weak comparison, as RFC 9110 asks for If-None-Match
+        candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+        return etag.removeprefix("W/") in candidates
+    # If-Modified-Since only counts when If-None-Match is absent
+    since = request.headers.get("if-modified-since")
+    if since and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def send(
+    request: Request,
+    encoded: EncodedResponse,
+    policy: CachePolicy = PERSONAL,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """200 with the stored body, or 304 when the client already has this version."""
+    last_modified = _last_modified(encoded)
+    headers = {
+        **(headers or {}),
+        "ETag": encoded.etag,
+        "Cache-Control": policy.cache_control(),
+    }
+    if policy.vary:
+        headers["Vary"] = policy.vary
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if not_modified(request, encoded.etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=encoded.body.encode(), media_type="application/json", headers=headers)
@@ -0,0 +1,170 @@
+# ofta_core/utils/scoring.py
+"""
+Answer scoring for OFTA sessions.
+
+Pure functions: no database access. start_session turns each issued question
+into a small answer key; submit_answer scores against that key, whether the
+key came from session state or from a fresh template query.
+"""
+
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+# Below the human reaction floor: the answer is voided
+MIN_HUMAN_RESPONSE_MS = 200
+
+# (streak reached, score multiplier), highest first
+STREAK_MULTIPLIERS = ((10, 2.0), (5, 1.5), (3, 1.2))
+
+
+class ScoredAnswer(NamedTuple):
+    is_correct: bool
+    score_awarded: int
+    correct_answer: dict
+    error_value: Optional[float]
+    streak_bonus: float
+    streak_at_time: int     # stored on ofta_question_attempt
+    streak_after: int       # running streak for the next answer
+
+
+def _iso(v) -> Optional[str]:
+    if v is None:
+        return None
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    if hasattr(v, "to_pydatetime"):
+        return v.to_pydatetime().date().isoformat()
+    return str(v)[:10]
+
+
+def _to_date(v) -> date:
+    return v if isinstance(v, date) and not isinstance(v, datetime) else date.fromisoformat(_iso(v))
+
+
+def calendar_age(dob: date, today: date = None) -> int:
+    """Calendar age; days//365 drifts on leap years."""
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def answer_key_from_row(mode: str, row: dict) -> dict:
+    """
+    JSON-safe answer key for one question row.
+
+    Accepts the start_session row shape (dob_a/dob_b, date_of_birth, star_sign).
+    """
+    if mode == "WHO_OLDER":
+        return {"dob_a": _iso(row.get("dob_a")), "dob_b": _iso(row.get("dob_b"))}
+    return {"dob": _iso(row.get("date_of_birth")), "star_sign": row.get("star_sign")}
+
+
+def streak_multiplier(streak: int) -> float:
+    for threshold, multiplier in STREAK_MULTIPLIERS:
+        if streak >= threshold:
+            return multiplier
+    return 1.0
+
+
+def score_answer(
+    mode: str,
+    key: dict,
+    user_answer: dict,
+    hints_used: int,
+    response_time_ms: int,
+    streak_before: int,
+    today: date = None,
+) -> ScoredAnswer:
+    """
+    Score one answer against its key.
+
+    Args:
+        mode: Session mode
+        key: Output of answer_key_from_row
+        user_answer: Client payload ({"age"}, {"choice"}, {"sign"} or {"year"})
+        hints_used: Hints revealed for this question
+        response_time_ms: Client-reported response time
+        streak_before: Consecutive correct answers before this one
+
+    Returns:
+        ScoredAnswer
+    """
+    is_correct = False
+    correct_answer = {}
+    error_value = None
+    score_awarded = 0
+
+    if mode in ("AGE_GUESS", "DAILY_CHALLENGE"):
+        correct_age = calendar_age(_to_date(key["dob"]), today)
+        user_age = user_answer.get('age', 0)
+        error_value = abs(correct_age - user_age)
+
+        # Scoring: Perfect = 100, within 1 year = 80, within 2 = 60, etc.
+        if error_value == 0:
+            score_awarded = 100
+            is_correct = True
+        elif error_value <= 1:
+            score_awarded = 80
+            is_correct = True
+        elif error_value <= 2:
+            score_awarded = 60
+        elif error_value <= 3:
+            score_awarded = 40
+        elif error_value <= 5:
+            score_awarded = 20
+
+        # Apply hint penalty
+        if hints_used > 0:
+            score_awarded = int(score_awarded * 0.8)
+
+        correct_answer = {"age": correct_age}
+
+    elif mode == "WHO_OLDER":
+        dob_a = _to_date(key["dob_a"])
+        dob_b = _to_date(key["dob_b"])
+
+        correct_choice = 'A' if dob_a < dob_b else 'B'
+        is_correct = user_answer.get('choice', '') == correct_choice
+        score_awarded = 100 if is_correct else 0
+        correct_answer = {
+            "choice": correct_choice,
+            "year_a": dob_a.year,
+            "year_b": dob_b.year,
+        }
+
+    elif mode == "REVERSE_SIGN":
+        correct_sign = key["star_sign"]
+        is_correct = user_answer.get('sign', '') == correct_sign
+        score_awarded = 50 if is_correct else 0
+        correct_answer = {"sign": correct_sign}
+
+    elif mode == "REVERSE_DOB":
+        correct_year = _to_date(key["dob"]).year
+        is_correct = int(user_answer.get('year', 0)) == correct_year
+        score_awarded = 50 if is_correct else 0
+        correct_answer = {"year": correct_year}
+
+    # Anti-cheat: sub-200ms is below the human reaction floor — void the answer
+    if response_time_ms < MIN_HUMAN_RESPONSE_MS:
+        is_correct = False
+        score_awarded = 0
+
+    # Apply streak bonus multiplier
+    streak = streak_before
+    streak_bonus = 1.0
+    if is_correct:
+        streak += 1  # Include the current correct answer
+        streak_bonus = streak_multiplier(streak)
+        if streak_bonus > 1.0:
+            score_awarded = int(score_awarded * streak_bonus)
+
+    return ScoredAnswer(
+        is_correct=is_correct,
+        score_awarded=score_awarded,
+        correct_answer=correct_answer,
+        error_value=error_value,
+        streak_bonus=streak_bonus,
+        streak_at_time=streak,
+        streak_after=streak if is_correct else 0,
+    )
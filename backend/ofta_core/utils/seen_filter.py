@@ -0,0 +1,275 @@
+# ofta_core/utils/seen_filter.py
+"""
+Per-user "recently seen" filter for question selection.
+
+Each player has a rolling Bloom filter over the template ids their sessions
+issued: two generations of FILTER_BITS bits. New ids go into the current
+generation. Once it holds GENERATION_SIZE ids it becomes the previous
+generation and a fresh one starts, so a filter remembers the last
+GENERATION_SIZE to 2 * GENERATION_SIZE templates in a fixed 2 * FILTER_BITS / 8
+bytes. Membership is FILTER_HASHES bit probes, with no look at
+ofta_question_attempt. A false positive only means a template is skipped
+this time round (about 0.5% with the defaults).
+
+start_session oversamples OVERSAMPLE * k candidates and keeps the first k
+unseen ones (prefer_unseen). When a player has seen nearly all of a band,
+seen templates fill the remaining slots, so a session is never short.
+
+Filters are held in a bounded TTL cache per process and persisted lazily:
+record() marks the filter dirty and a flusher upserts dirty filters to
+ofta_user_seen_filter every FLUSH_INTERVAL seconds, and on shutdown. The
+filter is advisory. Across workers the last write wins, and a filter that
+cannot be loaded is neither used nor overwritten.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from typing import Callable, Container, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from ofta_core.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FILTER_BITS = int(os.getenv("SEEN_FILTER_BITS", "4096"))
+FILTER_HASHES = int(os.getenv("SEEN_FILTER_HASHES", "5"))
+GENERATION_SIZE = int(os.getenv("SEEN_FILTER_GENERATION", "300"))
+CACHE_MAX = int(os.getenv("SEEN_FILTER_CACHE_MAX", "20000"))
+CACHE_TTL_SECONDS = float(os.getenv("SEEN_FILTER_TTL_SECONDS", "900"))
+FLUSH_INTERVAL = float(os.getenv("SEEN_FILTER_FLUSH_SECONDS", "5"))
+BATCH_SIZE = 500
+
+# Candidates drawn per wanted question when a filter applies
+OVERSAMPLE = 4
+
+T = TypeVar("T")
+
+# The cross join keeps one row when the user has none, so None means the read failed
+_LOAD_SQL = """
+    SELECT f.bits, f.current_count, f.current_bits, f.previous_bits
+    FROM (SELECT 1) AS one
+    LEFT JOIN ofta_prod.ofta_user_seen_filter f ON f.user_id = :user_id
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO ofta_prod.ofta_user_seen_filter (
+        user_id, bits, current_count, current_bits, previous_bits, updated_at_tms
+    )
+    SELECT u, :bits, c, cb, pb, NOW()
+    FROM unnest(
+        CAST(:user_id AS uuid[]), CAST(:current_count AS int[]),
+        CAST(:current_bits AS bytea[]), CAST(:previous_bits AS bytea[])
+    ) AS t(u, c, cb, pb)
+    ON CONFLICT (user_id) DO UPDATE SET
+        bits = EXCLUDED.bits,
+        current_count = EXCLUDED.current_count,
+        current_bits = EXCLUDED.current_bits,
+        previous_bits = EXCLUDED.previous_bits,
+        updated_at_tms = EXCLUDED.updated_at_tms
+"""
+
+
+@lru_cache(maxsize=100000)
+def _positions(template_id: str) -> Tuple[int, ...]:
+    """Bit positions of an id (double hashing over one 128-bit digest)."""
+    digest = hashlib.blake2b(template_id.encode(), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return tuple((h1 + i * h2) % FILTER_BITS for i in range(FILTER_HASHES))
+
+
+def _has(bits: bytearray, positions: Tuple[int, ...]) -> bool:
+    return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+
+class SeenFilter:
+    """Two-generation Bloom filter of template ids."""
+
+    __slots__ = ("current", "previous", "current_count")
+
+    def __init__(self, current: bytes = b"", previous: bytes = b"", current_count: int = 0) -> None:
+        size = FILTER_BITS // 8
+        self.current = bytearray(current) if len(current) == size else bytearray(size)
+        self.previous = bytearray(previous) if len(previous) == size else bytearray(size)
+        self.current_count = current_count if len(current) == size else 0
+
+    def __contains__(self, template_id: str) -> bool:
+        positions = _positions(str(template_id))
+        return _has(self.current, positions) or _has(self.previous, positions)
+
+    def add(self, template_ids: Sequence[str]) -> None:
+        for template_id in template_ids:
+            positions = _positions(str(template_id))
+            if _has(self.current, positions):
+                continue
+            if self.current_count >= GENERATION_SIZE:
+                self.previous, self.current = self.current, bytearray(len(self.current))
+                self.current_count = 0
+            for p in positions:
+                self.current[p >> 3] |= 1 << (p & 7)
+            self.current_count += 1
+
+
+def prefer_unseen(
+    candidates: Sequence[T],
+    k: int,
+    seen: Optional[Container[str]],
+    key: Callable[[T], str] = str,
+) -> List[T]:
+    """The first k candidates not in seen, topped up with seen ones when too few are new."""
+    if seen is None:
+        return list(candidates[:k])
+    fresh: List[T] = []
+    stale: List[T] = []
+    for candidate in candidates:
+        (stale if key(candidate) in seen else fresh).append(candidate)
+        if len(fresh) == k:
+            break
+    return fresh + stale[:k - len(fresh)]
+
+
+class SeenStore:
+    """Cached filters per user, loaded on first use and written back in batches."""
+
+    def __init__(
+        self,
+        db,
+        maxsize: int = CACHE_MAX,
+        ttl: float = CACHE_TTL_SECONDS,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.db = db
+        self.flush_interval = flush_interval
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="seen_filter")
+        # Kept apart from the cache so eviction cannot lose an unwritten filter
+        self._dirty: Dict[str, SeenFilter] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self.load_failures = 0
+        self.rows_flushed = 0
+        self.flush_failures = 0
+
+    # ── Lifecycle ──────────────────────────────────
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out the dirty filters."""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        while self._dirty:
+            if not await self.flush():
+                logger.warning(f"Seen filter drain failed; {len(self._dirty)} filters not saved")
+                break
+
+    # ── Public API ─────────────────────────────────
+
+    async def get(self, user_id: str) -> Optional[SeenFilter]:
+        """The user's filter, or None when it could not be loaded."""
+        seen = self._dirty.get(user_id) or self._cache.get(user_id)
+        if seen is not None:
+            return seen
+        row = await self.db.fetch_one(_LOAD_SQL, params={"user_id": user_id})
+        if row is None:
+            self.load_failures += 1
+            return None
+        if row["bits"] == FILTER_BITS:
+            seen = SeenFilter(row["current_bits"], row["previous_bits"], row["current_count"])
+        else:
+            # No row yet, or written with another FILTER_BITS
+            seen = SeenFilter()
+        self._cache.set(user_id, seen)
+        return seen
+
+    def record(self, user_id: str, template_ids: Sequence[str]) -> None:
+        """Add issued templates to a loaded filter and schedule it for writing."""
+        seen = self._dirty.get(user_id) or self._cache.get(user_id)
+        if seen is None:
+            # Not loaded: writing a fresh filter would replace the stored one
+            return
+        seen.add(template_ids)
+        self._dirty[user_id] = seen
+        if len(self._dirty) >= BATCH_SIZE:
+            self._wake.set()
+
+    async def flush(self) -> bool:
+        """Upsert one batch of dirty filters; False if the write failed."""
+        user_ids = list(self._dirty)[:BATCH_SIZE]
+        if not user_ids:
+            return True
+        batch = [(uid, self._dirty.pop(uid)) for uid in user_ids]
+        try:
+            await self.db.execute(_UPSERT_SQL, params={
+                "bits": FILTER_BITS,
+                "user_id": [uid for uid, _ in batch],
+                "current_count": [s.current_count for _, s in batch],
+                "current_bits": [bytes(s.current) for _, s in batch],
+                "previous_bits": [bytes(s.previous) for _, s in batch],
+            })
+        except Exception:
+            self.flush_failures += 1
+            logger.exception(f"Seen filter flush of {len(batch)} users failed")
+            for uid, seen in batch:
+                self._dirty.setdefault(uid, seen)
+            return False
+        self.rows_flushed += len(batch)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "dirty": len(self._dirty),
+            "load_failures": self.load_failures,
+            "rows_flushed": self.rows_flushed,
+            "flush_failures": self.flush_failures,
+        }
+
+    # ── Flush ──────────────────────────────────────
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._dirty and not self._stopping and await self.flush():
+                pass
+
+
+# ────────────────────────────────────────────────
+# Process singleton
+# ────────────────────────────────────────────────
+
+_seen_store: Optional[SeenStore] = None
+
+
+def get_seen_store() -> Optional[SeenStore]:
+    """The running store, or None before startup."""
+    return _seen_store
+
+
+async def start_seen_store() -> None:
+    global _seen_store
+    if _seen_store is not None:
+        return
+    from ofta_core.utils.util_async_db import get_async_db
+    store = SeenStore(get_async_db())
+    await store.start()
+    _seen_store = store
+
+
+async def stop_seen_store() -> None:
+    global _seen_store
+    if _seen_store is not None:
+        store, _seen_store = _seen_store, None
+        await store.stop()
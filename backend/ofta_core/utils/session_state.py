@@ -0,0 +1,234 @@
+# ofta_core/utils/session_state.py
+"""
+Server-side state for live game sessions.
+
+start_session records the owner, the mode, the issued questions (template id
+per question_index) and an answer key per question. submit_answer validates
+and scores against it without touching the question tables, and rejects
+answers to questions that were never issued.
+
+Backends (SESSION_STATE_BACKEND):
+- memory   (default) bounded in-process TTL cache. State lives on the worker
+           that started the session; another worker falls back to the
+           database path.
+- postgres UNLOGGED ofta_session_state table shared by every worker; one
+           primary-key read per answer and an atomic jsonb update.
+
+State is advisory either way: when it is missing (expiry, eviction, another
+worker), the endpoints use the database path.
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from ofta_core.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SESSION_STATE_BACKEND = os.getenv("SESSION_STATE_BACKEND", "memory")
+SESSION_STATE_MAX = int(os.getenv("SESSION_STATE_MAX", "100000"))
+SESSION_STATE_TTL_SECONDS = float(os.getenv("SESSION_STATE_TTL_SECONDS", "7200"))
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    user_id: str
+    mode: str
+    questions: List[str] = field(default_factory=list)         # template id by question_index
+    answer_keys: Dict[str, dict] = field(default_factory=dict)  # template id -> answer key
+    answered: Dict[int, bool] = field(default_factory=dict)     # question_index -> is_correct
+    score: int = 0
+    current_streak: int = 0                                      # consecutive correct answers so far
+    closed: bool = False
+
+    def issued_template(self, question_index: int) -> Optional[str]:
+        if 0 <= question_index < len(self.questions):
+            return self.questions[question_index]
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "user_id": self.user_id,
+            "mode": self.mode,
+            "questions": self.questions,
+            "answer_keys": self.answer_keys,
+            "answered": {str(k): v for k, v in self.answered.items()},
+            "score": self.score,
+            "current_streak": self.current_streak,
+            "closed": self.closed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SessionState":
+        data = dict(data)
+        data["answered"] = {int(k): v for k, v in data.get("answered", {}).items()}
+        return cls(**data)
+
+
+# ────────────────────────────────────────────────
+# Backends
+# ────────────────────────────────────────────────
+
+class SessionStateStore:
+    """Interface shared by the backends."""
+
+    name = "base"
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        raise NotImplementedError
+
+    async def put(self, state: SessionState) -> None:
+        raise NotImplementedError
+
+    async def record_answer(self, session_id: str, question_index: int,
+                            is_correct: bool, score_awarded: int, streak_after: int) -> None:
+        """Apply one scored answer; a repeat of an index is ignored.
+
+        streak_after is the session row's streak once the answer is in, so the
+        next answer starts from what the database holds.
+        """
+        raise NotImplementedError
+
+    async def close(self, session_id: str) -> None:
+        """Refuse further answers (end_session is finalizing)."""
+        raise NotImplementedError
+
+    async def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class MemorySessionStore(SessionStateStore):
+    name = "memory"
+
+    def __init__(self, maxsize: int = SESSION_STATE_MAX, ttl: float = SESSION_STATE_TTL_SECONDS) -> None:
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="session_state")
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        return self._cache.get(session_id)
+
+    async def put(self, state: SessionState) -> None:
+        self._cache.set(state.session_id, state)
+
+    async def record_answer(self, session_id: str, question_index: int,
+                            is_correct: bool, score_awarded: int, streak_after: int) -> None:
+        state = self._cache.get(session_id)
+        if state is None or question_index in state.answered:
+            return
+        state.answered[question_index] = is_correct
+        state.score += score_awarded
+        state.current_streak = streak_after
+
+    async def close(self, session_id: str) -> None:
+        state = self._cache.get(session_id)
+        if state is not None:
+            state.closed = True
+
+    async def delete(self, session_id: str) -> None:
+        self._cache.invalidate(session_id)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self._cache.stats()}
+
+
+class PostgresSessionStore(SessionStateStore):
+    """Shared across workers via an UNLOGGED table (no WAL; lost on a crash, which is fine)."""
+
+    name = "postgres"
+    PURGE_EVERY = 1000
+
+    def __init__(self, db, ttl: float = SESSION_STATE_TTL_SECONDS) -> None:
+        self.db = db
+        self.ttl = ttl
+        self._puts = 0
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        data = await self.db.fetch_scalar(
+            """
+            SELECT state FROM ofta_prod.ofta_session_state
+            WHERE session_id = :session_id AND expires_at_tms > NOW()
+            """,
+            params={"session_id": session_id},
+        )
+        return SessionState.from_dict(data) if data is not None else None
+
+    async def put(self, state: SessionState) -> None:
+        await self.db.execute(
+            """
+            INSERT INTO ofta_prod.ofta_session_state (session_id, state, expires_at_tms)
+            VALUES (:session_id, CAST(:state AS jsonb), NOW() + make_interval(secs => :ttl))
+            ON CONFLICT (session_id) DO UPDATE
+            SET state = EXCLUDED.state, expires_at_tms = EXCLUDED.expires_at_tms
+            """,
+            params={"session_id": state.session_id, "state": json.dumps(state.to_dict()),
+                    "ttl": float(self.ttl)},
+        )
+        self._puts += 1
+        if self._puts % self.PURGE_EVERY == 0:
+            await self.db.execute(
+                "DELETE FROM ofta_prod.ofta_session_state WHERE expires_at_tms <= NOW()"
+            )
+
+    async def record_answer(self, session_id: str, question_index: int,
+                            is_correct: bool, score_awarded: int, streak_after: int) -> None:
+        # One statement, so concurrent answers on other workers cannot interleave
+        await self.db.execute(
+            """
+            UPDATE ofta_prod.ofta_session_state
+            SET state = jsonb_set(
+                    jsonb_set(
+                        jsonb_set(state, ARRAY['answered', CAST(:idx AS text)], to_jsonb(CAST(:is_correct AS boolean))),
+                        '{score}', to_jsonb((state->>'score')::int + :score_awarded)
+                    ),
+                    '{current_streak}', to_jsonb(CAST(:streak_after AS integer))
+                )
+            WHERE session_id = :session_id
+              AND NOT (state->'answered' ? CAST(:idx AS text))
+            """,
+            params={"session_id": session_id, "idx": str(question_index),
+                    "is_correct": is_correct, "score_awarded": score_awarded,
+                    "streak_after": streak_after},
+        )
+
+    async def close(self, session_id: str) -> None:
+        await self.db.execute(
+            """
+            UPDATE ofta_prod.ofta_session_state
+            SET state = jsonb_set(state, '{closed}', 'true'::jsonb)
+            WHERE session_id = :session_id
+            """,
+            params={"session_id": session_id},
+        )
+
+    async def delete(self, session_id: str) -> None:
+        await self.db.execute(
+            "DELETE FROM ofta_prod.ofta_session_state WHERE session_id = :session_id",
+            params={"session_id": session_id},
+        )
+
+
+# ────────────────────────────────────────────────
+# Process singleton
+# ────────────────────────────────────────────────
+
+_session_store: Optional[SessionStateStore] = None
+
+
+def get_session_store() -> SessionStateStore:
+    global _session_store
+    if _session_store is None:
+        if SESSION_STATE_BACKEND == "postgres":
+            from ofta_core.utils.util_async_db import get_async_db
+            _session_store = PostgresSessionStore(get_async_db())
+        else:
+            if SESSION_STATE_BACKEND != "memory":
+                logger.warning(f"Unknown SESSION_STATE_BACKEND={SESSION_STATE_BACKEND!r}, using memory")
+            _session_store = MemorySessionStore()
+    return _session_store
@@ -0,0 +1,253 @@
+# ofta_core/utils/shared_cache.py
+"""
+Cache tier shared by every API worker, behind the in-process LoadingCache.
+
+A LoadingCache built with a backend looks here on a local miss before
+running its loader, and stores what it loads for the other workers. An
+invalidation deletes the shared entries and is broadcast, so every worker
+drops its local copies too, not just the one that handled the write.
+
+Backends (CACHE_BACKEND):
+- memory   (default) one process only; a stand-in with the same semantics,
+           used in tests and single-worker deployments.
+- postgres UNLOGGED ofta_cache_entry table for values, LISTEN/NOTIFY on
+           ofta_cache_invalidate for invalidations.
+
+Values are stored as JSON text (LoadingCache serialises them; UUIDs, dates
+and Decimals come back as strings). Keys are namespaced by cache name and
+are LoadingCache keys joined with "|", so "daily|2025-01-01" is a prefix of
+every page of that day.
+"""
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from ofta_core.utils.cache import TTLCache, matches_prefix
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_BACKEND_MAX = int(os.getenv("CACHE_BACKEND_MAX", "10000"))
+INVALIDATE_CHANNEL = "ofta_cache_invalidate"
+
+InvalidateCallback = Callable[[str], None]
+
+
+# ────────────────────────────────────────────────
+# Backends
+# ────────────────────────────────────────────────
+
+class CacheBackend:
+    """Interface shared by the backends."""
+
+    name = "base"
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List[InvalidateCallback]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations_sent = 0
+        self.invalidations_received = 0
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """The stored value, or None when missing or expired."""
+        raise NotImplementedError
+
+    async def set(self, namespace: str, key: str, data: str, ttl: float) -> None:
+        """Store JSON text for ttl seconds."""
+        raise NotImplementedError
+
+    async def invalidate_prefix(self, namespace: str, prefix: str) -> None:
+        """Delete matching entries and tell every worker to drop its local copies."""
+        raise NotImplementedError
+
+    def subscribe(self, namespace: str, callback: InvalidateCallback) -> None:
+        """callback(prefix) runs for each invalidation broadcast in namespace."""
+        self._subscribers.setdefault(namespace, []).append(callback)
+
+    def _deliver(self, namespace: str, prefix: str) -> None:
+        self.invalidations_received += 1
+        for callback in self._subscribers.get(namespace, []):
+            try:
+                callback(prefix)
+            except Exception:
+                logger.exception(f"Cache invalidation callback failed for {namespace}:{prefix}")
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "invalidations_sent": self.invalidations_sent,
+            "invalidations_received": self.invalidations_received,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryCacheBackend(CacheBackend):
+    name = "memory"
+
+    def __init__(self, maxsize: int = CACHE_BACKEND_MAX) -> None:
+        super().__init__()
+        self._cache = TTLCache(maxsize=maxsize, ttl=60, name="shared")
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        data = self._cache.get((namespace, key))
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(data)
+
+    async def set(self, namespace: str, key: str, data: str, ttl: float) -> None:
+        self._cache.set((namespace, key), data, ttl)
+
+    async def invalidate_prefix(self, namespace: str, prefix: str) -> None:
+        self._cache.invalidate_where(lambda k: k[0] == namespace and matches_prefix(k[1], prefix))
+        self.invalidations_sent += 1
+        self._deliver(namespace, prefix)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._cache)}
+
+
+class PostgresCacheBackend(CacheBackend):
+    """Shared across workers via an UNLOGGED table plus LISTEN/NOTIFY."""
+
+    name = "postgres"
+    PURGE_EVERY = 1000
+
+    def __init__(self, db) -> None:
+        super().__init__()
+        self.db = db
+        self._listener = None
+        self._sets = 0
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = await self.db.fetch_scalar(
+            """
+            SELECT value FROM ofta_prod.ofta_cache_entry
+            WHERE cache_key = :cache_key AND expires_at_tms > NOW()
+            """,
+            params={"cache_key": f"{namespace}:{key}"},
+        )
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, namespace: str, key: str, data: str, ttl: float) -> None:
+        try:
+            await self.db.execute(
+                """
+                INSERT INTO ofta_prod.ofta_cache_entry (cache_key, value, expires_at_tms)
+                VALUES (:cache_key, CAST(:value AS jsonb), NOW() + make_interval(secs => :ttl))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET value = EXCLUDED.value, expires_at_tms = EXCLUDED.expires_at_tms
+                """,
+                params={"cache_key": f"{namespace}:{key}", "value": data, "ttl": float(ttl)},
+            )
+            self._sets += 1
+            if self._sets % self.PURGE_EVERY == 0:
+                await self.db.execute(
+                    "DELETE FROM ofta_prod.ofta_cache_entry WHERE expires_at_tms <= NOW()"
+                )
+        except Exception as e:
+            # The value is still served from this worker's local tier
+            self.errors += 1
+            logger.warning(f"Shared cache write failed for {namespace}:{key}: {e}")
+
+    async def invalidate_prefix(self, namespace: str, prefix: str) -> None:
+        # Delete and notify in one statement; NOTIFY is delivered on commit,
+        # so no worker can re-read the deleted rows after hearing about it
+        try:
+            await self.db.execute(
+                """
+                WITH deleted AS (
+                    DELETE FROM ofta_prod.ofta_cache_entry
+                    WHERE cache_key = :exact OR cache_key LIKE :pattern
+                    RETURNING 1
+                )
+                SELECT pg_notify(:channel, :payload)
+                """,
+                params={
+                    "exact": f"{namespace}:{prefix}",
+                    "pattern": f"{_like_escape(namespace)}:{_like_escape(prefix)}|%",
+                    "channel": INVALIDATE_CHANNEL,
+                    "payload": json.dumps({"ns": namespace, "prefix": prefix}),
+                },
+            )
+        except Exception as e:
+            # Local copies were dropped; others expire with their TTL
+            self.errors += 1
+            logger.warning(f"Shared cache invalidation failed for {namespace}:{prefix}: {e}")
+            return
+        self.invalidations_sent += 1
+
+    def _on_notify(self, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            self._deliver(message["ns"], message["prefix"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed cache invalidation: {payload!r}")
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = await self.db.listen(INVALIDATE_CHANNEL, self._on_notify)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {**super().stats(), "listening": self._listener is not None}
+
+
+def _like_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# ────────────────────────────────────────────────
+# Process singleton
+# ────────────────────────────────────────────────
+
+_cache_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    global _cache_backend
+    if _cache_backend is None:
+        if CACHE_BACKEND == "postgres":
+            from ofta_core.utils.util_async_db import get_async_db
+            _cache_backend = PostgresCacheBackend(get_async_db())
+        else:
+            if CACHE_BACKEND != "memory":
+                logger.warning(f"Unknown CACHE_BACKEND={CACHE_BACKEND!r}, using memory")
+            _cache_backend = MemoryCacheBackend()
+    return _cache_backend
+
+
+async def start_cache_backend() -> None:
+    """Start listening for invalidations. Failures leave the local tiers working alone."""
+    try:
+        await get_cache_backend().start()
+    except Exception as e:
+        logger.warning(f"Shared cache invalidations not received on this worker: {e}")
+
+
+async def stop_cache_backend() -> None:
+    if _cache_backend is not None:
+        await _cache_backend.stop()
@@ -0,0 +1,318 @@
+# ofta_core/utils/telemetry_writer.py
+"""
+Batched ingestion for ofta_telemetry_event.
+
+The telemetry endpoints hand their rows to the process TelemetryWriter and
+return 202 without touching the database. A flusher writes the queue with one
+multi-row INSERT per batch, every FLUSH_INTERVAL seconds or as soon as
+BATCH_SIZE rows are waiting, and drains it on shutdown.
+
+Telemetry is best-effort, so unlike the attempt writer there is no journal:
+the queue is bounded at QUEUE_MAX rows and events arriving while it is full
+are dropped and counted (stats()["dropped"]). A failed flush puts its rows
+back at the head of the queue for the next round, as far as there is room.
+A batch the database rejects for its data (SQLSTATE class 22/23) is split in
+halves until the offending rows stand alone; those are dropped. A batch
+that fails MAX_BATCH_ATTEMPTS flushes in a row for any other reason is
+dropped too, so nothing holds the head of the queue forever.
+
+Storage is compact: event_data is encoded once, on receipt, and event_type,
+device_os and app_version are interned in ofta_telemetry_label. The label
+ids are cached per process, so a flush only round-trips for strings it has
+not seen before. The table is partitioned by month; the writer makes sure
+the coming months' partitions exist once a day.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import orjson
+
+from ofta_core.utils.util_async_db import is_data_error
+
+logger = logging.getLogger(__name__)
+
+QUEUE_MAX = int(os.getenv("TELEMETRY_QUEUE_MAX", "50000"))
+BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "1000"))
+FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_SECONDS", "1.0"))
+MAX_BATCH_ATTEMPTS = int(os.getenv("TELEMETRY_MAX_BATCH_ATTEMPTS", "5"))
+
+PARTITION_DAYS_AHEAD = 60
+LABEL_CACHE_MAX = 10000
+
+# One statement for any batch size: the batch goes in as parallel arrays
+_INSERT_SQL = """
+    INSERT INTO ofta_prod.ofta_telemetry_event (
+        server_ts_tms, client_ts_tms, user_id,
+        event_type_id, device_os_id, app_version_id, event_data
+    )
+    SELECT * FROM unnest(
+        CAST(:server_ts_tms AS timestamp[]), CAST(:client_ts_tms AS timestamp[]),
+        CAST(:user_id AS uuid[]),
+        CAST(:event_type_id AS int[]), CAST(:device_os_id AS int[]),
+        CAST(:app_version_id AS int[]), CAST(:event_data AS jsonb[])
+    )
+"""
+_COLUMNS = ("server_ts_tms", "client_ts_tms", "user_id", "event_data")
+_LABELS = ("event_type", "device_os", "app_version")
+
+# Ids for the given strings, adding the new ones. Rows a concurrent writer
+# inserts meanwhile are invisible to this statement; the caller retries.
+_LABEL_SQL = """
+    WITH wanted AS (
+        SELECT * FROM unnest(CAST(:kind AS varchar[]), CAST(:value AS varchar[])) AS w(kind, value)
+    ), added AS (
+        INSERT INTO ofta_prod.ofta_telemetry_label (kind, value)
+        SELECT kind, value FROM wanted
+        ON CONFLICT (kind, value) DO NOTHING
+        RETURNING id, kind, value
+    )
+    SELECT id, kind, value FROM added
+    UNION ALL
+    SELECT l.id, l.kind, l.value
+    FROM ofta_prod.ofta_telemetry_label l JOIN wanted USING (kind, value)
+"""
+
+# (kind, value) -> ofta_telemetry_label.id; labels never change once written
+_label_ids: Dict[Tuple[str, str], int] = {}
+
+
+def encode_event_data(event_data: Optional[dict]) -> Optional[str]:
+    """event_data as JSON text, handed to the jsonb column as-is."""
+    if event_data is None:
+        return None
+    return orjson.dumps(event_data).decode()
+
+
+async def _resolve_labels(db, rows: List[dict]) -> None:
+    labels = {(kind, row[kind]) for row in rows for kind in _LABELS if row.get(kind) is not None}
+    missing = labels - _label_ids.keys()
+    if len(_label_ids) + len(missing) > LABEL_CACHE_MAX:
+        _label_ids.clear()
+        missing = labels
+    for _ in range(2):
+        if not missing:
+            return
+        found = await db.select(_LABEL_SQL, params={
+            "kind": [k for k, _ in missing], "value": [v for _, v in missing],
+        })
+        for r in found:
+            _label_ids[(r["kind"], r["value"])] = int(r["id"])
+        missing -= {(r["kind"], r["value"]) for r in found}
+    raise RuntimeError(f"Could not intern {len(missing)} telemetry labels")
+
+
+def _label_id(row: dict, kind: str) -> Optional[int]:
+    value = row.get(kind)
+    return None if value is None else _label_ids[(kind, value)]
+
+
+async def insert_events(db, rows: List[dict]) -> None:
+    """Write telemetry rows now, one statement per BATCH_SIZE rows."""
+    for i in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[i:i + BATCH_SIZE]
+        await _resolve_labels(db, chunk)
+        params: Dict[str, List[Any]] = {c: [r.get(c) for r in chunk] for c in _COLUMNS}
+        for kind in _LABELS:
+            params[f"{kind}_id"] = [_label_id(r, kind) for r in chunk]
+        await db.execute(_INSERT_SQL, params=params)
+
+
+async def ensure_partitions(db, today: date) -> int:
+    """Create the missing monthly partitions through PARTITION_DAYS_AHEAD."""
+    created = await db.fetch_scalar(
+        "SELECT ofta_prod.ofta_ensure_telemetry_partitions(:start, :through)",
+        params={"start": today, "through": today + timedelta(days=PARTITION_DAYS_AHEAD)},
+    )
+    return int(created or 0)
+
+
+class TelemetryWriter:
+    """Bounded queue plus background flusher for telemetry rows (one per process)."""
+
+    def __init__(self, db, max_queue: int = QUEUE_MAX, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 max_attempts: int = MAX_BATCH_ATTEMPTS) -> None:
+        self.db = db
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._head_failures = 0     # consecutive failed flushes of the head batch
+        self._queue: Deque[dict] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._partitions_checked: Optional[date] = None
+        self.accepted = 0
+        self.dropped = 0
+        self.rows_flushed = 0
+        self.flush_failures = 0
+        self.rows_rejected = 0
+
+    # ── Lifecycle ──────────────────────────────────
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+            logger.info(f"Telemetry writer started (queue={self.max_queue}, batch={self.batch_size})")
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out what is still queued."""
+        if self._task is not None:
+            # Let an in-flight batch finish rather than cancelling it
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        while self._queue:
+            if not await self.flush():
+                logger.warning(f"Telemetry drain failed; {len(self._queue)} events lost")
+                break
+
+    # ── Public API ─────────────────────────────────
+
+    def offer(self, rows: List[dict]) -> int:
+        """Queue rows without waiting; returns how many fit, the rest are dropped."""
+        room = max(0, self.max_queue - len(self._queue))
+        taken = rows[:room]
+        self._queue.extend(taken)
+        self.accepted += len(taken)
+        self.dropped += len(rows) - len(taken)
+        if len(self._queue) >= self.batch_size:
+            self._wake.set()
+        return len(taken)
+
+    async def flush(self) -> bool:
+        """Write one batch from the head of the queue; False if the insert failed."""
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return True
+        try:
+            await insert_events(self.db, batch)
+        except Exception as e:
+            self.flush_failures += 1
+            if is_data_error(e):
+                # Some rows can never go in; isolate them and write the rest
+                logger.warning(f"Telemetry batch of {len(batch)} events rejected, splitting it: {e}")
+                return await self._insert_bisected(batch)
+            self._head_failures += 1
+            if self._head_failures >= self.max_attempts:
+                logger.error(f"Telemetry flush of {len(batch)} events failed "
+                             f"{self._head_failures} times, dropping them: {e}")
+                self._head_failures = 0
+                self.dropped += len(batch)
+                return False
+            logger.exception(f"Telemetry flush of {len(batch)} events failed")
+            self._requeue(batch)
+            return False
+        self._head_failures = 0
+        self.rows_flushed += len(batch)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "rows_flushed": self.rows_flushed,
+            "rows_rejected": self.rows_rejected,
+            "flush_failures": self.flush_failures,
+        }
+
+    # ── Flush ──────────────────────────────────────
+
+    async def _insert_bisected(self, rows: List[dict]) -> bool:
+        """
+        Write a batch the database rejected: each half is tried on its own,
+        down to single rows, and a row rejected alone is dropped. Any other
+        error puts the rows not written yet back at the head of the queue.
+        """
+        parts = [rows]   # a stack; the earliest rows are on top
+        while parts:
+            part = parts.pop()
+            if part is not rows:
+                try:
+                    await insert_events(self.db, part)
+                    self.rows_flushed += len(part)
+                    continue
+                except Exception as e:
+                    if not is_data_error(e):
+                        logger.warning(f"Telemetry flush failed while splitting a rejected batch: {e}")
+                        self._requeue(part + [r for p in reversed(parts) for r in p])
+                        return False
+            if len(part) == 1:
+                self.rows_rejected += 1
+                self.dropped += 1
+                logger.warning(f"Dropping a telemetry event the database rejects: {part[0].get('event_type')!r}")
+                continue
+            mid = len(part) // 2
+            parts += [part[mid:], part[:mid]]
+        return True
+
+    def _requeue(self, rows: List[dict]) -> None:
+        """Back to the head, keeping order, as far as new arrivals left room."""
+        room = max(0, self.max_queue - len(self._queue))
+        self.dropped += len(rows) - min(room, len(rows))
+        self._queue.extendleft(reversed(rows[:room]))
+
+    async def _maintain_partitions(self) -> None:
+        today = date.today()
+        if self._partitions_checked == today:
+            return
+        try:
+            created = await ensure_partitions(self.db, today)
+        except Exception as e:
+            # Rows still land in the default partition meanwhile
+            logger.warning(f"Telemetry partition check failed: {e}")
+            return
+        self._partitions_checked = today
+        if created:
+            logger.info(f"Created {created} telemetry partitions")
+
+    async def _flush_loop(self) -> None:
+        while not self._stopping:
+            await self._maintain_partitions()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Full batches go out back to back; a failure waits for the next round
+            while self._queue and await self.flush():
+                if len(self._queue) < self.batch_size or self._stopping:
+                    break
+
+
+# ────────────────────────────────────────────────
+# Process singleton
+# ────────────────────────────────────────────────
+
+_telemetry_writer: Optional[TelemetryWriter] = None
+
+
+def get_telemetry_writer() -> Optional[TelemetryWriter]:
+    """The running writer, or None before startup."""
+    return _telemetry_writer
+
+
+async def start_telemetry_writer() -> None:
+    global _telemetry_writer
+    if _telemetry_writer is not None:
+        return
+    from ofta_core.utils.util_async_db import get_async_db
+    writer = TelemetryWriter(get_async_db())
+    await writer.start()
+    _telemetry_writer = writer
+
+
+async def stop_telemetry_writer() -> None:
+    global _telemetry_writer
+    if _telemetry_writer is not None:
+        writer, _telemetry_writer = _telemetry_writer, None
+        await writer.stop()
@@ -0,0 +1,123 @@
+# ofta_core/utils/user_identity.py
+"""
+firebase_uid → ofta_user_account.id resolution for OFTA endpoints.
+
+Every authenticated endpoint needs the internal user id. Lookups go through a
+bounded TTL cache so a game (start, ten answers, end) hits the account table
+once instead of on every call. Register fills the cache; account deletion and
+admin bans invalidate it on every worker (see forget_user).
+"""
+
+import os
+import logging
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, status
+
+from ofta_core.utils.cache import TTLCache
+from ofta_core.utils.firebase_auth import get_current_user, get_optional_user
+from ofta_core.utils.shared_cache import get_cache_backend
+from ofta_core.utils.util_async_db import get_async_db
+
+logger = logging.getLogger(__name__)
+
+DEV_FIREBASE_UID = "dev_user_123"
+DEV_USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class UserIdentity(NamedTuple):
+    user_id: str
+    is_banned: bool
+
+
+user_id_cache = TTLCache(
+    maxsize=int(os.getenv("USER_ID_CACHE_SIZE", "50000")),
+    ttl=float(os.getenv("USER_ID_CACHE_TTL_SECONDS", "300")),
+    name="user_id",
+)
+
+
+def remember_user(firebase_uid: str, user_id, is_banned: bool = False) -> None:
+    """Seed the cache, e.g. right after registration."""
+    user_id_cache.set(firebase_uid, UserIdentity(str(user_id), is_banned))
+
+
+async def forget_user(firebase_uid: Optional[str]) -> None:
+    """
+    Drop a cached mapping (account deleted, banned or unbanned) on every
+    worker: the invalidation goes out on the shared cache channel.
+    """
+    if firebase_uid:
+        user_id_cache.invalidate(firebase_uid)
+        await get_cache_backend().invalidate_prefix(user_id_cache.name, firebase_uid)
+
+
+def _on_forget(firebase_uid: str) -> None:
+    user_id_cache.invalidate(firebase_uid)
+
+
+get_cache_backend().subscribe(user_id_cache.name, _on_forget)
+
+
+async def resolve_user(firebase_uid: str) -> Optional[UserIdentity]:
+    """Cached lookup; None when the uid has no account."""
+    identity = user_id_cache.get(firebase_uid)
+    if identity is not None:
+        return identity
+
+    row = await get_async_db().fetch_one(
+        "SELECT id, is_banned FROM ofta_prod.ofta_user_account WHERE firebase_uid = :firebase_uid",
+        params={"firebase_uid": firebase_uid}
+    )
+    if row is None:
+        return None
+    identity = UserIdentity(str(row["id"]), bool(row["is_banned"]))
+    user_id_cache.set(firebase_uid, identity)
+    return identity
+
+
+# ────────────────────────────────────────────────
+# FastAPI dependencies
+# ────────────────────────────────────────────────
+
+async def get_current_user_id(
+    current_user: dict = Depends(get_current_user)
+) -> str:
+    """
+    Internal user id for the authenticated caller.
+
+    Raises:
+        HTTPException: 404 if not registered, 403 if banned
+    """
+    firebase_uid = current_user["firebase_uid"]
+
+    # Dev mock - only in development environment
+    if firebase_uid == DEV_FIREBASE_UID:
+        if os.getenv("ENVIRONMENT") != "development":
+            raise HTTPException(status_code=403, detail="Dev users not allowed in this environment")
+        return DEV_USER_ID
+
+    identity = await resolve_user(firebase_uid)
+    if identity is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found. Please register first."
+        )
+    if identity.is_banned:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Account suspended"
+        )
+    return identity.user_id
+
+
+async def get_optional_user_id(
+    current_user: Optional[dict] = Depends(get_optional_user)
+) -> Optional[str]:
+    """Internal user id when the caller is signed in and registered, else None."""
+    if current_user is None or current_user["firebase_uid"] == DEV_FIREBASE_UID:
+        return None
+    identity = await resolve_user(current_user["firebase_uid"])
+    if identity is None or identity.is_banned:
+        return None
+    return identity.user_id
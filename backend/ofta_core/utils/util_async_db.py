@@ -0,0 +1,272 @@
+# ofta_core/utils/util_async_db.py
+"""
+Async database connector for OFTA request handlers.
+
+Same query style as OftaDBConnector (SQL with :name parameters) but built on
+an asyncpg pool, so a query awaits instead of blocking the event loop.
+Rows come back as plain dicts; jsonb columns are decoded to Python objects.
+"""
+
+import asyncio
+import json
+import os
+import re
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Database credentials
+ofta_db_host = os.getenv('OFTA_DB_HOST')
+ofta_db_port = os.getenv('OFTA_DB_PORT')
+ofta_db_name = os.getenv('OFTA_DB_NAME')
+ofta_db_username = os.getenv('OFTA_DB_USERNAME')
+ofta_db_password = os.getenv('OFTA_DB_PASSWORD')
+
+logger = logging.getLogger(__name__)
+
+# :name but not the second half of a ::cast
+_PARAM_RE = re.compile(r"(?<![:\w]):([A-Za-z_][A-Za-z0-9_]*)")
+
+# Global connector instance for singleton pattern
+_global_async_db = None
+
+
+def get_async_db(force_new=False):
+    """
+    Singleton pattern to ensure only one async connector per process.
+
+    Args:
+        force_new (bool): Force creation of new connector (useful for testing)
+
+    Returns:
+        OftaAsyncDBConnector: Shared async database connector instance
+    """
+    global _global_async_db
+
+    if _global_async_db is None or force_new:
+        _global_async_db = OftaAsyncDBConnector()
+        logger.info("Created OftaAsyncDBConnector")
+
+    return _global_async_db
+
+
+async def close_async_db():
+    """Close the shared pool (called on application shutdown)."""
+    if _global_async_db is not None:
+        await _global_async_db.close()
+
+
+def _compile(query: str, params: Optional[dict]) -> Tuple[str, list]:
+    """Rewrite :name placeholders to asyncpg's $n and order the arguments."""
+    if not params:
+        return query, []
+    order: Dict[str, int] = {}
+
+    def _sub(m):
+        name = m.group(1)
+        if name not in params:
+            return m.group(0)
+        if name not in order:
+            order[name] = len(order) + 1
+        return f"${order[name]}"
+
+    sql = _PARAM_RE.sub(_sub, query)
+    return sql, [params[name] for name in order]
+
+
+def _encode_json(value: Any) -> str:
+    # Callers may pass an already-serialised string (CAST(:x AS jsonb))
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+async def _init_connection(conn) -> None:
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename, encoder=_encode_json, decoder=json.loads, schema="pg_catalog"
+        )
+
+
+class OftaAsyncDBConnector:
+    """asyncpg pool wrapper with the select/execute surface of OftaDBConnector."""
+
+    def __init__(
+        self,
+        host: str = ofta_db_host,
+        database: str = ofta_db_name,
+        port: int = ofta_db_port,
+        username: str = '',
+        password: str = '',
+        ssl_mode: str = 'require',
+        min_size: int = 2,
+        max_size: int = int(os.getenv("OFTA_DB_ASYNC_POOL_SIZE", "20")),
+        command_timeout: float = 30,
+    ) -> None:
+        if os.getenv("K_SERVICE"):
+            # Running on Cloud Run: use the Cloud SQL Unix socket
+            host = f"/cloudsql/{os.getenv('DB_CONNECTION_NAME')}"
+            port = None
+        self._connect_kwargs = {
+            "host": host,
+            "port": int(port) if port else None,
+            "database": database,
+            "user": username or ofta_db_username,
+            "password": password or ofta_db_password,
+            "ssl": None if ssl_mode == 'disable' or str(host).startswith("/") else ssl_mode,
+            "min_size": min_size,
+            "max_size": max_size,
+            "command_timeout": command_timeout,
+            "init": _init_connection,
+        }
+        self.pool: Optional[asyncpg.Pool] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        """Create the pool; later calls are no-ops."""
+        if self.pool is not None:
+            return
+        async with self._lock:
+            if self.pool is None:
+                self.pool = await asyncpg.create_pool(**self._connect_kwargs)
+                logger.info(
+                    f"Async database pool created with max_size={self._connect_kwargs['max_size']}"
+                )
+
+    async def select(self, query: str, params: dict = None, raise_errors: bool = False) -> List[dict]:
+        """
+        Executes a SELECT query and returns the rows as dicts.
+
+        Args:
+            query (str): SQL SELECT query
+            params (dict, optional): Query parameters
+            raise_errors (bool): Re-raise failures instead of returning []
+
+        Returns:
+            list[dict]: Query result rows (empty on failure, like select_df)
+        """
+        await self.connect()
+        sql, args = _compile(query, params)
+        try:
+            records = await self.pool.fetch(sql, *args)
+            return [dict(r) for r in records]
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error(f"Query execution failed: {e}")
+            if raise_errors:
+                raise
+            return []
+
+    async def fetch_all(self, query: str, params: dict = None, raise_errors: bool = False) -> List[dict]:
+        """Alias of select(), matching OftaDBConnector.fetch_all."""
+        return await self.select(query, params, raise_errors=raise_errors)
+
+    async def fetch_one(self, query: str, params: dict = None) -> Optional[dict]:
+        """
+        Executes a SELECT query and returns the first row as a dict.
+
+        Args:
+            query (str): SQL SELECT query
+            params (dict, optional): Query parameters
+
+        Returns:
+            dict | None: First row, or None when there are no rows (or on failure)
+        """
+        await self.connect()
+        sql, args = _compile(query, params)
+        try:
+            record = await self.pool.fetchrow(sql, *args)
+            return dict(record) if record is not None else None
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error(f"Query execution failed: {e}")
+            return None
+
+    async def fetch_scalar(self, query: str, params: dict = None):
+        """
+        Executes a SELECT query and returns the first column of the first row.
+
+        Args:
+            query (str): SQL SELECT query
+            params (dict, optional): Query parameters
+
+        Returns:
+            The value, or None when there are no rows (or on failure)
+        """
+        await self.connect()
+        sql, args = _compile(query, params)
+        try:
+            return await self.pool.fetchval(sql, *args)
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error(f"Query execution failed: {e}")
+            return None
+
+    async def execute(self, query: str, params: dict = None) -> str:
+        """
+        Executes an INSERT, UPDATE, or DELETE query.
+
+        Args:
+            query (str): SQL command
+            params (dict, optional): Query parameters
+
+        Returns:
+            str: Command status tag, e.g. "INSERT 0 1"
+        """
+        await self.connect()
+        sql, args = _compile(query, params)
+        try:
+            status = await self.pool.execute(sql, *args)
+            logger.debug("Query executed successfully")
+            return status
+        except (asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+            logger.error(f"Query execution failed: {e}")
+            raise
+
+    async def listen(self, channel: str, callback) -> asyncpg.Connection:
+        """
+        Open a dedicated connection that LISTENs on channel.
+
+        callback(payload: str) runs for every NOTIFY. The connection is kept
+        out of the pool because a pooled one could be handed to a query;
+        the caller closes it.
+        """
+        kwargs = {k: v for k, v in self._connect_kwargs.items()
+                  if k not in ("min_size", "max_size", "init")}
+        conn = await asyncpg.connect(**kwargs)
+        await conn.add_listener(channel, lambda _conn, _pid, _channel, payload: callback(payload))
+        return conn
+
+    def get_pool_status(self):
+        """Returns current connection pool status for monitoring."""
+        if self.pool is None:
+            return {"size": 0, "idle": 0, "max_size": self._connect_kwargs["max_size"]}
+        return {
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "max_size": self.pool.get_max_size(),
+        }
+
+    async def close(self) -> None:
+        """Closes all connections in the pool."""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            logger.info("Async database pool closed")
+
+
+def is_data_error(error: Exception) -> bool:
+    """
+    The rows themselves are rejected (bad value, constraint), so a retry can
+    never succeed; connection and server errors are worth retrying.
+    """
+    if isinstance(error, (ValueError, TypeError)):
+        return True  # a parameter could not be encoded (asyncpg DataError is a ValueError)
+    return str(getattr(error, "sqlstate", "") or "")[:2] in ("22", "23")
+
+
+def as_date(value) -> Optional[date]:
+    """Coerce a YYYY-MM-DD string to a date; asyncpg will not cast text for DATE params."""
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
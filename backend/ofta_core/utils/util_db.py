@@ -179,6 +179,68 @@ class OftaDBConnector:
             if connection:
                 connection.close()
     
+    def fetch_all(self, query: str, params: dict = None, raise_errors: bool = False) -> list[dict]:
+        """
+        Executes a SELECT query and returns every row as a dict, without pandas.
+        
+        Args:
+            query (str): SQL SELECT query
+            params (dict, optional): Query parameters
+            raise_errors (bool): Re-raise failures instead of returning []
+        
+        Returns:
+            list[dict]: Rows keyed by column name (empty on failure)
+        """
+        try:
+            with self.engine.connect() as connection:
+                result = connection.execute(text(query), params or {})
+                return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            logger.error(f"Query execution failed: {e}")
+            if raise_errors:
+                raise
+            return []
+    
+    def fetch_one(self, query: str, params: dict = None) -> dict | None:
+        """
+        Executes a SELECT query and returns the first row as a dict.
+        
+        Args:
+            query (str): SQL SELECT query
+            params (dict, optional): Query parameters
+        
+        Returns:
+            dict | None: First row, or None when there are no rows (or on failure)
+        """
+        try:
+            with self.engine.connect() as connection:
+                row = connection.execute(text(query), params or {}).mappings().first()
+                return dict(row) if row is not None else None
+        except SQLAlchemyError as e:
+            logger.error(f"Query execution failed: {e}")
+            return None
+    
+    def fetch_scalar(self, query: str, params: dict = None, raise_errors: bool = False):
+        """
+        Executes a SELECT query and returns the first column of the first row.
+        
+        Args:
+            query (str): SQL SELECT query
+            params (dict, optional): Query parameters
+            raise_errors (bool): Re-raise failures instead of returning None
+        
+        Returns:
+            The value, or None when there are no rows (or on failure)
+        """
+        try:
+            with self.engine.connect() as connection:
+                return connection.execute(text(query), params or {}).scalar()
+        except SQLAlchemyError as e:
+            logger.error(f"Query execution failed: {e}")
+            if raise_errors:
+                raise
+            return None
+    
     def execute_query(self, query: str, params: dict = None) -> None:
         """
         Executes an INSERT, UPDATE, or DELETE query.
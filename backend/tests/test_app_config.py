@@ -0,0 +1,97 @@
+"""
+Unit tests for the in-memory app config and its change notifications.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from ofta_core.utils import app_config
+from ofta_core.utils.app_config import DEFAULTS, AppConfig
+
+
+class FakeDB:
+    def __init__(self, config=None, version=None):
+        self.row = {"config": config, "version": version}
+        self.reads = 0
+
+    async def fetch_one(self, sql, params=None):
+        self.reads += 1
+        return self.row
+
+
+class TestAppConfig:
+
+    def test_load_applies_defaults_and_encodes_once(self):
+        config = AppConfig()
+        db = FakeDB({"maintenance_mode": True}, datetime(2025, 3, 1, 12, 0))
+        asyncio.run(config.load(db))
+        body = json.loads(config.encoded.body)
+        assert body["maintenance_mode"] is True
+        assert body["feature_flags"] == DEFAULTS["feature_flags"]
+        assert body["game_modes"][-1] == "DAILY_CHALLENGE"
+        assert config.get("maintenance_mode") is True
+        assert config.encoded.last_modified == "2025-03-01T12:00:00"
+
+    def test_empty_table_serves_defaults(self):
+        config = AppConfig()
+        asyncio.run(config.load(FakeDB()))
+        assert config.ready
+        assert config.get("min_client_version") == DEFAULTS["min_client_version"]
+        assert config.encoded.last_modified is None
+
+    def test_failed_reload_keeps_current_values(self):
+        config = AppConfig()
+        db = FakeDB({"maintenance_mode": True}, datetime(2025, 3, 1))
+        asyncio.run(config.load(db))
+        db.row = None
+        with pytest.raises(RuntimeError):
+            asyncio.run(config.load(db))
+        assert config.get("maintenance_mode") is True
+
+    def test_failed_first_load_serves_defaults(self):
+        config = AppConfig()
+        db = FakeDB()
+        db.row = None
+        with pytest.raises(RuntimeError):
+            asyncio.run(config.load(db))
+        assert config.ready
+        assert json.loads(config.encoded.body)["maintenance_mode"] is False
+        assert config.encoded.last_modified is None
+
+    def test_invalid_values_are_not_served(self):
+        config = AppConfig()
+        db = FakeDB({"maintenance_mode": True}, datetime(2025, 3, 1))
+        asyncio.run(config.load(db))
+        db.row = {"config": {"feature_flags": ["leaderboard"]}, "version": datetime(2025, 3, 2)}
+        with pytest.raises(ValidationError):
+            asyncio.run(config.load(db))
+        assert config.get("feature_flags") == DEFAULTS["feature_flags"]
+        assert config.encoded.last_modified == "2025-03-01T00:00:00"
+
+    def test_notifications_coalesce_into_reloads(self, monkeypatch):
+        calls = []
+
+        async def fake_reload():
+            calls.append(1)
+            if len(calls) == 1:
+                # Edits landing while the first reload reads need exactly one more
+                app_config._on_notify("maintenance_mode")
+                app_config._on_notify("feature_flags")
+            await asyncio.sleep(0)
+
+        monkeypatch.setattr(app_config, "reload_app_config", fake_reload)
+        monkeypatch.setattr(app_config, "_reload_task", None)
+
+        async def run():
+            app_config._on_notify("question_pool_version")   # not a client key
+            assert app_config._reload_task is None
+            app_config._on_notify("feature_flags")
+            app_config._on_notify("feature_flags")           # before it started: same reload
+            await app_config._reload_task
+
+        asyncio.run(run())
+        assert len(calls) == 2
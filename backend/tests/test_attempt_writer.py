@@ -0,0 +1,214 @@
+"""
+Unit tests for the write-behind attempt writer.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from ofta_core.utils import attempt_writer
+from ofta_core.utils.attempt_writer import (
+    AttemptWriter, DuplicateAnswerError, SessionClosedError,
+)
+
+SESSION = "00000000-0000-0000-0000-000000000001"
+OTHER_SESSION = "00000000-0000-0000-0000-000000000009"
+
+
+class FakeDB:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    async def execute(self, sql, params=None):
+        if self.fail:
+            raise ConnectionError("db down")
+        self.batches.append(params)
+
+    def indexes(self, session_id=SESSION):
+        return sorted(
+            i for b in self.batches
+            for s, i in zip(b["session_id"], b["question_index"]) if s == session_id
+        )
+
+
+def _row(i, session_id=SESSION):
+    return {
+        "session_id": session_id,
+        "question_template_id": "00000000-0000-0000-0000-000000000002",
+        "question_index": i, "shown_at_tms": "2026-01-01T00:00:00",
+        "answered_at_tms": "2026-01-01T00:00:01", "response_time_ms": 900,
+        "user_answer": json.dumps({"age": 30}), "is_correct": True, "error_value": 0,
+        "hints_used": 0, "score_awarded": 100, "streak_at_time": i + 1,
+    }
+
+
+def _crash(writer):
+    """Stop a writer the way a killed process would: no flush, lock released."""
+    for task in writer._tasks:
+        task.cancel()
+    os.close(writer._lock_fd)
+
+
+class RejectingDB(FakeDB):
+    """Refuses any batch containing question_index 1, like a check constraint would."""
+
+    async def execute(self, sql, params=None):
+        if 1 in params["question_index"]:
+            error = RuntimeError("new row violates check constraint")
+            error.sqlstate = "23514"
+            raise error
+        self.batches.append(params)
+
+
+class TestAttemptWriter:
+
+    def test_drain_waits_for_one_journal_pass_not_an_empty_queue(self, tmp_path):
+        async def run():
+            db = FakeDB()
+            w = AttemptWriter(db, journal_dir=str(tmp_path), instance_id="a", flush_interval=60)
+            await w.start()
+            append = w._append
+
+            def slow_append(fd, payload):
+                time.sleep(0.01)
+                append(fd, payload)
+            w._append = slow_append
+
+            # Submits keep arriving while each fsync runs
+            stop = asyncio.Event()
+
+            async def steady_load():
+                i = 100
+                while not stop.is_set():
+                    asyncio.ensure_future(w.submit(_row(i, OTHER_SESSION)))
+                    i += 1
+                    await asyncio.sleep(0.002)
+
+            load = asyncio.create_task(steady_load())
+            first = asyncio.ensure_future(w.submit(_row(0)))
+            await asyncio.sleep(0)
+            await asyncio.wait_for(w.drain(), 2)
+            stop.set()
+            await load
+            await first
+            indexes = db.indexes()
+            await w.stop()
+            return indexes
+        assert asyncio.run(run()) == [0]
+
+    def test_drain_flushes_as_one_batch(self, tmp_path):
+        async def run():
+            db = FakeDB()
+            w = AttemptWriter(db, journal_dir=str(tmp_path), instance_id="a", flush_interval=60)
+            await w.start()
+            await asyncio.gather(*(w.submit(_row(i)) for i in range(5)))
+            await w.drain()
+            await w.stop()
+            return db
+        db = asyncio.run(run())
+        assert len(db.batches) == 1
+        assert db.batches[0]["question_index"] == [0, 1, 2, 3, 4]
+        assert os.listdir(tmp_path) == []
+
+    def test_failed_flush_keeps_journal_for_replay(self, tmp_path):
+        async def first():
+            w = AttemptWriter(FakeDB(fail=True), journal_dir=str(tmp_path), instance_id="a", flush_interval=60)
+            await w.start()
+            await w.submit(_row(0))
+            with pytest.raises(ConnectionError):
+                await w.drain()
+            _crash(w)
+
+        async def second():
+            db = FakeDB()
+            w = AttemptWriter(db, journal_dir=str(tmp_path), instance_id="b", flush_interval=60)
+            await w.start()
+            await w.stop()
+            return db
+
+        asyncio.run(first())
+        assert os.listdir(tmp_path / "a")
+        db = asyncio.run(second())
+        assert db.indexes() == [0]
+        assert os.listdir(tmp_path) == []
+
+    def test_drain_absorbs_rows_journaled_by_another_instance(self, tmp_path):
+        async def run():
+            # Instance "a" took the answers but has not flushed them yet
+            a = AttemptWriter(FakeDB(), journal_dir=str(tmp_path), instance_id="a", flush_interval=60)
+            await a.start()
+            for i in range(3):
+                await a.submit(_row(i))
+            await a.submit(_row(0, OTHER_SESSION))
+
+            # end_session lands on instance "b"
+            db_b = FakeDB()
+            b = AttemptWriter(db_b, journal_dir=str(tmp_path), instance_id="b", flush_interval=60)
+            await b.start()  # "a" holds its lock, so nothing is replayed
+            assert db_b.batches == []
+            pending = await b.pending_rows(SESSION)
+            await b.drain(SESSION)
+            await a.stop()
+            await b.stop()
+            return pending, db_b
+        pending, db_b = asyncio.run(run())
+        assert sorted(r["question_index"] for r in pending) == [0, 1, 2]
+        assert db_b.indexes() == [0, 1, 2]
+        assert db_b.indexes(OTHER_SESSION) == []
+
+    def test_rejected_row_is_quarantined_and_the_rest_flush(self, tmp_path):
+        async def run():
+            db = RejectingDB()
+            w = AttemptWriter(db, journal_dir=str(tmp_path), instance_id="a", flush_interval=60)
+            await w.start()
+            await asyncio.gather(*(w.submit(_row(i)) for i in range(3)))
+            await w.drain(SESSION)
+            # A later segment is not held up behind the bad row
+            await w.submit(_row(5))
+            await w.drain(SESSION)
+            await w.stop()
+            return db, w
+
+        db, w = asyncio.run(run())
+        assert db.indexes() == [0, 2, 5]
+        assert w.stats()["rows_quarantined"] == 1
+        with open(tmp_path / "quarantine-a.jsonl") as f:
+            record = json.loads(f.readline())
+        assert record["row"]["question_index"] == 1
+        assert "check constraint" in record["error"]
+
+    def test_closed_session_and_duplicate_index_are_refused(self, tmp_path):
+        async def run():
+            w = AttemptWriter(FakeDB(), journal_dir=str(tmp_path), instance_id="a", flush_interval=60)
+            await w.start()
+            await w.submit(_row(0))
+            with pytest.raises(DuplicateAnswerError):
+                await w.submit(_row(0))
+            w.close_session(SESSION)
+            with pytest.raises(SessionClosedError):
+                await w.submit(_row(1))
+            await w.stop()
+        asyncio.run(run())
+
+    def test_cloud_run_requires_shared_journal(self, monkeypatch):
+        monkeypatch.setenv("K_SERVICE", "ofta-api")
+        monkeypatch.delenv("ANSWER_JOURNAL_DIR", raising=False)
+        assert attempt_writer.journal_dir_problem()
+        monkeypatch.setenv("ANSWER_JOURNAL_DIR", "/mnt/journal")
+        monkeypatch.setattr(attempt_writer, "JOURNAL_DIR", "/mnt/journal")
+        assert attempt_writer.journal_dir_problem() is None
+        monkeypatch.delenv("K_SERVICE")
+        monkeypatch.setattr(attempt_writer, "JOURNAL_DIR", "/tmp/x")
+        assert attempt_writer.journal_dir_problem() is None
+
+    def test_cloud_run_requires_shared_session_state(self, monkeypatch):
+        from ofta_core.utils import session_state
+        monkeypatch.setenv("K_SERVICE", "ofta-api")
+        monkeypatch.setattr(session_state, "SESSION_STATE_BACKEND", "memory")
+        assert attempt_writer.session_state_problem()
+        monkeypatch.setattr(session_state, "SESSION_STATE_BACKEND", "postgres")
+        assert attempt_writer.session_state_problem() is None
@@ -0,0 +1,148 @@
+"""
+Unit tests for the in-process TTL/LRU cache.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+
+import pytest
+
+from ofta_core.utils import cache as cache_mod
+from ofta_core.utils.cache import LoadingCache, TTLCache
+
+
+class TestTTLCache:
+
+    def test_get_set_and_stats(self):
+        c = TTLCache(maxsize=10, ttl=60, name="t")
+        assert c.get("a") is None
+        c.set("a", 1)
+        assert c.get("a") == 1
+        stats = c.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_lru_eviction(self):
+        c = TTLCache(maxsize=2, ttl=60)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")          # a is now most recent
+        c.set("c", 3)       # evicts b
+        assert c.get("b") is None
+        assert c.get("a") == 1 and c.get("c") == 3
+        assert c.stats()["evictions"] == 1
+
+    def test_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+        c = TTLCache(maxsize=10, ttl=5)
+        c.set("a", 1)
+        c.set("b", 2, ttl=60)
+        now[0] += 10
+        assert c.get("a") is None
+        assert c.get("b") == 2
+        assert len(c) == 1
+
+    def test_invalidate_and_clear(self):
+        c = TTLCache(maxsize=10, ttl=60)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.invalidate("a")
+        c.invalidate("missing")
+        assert c.get("a") is None and c.get("b") == 2
+        c.clear()
+        assert len(c) == 0
+
+
+class TestLoadingCache:
+
+    def test_concurrent_misses_share_one_load(self):
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "v"
+
+        async def run():
+            c = LoadingCache(maxsize=10, ttl=60)
+            values = await asyncio.gather(*(c.get_or_load("k", loader) for _ in range(5)))
+            return values, await c.get_or_load("k", loader), c.stats()
+        values, again, stats = asyncio.run(run())
+        assert values == ["v"] * 5 and again == "v"
+        assert len(calls) == 1
+        assert (stats["misses"], stats["coalesced"], stats["hits"]) == (5, 4, 1)
+
+    def test_stale_value_served_while_refreshing(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+        version = [0]
+
+        async def loader():
+            version[0] += 1
+            return version[0]
+
+        async def run():
+            c = LoadingCache(maxsize=10, ttl=5, stale_ttl=30)
+            first = await c.get_or_load("k", loader)
+            now[0] += 10
+            stale = await c.get_or_load("k", loader)
+            while c.stats()["inflight"]:    # let the background refresh finish
+                await asyncio.sleep(0)
+            fresh = await c.get_or_load("k", loader)
+            now[0] += 100                   # past the stale window: a plain miss
+            reloaded = await c.get_or_load("k", loader)
+            return first, stale, fresh, reloaded, c.stats()
+        first, stale, fresh, reloaded, stats = asyncio.run(run())
+        assert (first, stale, fresh, reloaded) == (1, 1, 2, 3)
+        assert stats["stale_hits"] == 1
+
+    def test_failed_load_is_not_cached(self):
+        attempts = []
+
+        async def loader():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError("db down")
+            return "ok"
+
+        async def run():
+            c = LoadingCache(maxsize=10, ttl=60)
+            with pytest.raises(ConnectionError):
+                await c.get_or_load("k", loader)
+            return await c.get_or_load("k", loader), c.stats()
+        value, stats = asyncio.run(run())
+        assert value == "ok" and stats["load_errors"] == 1
+
+    def test_invalidate_discards_inflight_result(self):
+        async def run():
+            c = LoadingCache(maxsize=10, ttl=60)
+            started = asyncio.Event()
+
+            async def slow():
+                started.set()
+                await asyncio.sleep(0.01)
+                return "old"
+
+            pending = asyncio.ensure_future(c.get_or_load("k", slow))
+            await started.wait()
+            c.invalidate_where(lambda k: k == "k")
+            assert await pending == "old"      # the waiting caller still gets its answer
+
+            async def fresh():
+                return "new"
+            return await c.get_or_load("k", fresh)
+        assert asyncio.run(run()) == "new"
+
+    def test_lru_eviction_and_per_key_ttl(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+        c = LoadingCache(maxsize=2, ttl=5)
+        c.set("a", 1)
+        c.set("b", 2, ttl=60)
+        c.set("c", 3)
+        assert len(c) == 2 and c.stats()["evictions"] == 1
+
+        async def loader():
+            return "reloaded"
+        now[0] += 10
+        assert asyncio.run(c.get_or_load("b", loader)) == 2
+        assert asyncio.run(c.get_or_load("c", loader)) == "reloaded"
@@ -0,0 +1,74 @@
+"""
+Unit tests for the maintenance / feature-flag gate.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import json
+
+from ofta_core.utils import feature_gate
+from ofta_core.utils.app_config import AppConfig
+from ofta_core.utils.feature_gate import FeatureGateMiddleware, build_gate
+
+
+def _call(middleware, path):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+async def _app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+class TestFeatureGate:
+
+    def test_open_by_default(self):
+        gate = build_gate(False, {"leaderboard": True, "reverse_mode": True})
+        assert gate.check("/v1/leaderboards/all-time") is None
+        assert not gate.disabled_modes
+        assert build_gate(None, None).check("/v1/sessions/start") is None
+
+    def test_flags_block_prefixes_and_modes(self):
+        gate = build_gate(False, {"leaderboard": False, "reverse_mode": False, "unknown": False})
+        assert gate.check("/v1/leaderboards/daily/2025-01-01").status_code == 503
+        assert gate.check("/v1/packs/daily/2025-01-01") is None
+        assert gate.disabled_modes == {"REVERSE_DOB", "REVERSE_SIGN"}
+        body = json.loads(gate.check("/v1/leaderboards/all-time").body)
+        assert body["feature"] == "leaderboard"
+
+    def test_maintenance_spares_config_and_admin(self):
+        gate = build_gate(True, {})
+        assert gate.check("/v1/sessions/start").status_code == 503
+        assert gate.check("/v1/config") is None
+        assert gate.check("/admin/config") is None
+        assert gate.check("/health") is None
+
+    def test_middleware_short_circuits(self, monkeypatch):
+        config = AppConfig()
+        config.values = {"maintenance_mode": False, "feature_flags": {"daily_challenge": False}}
+        config.reloads = 1
+        monkeypatch.setattr(feature_gate, "get_app_config", lambda: config)
+        monkeypatch.setattr(feature_gate, "_gate_reloads", 0)
+        monkeypatch.setattr(feature_gate, "_gate", feature_gate.OPEN)
+
+        middleware = FeatureGateMiddleware(_app)
+        blocked = _call(middleware, "/v1/packs/daily/2025-01-01")
+        assert blocked[0]["status"] == 503
+        assert (b"retry-after", b"60") in blocked[0]["headers"]
+        assert _call(middleware, "/v1/leaderboards/all-time")[0]["status"] == 200
+        assert not feature_gate.mode_enabled("DAILY_CHALLENGE")
+
+        # A reload rebuilds the gate
+        config.values = {"maintenance_mode": True, "feature_flags": {}}
+        config.reloads = 2
+        assert _call(middleware, "/v1/leaderboards/all-time")[0]["status"] == 503
+        assert feature_gate.mode_enabled("DAILY_CHALLENGE")
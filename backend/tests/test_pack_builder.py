@@ -0,0 +1,76 @@
+"""
+Unit tests for the daily pack builder.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+from datetime import date, timedelta
+
+from ofta_core.utils import pack_builder
+from ofta_core.utils.cache import LoadingCache, TTLCache
+
+
+class FakeDB:
+    def __init__(self, built):
+        self.built = set(built)
+        self.calls = []
+
+    async def select(self, sql, params=None):
+        return [{"pack_date": d} for d in params["dates"] if d in self.built]
+
+    async def fetch_scalar(self, sql, params=None):
+        self.calls.append(params["pack_date"])
+        if params["pack_date"] in self.built:
+            return False
+        self.built.add(params["pack_date"])
+        return True
+
+
+class TestPackBuilder:
+
+    def test_builds_only_missing_dates(self):
+        start = date(2026, 1, 1)
+        db = FakeDB([start, start + timedelta(days=2)])
+        built = asyncio.run(pack_builder.ensure_packs(db, start, 3))
+        assert built == [start + timedelta(days=1), start + timedelta(days=3)]
+        assert db.calls == built
+
+    def test_second_pass_is_a_no_op(self):
+        start = date(2026, 1, 1)
+        db = FakeDB([])
+        asyncio.run(pack_builder.ensure_packs(db, start, 2))
+        db.calls.clear()
+        assert asyncio.run(pack_builder.ensure_packs(db, start, 2)) == []
+        assert db.calls == []
+
+    def test_buildable_horizon(self):
+        today = date.today()
+        assert pack_builder.buildable(today - timedelta(days=pack_builder.DAILY_PACK_DAYS_BACK))
+        assert not pack_builder.buildable(today - timedelta(days=pack_builder.DAILY_PACK_DAYS_BACK + 1))
+        assert pack_builder.buildable(today + timedelta(days=pack_builder.DAILY_PACK_DAYS_AHEAD))
+        assert not pack_builder.buildable(today + timedelta(days=pack_builder.DAILY_PACK_DAYS_AHEAD + 1))
+
+    def test_missing_old_pack_is_remembered_locally(self, monkeypatch):
+        reads = []
+
+        class NoPackDB:
+            async def fetch_one(self, sql, params=None):
+                reads.append(params["pack_date"])
+                return None
+
+            async def fetch_scalar(self, sql, params=None):
+                raise AssertionError("an old date must not be built")
+
+        from ofta_core.utils import util_async_db
+        from ofta_core.utils.shared_cache import MemoryCacheBackend
+        backend = MemoryCacheBackend()
+        monkeypatch.setattr(util_async_db, "get_async_db", lambda: NoPackDB())
+        monkeypatch.setattr(pack_builder, "daily_pack_cache",
+                            LoadingCache(maxsize=8, ttl=60, name="daily_packs", backend=backend))
+        monkeypatch.setattr(pack_builder, "missing_packs", TTLCache(maxsize=8, ttl=60))
+
+        old = date.today() - timedelta(days=pack_builder.DAILY_PACK_DAYS_BACK + 10)
+        assert asyncio.run(pack_builder.get_daily_pack(old)) is None
+        assert asyncio.run(pack_builder.get_daily_pack(old)) is None
+        assert reads == [old]
+        assert backend.invalidations_sent == 0
+        assert backend.stats()["size"] == 0
@@ -0,0 +1,69 @@
+"""
+Unit tests for batch question formatting.
+Tests are designed to work without a database connection.
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from ofta_core.utils.question_format import ZODIAC_SIGNS, as_days, ages_on, format_questions
+
+TODAY = date(2025, 6, 15)
+
+
+def _single(i, mode, **extra):
+    return {"id": f"t{i}", "mode": mode, "difficulty": 2, "person_id": f"p{i}",
+            "person_name": f"Person {i}", "person_image_url": None, "hints": None, **extra}
+
+
+class TestQuestionFormat:
+
+    def test_dates_in_any_form(self):
+        days = as_days([date(1990, 1, 2), datetime(1990, 1, 2, 13, 0),
+                        pd.Timestamp("1990-01-02"), "1990-01-02", None])
+        assert days[:4].tolist() == [date(1990, 1, 2)] * 4
+        assert np.isnat(days[4])
+
+    def test_ages_turn_on_the_birthday(self):
+        dobs = as_days(["1990-06-15", "1990-06-16", "2000-02-29", "1980-12-31"])
+        assert ages_on(dobs, TODAY).tolist() == [35, 34, 25, 44]
+        assert ages_on(as_days(["2000-02-29"]), date(2025, 2, 28)).tolist() == [24]
+
+    def test_age_options(self):
+        rows = [_single(0, "AGE_GUESS", date_of_birth=date(1990, 6, 15)),
+                _single(1, "AGE_GUESS", date_of_birth="2009-06-01")]   # 16: widens upwards
+        qs = format_questions("AGE_GUESS", rows, spreads=[1, 1], today=TODAY, rng=np.random.default_rng(0))
+        assert qs[0]["correct_answer"] == {"age": 35}
+        for q in qs:
+            age = q["correct_answer"]["age"]
+            assert len(set(q["options"])) == 4 and age in q["options"]
+            assert all(16 <= v <= 100 and abs(v - age) <= 3 for v in q["options"])
+            assert all(type(v) is int for v in q["options"])
+        assert sorted(qs[1]["options"]) == [16, 17, 18, 19]
+        assert qs[0]["hints"] == []
+
+    def test_sign_and_year_options(self):
+        rng = np.random.default_rng(1)
+        signs = format_questions("REVERSE_SIGN", [_single(i, "REVERSE_SIGN", star_sign=s)
+                                                  for i, s in enumerate(ZODIAC_SIGNS)], rng=rng)
+        for q, sign in zip(signs, ZODIAC_SIGNS):
+            assert q["correct_answer"] == {"sign": sign}
+            assert len(set(q["options"])) == 9 and sign in q["options"]
+        years = format_questions("REVERSE_DOB", [_single(0, "REVERSE_DOB", dob_year=1990.0)], rng=rng)
+        assert years[0]["correct_answer"] == {"year": 1990}
+        assert sorted(years[0]["options"]) == list(range(1987, 1996))
+
+    def test_who_older(self):
+        base = {"mode": "WHO_OLDER", "difficulty": 1, "person_id_a": "a", "person_id_b": "b",
+                "person_name_a": "A", "person_name_b": "B"}
+        rows = [
+            {**base, "id": "t0", "dob_a": date(1970, 1, 1), "dob_b": "1980-01-01"},
+            {**base, "id": "t1", "dob_a": date(1990, 1, 1), "dob_b": date(1980, 5, 5)},
+            {**base, "id": "t2", "dob_a": None, "dob_b": date(1980, 5, 5)},
+        ]
+        qs = format_questions("WHO_OLDER", rows)
+        assert qs[0]["correct_answer"] == {"choice": "A", "year_a": 1970, "year_b": 1980}
+        assert qs[1]["correct_answer"]["choice"] == "B"
+        assert "correct_answer" not in qs[2]
+        assert qs[2]["person_image_url_a"] is None
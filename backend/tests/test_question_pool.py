@@ -0,0 +1,79 @@
+"""
+Unit tests for the in-memory question pool index.
+Tests are designed to work without a database connection.
+"""
+from datetime import date
+
+import pytest
+
+from ofta_core.utils.question_pool import (
+    PersonRecord,
+    QuestionPool,
+    TemplateRecord,
+)
+
+
+def _person(pid: str, category: str = "Footballer") -> PersonRecord:
+    return PersonRecord(pid, f"Person {pid}", f"https://img/{pid}.jpg", category,
+                        "Leo", date(1990, 8, 1), ("hint",))
+
+
+def _pool(records) -> QuestionPool:
+    pool = QuestionPool()
+    for band, cats, record in records:
+        pool._buckets.setdefault((record.mode, band), {}).setdefault(cats, []).append(record)
+        pool._by_id[record.id] = record
+    return pool
+
+
+class TestSelection:
+
+    def setup_method(self):
+        records = []
+        for i in range(20):
+            cat = "Footballer" if i % 2 else "Actor"
+            records.append(("easy", frozenset((cat,)),
+                            TemplateRecord(f"t{i}", "AGE_GUESS", 1, _person(f"p{i}", cat))))
+        self.pool = _pool(records)
+
+    def test_sample_size(self):
+        assert len(self.pool.sample("AGE_GUESS", "easy", 10)) == 10
+
+    def test_sample_caps_at_pool_size(self):
+        assert len(self.pool.sample("AGE_GUESS", "easy", 50)) == 20
+
+    def test_sample_respects_categories(self):
+        picked = self.pool.sample("AGE_GUESS", "easy", 10, ["Actor"])
+        assert picked and all(t.person.primary_category == "Actor" for t in picked)
+
+    def test_unknown_band_is_empty(self):
+        assert self.pool.sample("AGE_GUESS", "hard", 10) == []
+
+    def test_by_ids_keeps_pack_order(self):
+        assert [t.id for t in self.pool.by_ids(["t7", "t2", "t11"])] == ["t7", "t2", "t11"]
+
+    def test_by_ids_missing_template(self):
+        assert self.pool.by_ids(["t1", "missing"]) is None
+
+    def test_row_shape(self):
+        row = self.pool.sample("AGE_GUESS", "easy", 1)[0].to_row()
+        assert row["dob_year"] == 1990
+        assert row["hints"] == ["hint"]
+
+
+class TestLoad:
+
+    def test_failed_read_leaves_pool_not_ready(self):
+        class FailingDB:
+            def fetch_scalar(self, query, params=None, raise_errors=False):
+                return "3"
+
+            def fetch_all(self, query, params=None, raise_errors=False):
+                assert raise_errors
+                raise RuntimeError("connection reset")
+
+        pool = QuestionPool()
+        with pytest.raises(RuntimeError):
+            pool.load(FailingDB())
+        assert not pool.ready
+        assert pool.version is None
@@ -0,0 +1,64 @@
+"""
+Unit tests for the SQL question sampler (pool-not-ready fallback).
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import random
+
+from ofta_core.utils.question_sampler import pick_ordinals, sample_templates
+
+
+class FakeDB:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.queries = []
+
+    async def select(self, sql, params=None):
+        self.queries.append((sql, params))
+        if "ofta_question_sample_bucket" in sql:
+            return self.buckets
+        if "seqs" in (params or {}):
+            return [{"id": f"t{seq}", "seq": seq} for seq in params["seqs"]]
+        return [{"id": "random"}]
+
+
+class TestQuestionSampler:
+
+    def test_ordinals_map_into_ranges_without_repeats(self):
+        ranges = [(0, 2), (10, 11), (20, 20)]
+        allowed = {0, 1, 2, 10, 11, 20}
+        rng = random.Random(7)
+        for _ in range(50):
+            picked = pick_ordinals(ranges, 4, rng)
+            assert len(picked) == len(set(picked)) == 4
+            assert set(picked) <= allowed
+        assert sorted(pick_ordinals(ranges, 10, rng)) == sorted(allowed)
+        assert pick_ordinals([], 3, rng) == []
+
+    def test_category_filter_keeps_subset_buckets(self):
+        db = FakeDB([
+            {"categories": ["Actor"], "seq_from": 0, "seq_to": 4},
+            {"categories": ["Actor", "Musician"], "seq_from": 5, "seq_to": 6},
+            {"categories": ["Footballer"], "seq_from": 7, "seq_to": 9},
+        ])
+        rows = asyncio.run(sample_templates(db, "WHO_OLDER", "easy", 10, ["Actor", "Musician"], random.Random(1)))
+        assert sorted(r["seq"] for r in rows) == [0, 1, 2, 3, 4, 5, 6]
+        sql, params = db.queries[-1]
+        assert "ORDER BY RANDOM()" not in sql
+        assert params["band"] == "easy"
+        # A renumbering between the two reads cannot leak other categories in
+        assert "s.categories <@" in sql
+        assert params["cats"] == ["Actor", "Musician"]
+
+    def test_no_matching_bucket_returns_nothing(self):
+        db = FakeDB([{"categories": ["Actor"], "seq_from": 0, "seq_to": 4}])
+        assert asyncio.run(sample_templates(db, "AGE_GUESS", "hard", 3, ["Musician"])) == []
+        assert len(db.queries) == 1
+
+    def test_unnumbered_band_falls_back_to_random_order(self):
+        db = FakeDB([])
+        rows = asyncio.run(sample_templates(db, "AGE_GUESS", "medium", 3, ["Actor"]))
+        assert rows == [{"id": "random"}]
+        sql, params = db.queries[-1]
+        assert "ORDER BY RANDOM()" in sql
+        assert params == {"mode": "AGE_GUESS", "band": "medium", "limit": 3, "cats": ["Actor"]}
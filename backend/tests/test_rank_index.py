@@ -0,0 +1,108 @@
+"""
+Unit tests for the lifetime-score rank index.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import random
+
+import pytest
+
+from ofta_core.utils import rank_index
+from ofta_core.utils.rank_index import RankIndex
+
+
+def _rank(scores, score):
+    """RANK() reference: 1 + players strictly above."""
+    return 1 + sum(1 for s in scores.values() if s > score)
+
+
+def _index(scores, load=4):
+    index = RankIndex()
+    index.LOAD = load
+    index.load(scores.items())
+    return index
+
+
+class TestRankIndex:
+
+    def test_rank_of_score_matches_rank(self):
+        scores = {f"u{i}": (i * 7) % 23 for i in range(50)}
+        index = _index(scores)
+        for score in range(-1, 25):
+            assert index.rank_of_score(score) == _rank(scores, score)
+
+    def test_ties_share_a_rank(self):
+        index = _index({"a": 10, "b": 10, "c": 5})
+        assert index.rank_of_user("a") == index.rank_of_user("b") == 1
+        assert index.rank_of_user("c") == 3
+        assert index.rank_of_user("nobody") is None
+
+    def test_page_ranks_and_order(self):
+        scores = {"a": 50, "b": 40, "c": 40, "d": 40, "e": 10, "f": 0}
+        index = _index(scores, load=2)
+        full = index.page(0, 10)
+        assert [s for _, _, s in full] == [50, 40, 40, 40, 10, 0]
+        assert [r for r, _, _ in full] == [1, 2, 2, 2, 5, 6]
+        # A page starting inside a run of ties keeps the run's rank
+        assert index.page(2, 2) == full[2:4]
+        assert index.page(6, 5) == []
+
+    def test_updates_keep_structure_consistent(self):
+        rng = random.Random(7)
+        scores = {}
+        index = _index(scores, load=3)
+        for _ in range(2000):
+            uid = f"u{rng.randrange(60)}"
+            if rng.random() < 0.1:
+                index.discard(uid)
+                scores.pop(uid, None)
+            else:
+                scores[uid] = scores.get(uid, 0) + rng.randrange(0, 40)
+                index.update(uid, scores[uid])
+        assert len(index) == len(scores)
+        page = index.page(0, len(scores))
+        assert [s for _, _, s in page] == sorted(scores.values(), reverse=True)
+        for rank, uid, score in page:
+            assert rank == _rank(scores, score)
+            assert index.rank_of_user(uid) == rank
+        offset = len(scores) // 2
+        assert index.page(offset, 7) == page[offset:offset + 7]
+
+    def test_ties_ordered_by_user_id_descending(self):
+        index = _index({"a": 40, "c": 40, "b": 40, "z": 10}, load=2)
+        assert [u for _, u, _ in index.page(0, 10)] == ["c", "b", "a", "z"]
+
+    def test_offset_after_continues_from_cursor(self):
+        scores = {f"u{i:02d}": i // 3 for i in range(30)}
+        index = _index(scores, load=4)
+        full = index.page(0, 30)
+        rank, user_id, score = full[11]
+        assert index.page(index.offset_after(score, user_id), 5) == full[12:17]
+        # A cursor whose entry has since moved still resumes after its key
+        index.update(user_id, 1000)
+        assert index.offset_after(score, user_id) == 12
+
+    def test_around_clamps_at_the_top(self):
+        scores = {f"u{i}": 100 - i for i in range(10)}
+        index = _index(scores, load=3)
+        offset, page = index.around("u5", 2)
+        assert offset == 3
+        assert [u for _, u, _ in page] == ["u3", "u4", "u5", "u6", "u7"]
+        offset, page = index.around("u1", 3)
+        assert offset == 0
+        assert [u for _, u, _ in page] == ["u0", "u1", "u2", "u3", "u4"]
+        assert index.around("missing", 3) == (0, [])
+
+
+class TestLoad:
+
+    def test_failed_read_keeps_index_not_ready(self, monkeypatch):
+        class FailingDB:
+            async def fetch_all(self, query, params=None, raise_errors=False):
+                assert raise_errors
+                raise ConnectionError("connection reset")
+
+        monkeypatch.setattr(rank_index, "_rank_index", RankIndex())
+        with pytest.raises(ConnectionError):
+            asyncio.run(rank_index._load_rank_index(FailingDB()))
+        assert not rank_index.get_rank_index().ready
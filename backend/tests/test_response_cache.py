@@ -0,0 +1,97 @@
+"""
+Unit tests for encoded responses and conditional GETs.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import json
+from datetime import datetime
+
+from pydantic import BaseModel
+from starlette.requests import Request
+
+from ofta_core.utils.response_cache import (
+    PERSONAL, CachePolicy, cached_response, encode, make_etag, not_modified, send,
+)
+
+
+def _request(if_none_match=None, if_modified_since=None):
+    headers = []
+    if if_none_match:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    if if_modified_since:
+        headers.append((b"if-modified-since", if_modified_since.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class Item(BaseModel):
+    name: str
+    count: int
+
+
+class TestResponseCache:
+
+    def test_encode_model_and_etag(self):
+        encoded = encode(Item(name="a", count=1))
+        assert json.loads(encoded.body) == {"name": "a", "count": 1}
+        assert encoded.etag == encode(Item(name="a", count=1)).etag
+        assert encoded.etag != encode(Item(name="a", count=2)).etag
+        assert encode({"x": 1}, etag=make_etag("v1")).etag == make_etag("v1")
+
+    def test_if_none_match(self):
+        etag = make_etag("v1")
+        assert not not_modified(_request(), etag)
+        assert not_modified(_request(etag), etag)
+        assert not_modified(_request(f'"other", W/{etag}'), etag)
+        assert not_modified(_request("*"), etag)
+        assert not not_modified(_request(make_etag("v2")), etag)
+
+    def test_send_304_without_body(self):
+        encoded = encode({"x": 1})
+        full = send(_request(), encoded)
+        assert full.status_code == 200 and full.body == b'{"x":1}'
+        assert full.headers["etag"] == encoded.etag
+        cached = send(_request(encoded.etag), encoded, headers={"X-Test": "1"})
+        assert cached.status_code == 304 and cached.body == b""
+        assert cached.headers["etag"] == encoded.etag
+        assert cached.headers["x-test"] == "1"
+
+    def test_cache_policies(self):
+        assert PERSONAL.cache_control() == "private, no-cache"
+        live = CachePolicy(max_age=15, public=True, stale_while_revalidate=30)
+        assert live.cache_control() == "public, max-age=15, stale-while-revalidate=30"
+        past = CachePolicy(max_age=31536000, public=True, immutable=True)
+        response = send(_request(), encode({"x": 1}), past)
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        # The same body for every caller: one shared copy, whatever the token
+        assert "vary" not in response.headers
+        board = CachePolicy(max_age=15, public=True, vary="Authorization")
+        assert send(_request(), encode({"x": 1}), board).headers["vary"] == "Authorization"
+        assert send(_request(), encode({"x": 1})).headers["cache-control"] == "private, no-cache"
+
+    def test_if_modified_since(self):
+        encoded = encode({"x": 1}, last_modified=datetime(2025, 3, 1, 12, 0, 0, 500000))
+        full = send(_request(), encoded)
+        assert full.headers["last-modified"] == "Sat, 01 Mar 2025 12:00:00 GMT"
+        assert send(_request(if_modified_since="Sat, 01 Mar 2025 12:00:00 GMT"), encoded).status_code == 304
+        assert send(_request(if_modified_since="Sat, 01 Mar 2025 11:59:59 GMT"), encoded).status_code == 200
+        assert send(_request(if_modified_since="not a date"), encoded).status_code == 200
+        # If-None-Match wins when both are sent
+        both = _request(if_none_match=make_etag("other"), if_modified_since="Sun, 02 Mar 2025 00:00:00 GMT")
+        assert send(both, encoded).status_code == 200
+        # Without a known version there is nothing to compare against
+        assert send(_request(if_modified_since="Sun, 02 Mar 2025 00:00:00 GMT"), encode({"x": 1})).status_code == 200
+
+    def test_cached_response_builds_once(self):
+        calls = []
+
+        async def build():
+            calls.append(1)
+            return encode({"x": len(calls)})
+
+        async def run():
+            first = await cached_response(("test", "k"), build)
+            second = await cached_response(("test", "k"), build)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first == second and len(calls) == 1
@@ -262,3 +262,39 @@ class TestReverseDOBScoring:
         is_correct = 1991 == 1990
         score = 50 if is_correct else 0
         assert score == 0
+
+
+class TestScoreAnswer:
+    """ofta_core.utils.scoring.score_answer, shared by both submit paths."""
+
+    TODAY = date(2026, 6, 15)
+
+    def _score(self, mode, key, answer, hints=0, rt=1000, streak=0):
+        from ofta_core.utils.scoring import score_answer
+        return score_answer(mode, key, answer, hints, rt, streak, today=self.TODAY)
+
+    def test_age_guess_from_iso_key(self):
+        r = self._score("AGE_GUESS", {"dob": "1990-06-16", "star_sign": None}, {"age": 35})
+        assert r.correct_answer == {"age": 35}
+        assert r.is_correct and r.score_awarded == 100 and r.error_value == 0
+
+    def test_who_older(self):
+        key = {"dob_a": "1980-01-01", "dob_b": "1990-01-01"}
+        r = self._score("WHO_OLDER", key, {"choice": "A"})
+        assert r.is_correct and r.correct_answer == {"choice": "A", "year_a": 1980, "year_b": 1990}
+
+    def test_fast_answer_is_voided_and_breaks_streak(self):
+        r = self._score("REVERSE_SIGN", {"dob": None, "star_sign": "Leo"}, {"sign": "Leo"}, rt=150, streak=4)
+        assert not r.is_correct and r.score_awarded == 0
+        assert r.streak_after == 0
+
+    def test_streak_bonus_applies_after_increment(self):
+        r = self._score("REVERSE_DOB", {"dob": "1975-03-02", "star_sign": None}, {"year": 1975}, streak=4)
+        assert r.streak_at_time == 5 and r.streak_bonus == 1.5
+        assert r.score_awarded == 75 and r.streak_after == 5
+
+    def test_answer_key_from_row_is_json_safe(self):
+        import json
+        from ofta_core.utils.scoring import answer_key_from_row
+        key = answer_key_from_row("WHO_OLDER", {"dob_a": date(1980, 1, 1), "dob_b": datetime(1990, 1, 1)})
+        assert json.loads(json.dumps(key)) == {"dob_a": "1980-01-01", "dob_b": "1990-01-01"}
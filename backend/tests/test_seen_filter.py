@@ -0,0 +1,111 @@
+"""
+Unit tests for the per-user recently-seen filter.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import random
+
+from ofta_core.utils import seen_filter
+from ofta_core.utils.seen_filter import SeenFilter, SeenStore, prefer_unseen
+
+
+class FakeDB:
+    def __init__(self, row=None, fail_writes=False):
+        self.row = row
+        self.fail_writes = fail_writes
+        self.upserts = []
+
+    async def fetch_one(self, sql, params=None):
+        return self.row
+
+    async def execute(self, sql, params=None):
+        if self.fail_writes:
+            raise RuntimeError("db down")
+        self.upserts.append(params)
+        return "INSERT 0 1"
+
+
+_EMPTY_ROW = {"bits": None, "current_count": None, "current_bits": None, "previous_bits": None}
+
+
+class TestSeenFilter:
+
+    def test_membership_and_rotation(self, monkeypatch):
+        monkeypatch.setattr(seen_filter, "GENERATION_SIZE", 10)
+        seen = SeenFilter()
+        ids = [f"t{i}" for i in range(25)]
+        seen.add(ids[:10])
+        assert all(t in seen for t in ids[:10])
+        assert sum(t in seen for t in ids[10:]) <= 1
+
+        # Ten more rotate the first ten into the previous generation
+        seen.add(ids[10:20])
+        assert all(t in seen for t in ids[:20])
+        # Another rotation forgets them
+        seen.add(ids[20:25] + [f"u{i}" for i in range(5)])
+        assert sum(t in seen for t in ids[:10]) <= 1
+        assert all(t in seen for t in ids[10:25])
+
+    def test_prefer_unseen_tops_up_with_seen(self):
+        seen = {"a", "c"}
+        assert prefer_unseen(["a", "b", "c", "d", "e"], 2, seen) == ["b", "d"]
+        assert prefer_unseen(["a", "b", "c"], 3, seen) == ["b", "a", "c"]
+        assert prefer_unseen(["a", "b", "c"], 2, None) == ["a", "b"]
+
+    def test_pool_sample_skips_seen_templates(self):
+        from ofta_core.utils.question_pool import QuestionPool, TemplateRecord
+        pool = QuestionPool()
+        records = [TemplateRecord(f"t{i}", "AGE_GUESS", 1, None) for i in range(40)]
+        pool._buckets = {("AGE_GUESS", "easy"): {frozenset({"Actor"}): records}}
+        seen = SeenFilter()
+        seen.add([f"t{i}" for i in range(30)])
+        picked = pool.sample("AGE_GUESS", "easy", 5, rng=random.Random(3), seen=seen)
+        assert len(picked) == 5
+        assert all(int(t.id[1:]) >= 30 for t in picked)
+
+
+class TestSeenStore:
+
+    def test_load_record_flush(self):
+        db = FakeDB(_EMPTY_ROW)
+        store = SeenStore(db)
+
+        async def run():
+            seen = await store.get("u1")
+            store.record("u1", ["t1", "t2"])
+            assert "t1" in seen
+            assert await store.flush()
+
+        asyncio.run(run())
+        params = db.upserts[0]
+        assert params["user_id"] == ["u1"]
+        assert params["current_count"] == [2]
+
+        # The stored bytes load back into an equal filter
+        db.row = {"bits": seen_filter.FILTER_BITS, "current_count": 2,
+                  "current_bits": params["current_bits"][0], "previous_bits": params["previous_bits"][0]}
+        loaded = asyncio.run(SeenStore(db).get("u1"))
+        assert "t1" in loaded and "t2" in loaded
+
+    def test_failed_load_is_not_recorded(self):
+        db = FakeDB(None)
+        store = SeenStore(db)
+        assert asyncio.run(store.get("u1")) is None
+        store.record("u1", ["t1"])
+        assert store.stats()["dirty"] == 0
+        assert store.load_failures == 1
+
+    def test_failed_flush_keeps_filters_dirty(self):
+        db = FakeDB(_EMPTY_ROW, fail_writes=True)
+        store = SeenStore(db, maxsize=1)
+
+        async def run():
+            await store.get("u1")
+            store.record("u1", ["t1"])
+            await store.get("u2")          # evicts u1 from the cache
+            store.record("u2", ["t2"])
+            assert not await store.flush()
+
+        asyncio.run(run())
+        assert store.stats()["dirty"] == 2
+        assert "t1" in asyncio.run(store.get("u1"))
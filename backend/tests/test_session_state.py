@@ -0,0 +1,76 @@
+"""
+Unit tests for the live session-state store.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+
+from ofta_core.utils.session_state import MemorySessionStore, SessionState
+
+
+def _state():
+    return SessionState(
+        session_id="s1", user_id="u1", mode="REVERSE_SIGN",
+        questions=["t0", "t1", "t2"],
+        answer_keys={t: {"dob": None, "star_sign": "Leo"} for t in ("t0", "t1", "t2")},
+    )
+
+
+class TestSessionState:
+
+    def test_issued_template_by_index(self):
+        state = _state()
+        assert state.issued_template(1) == "t1"
+        assert state.issued_template(3) is None
+        assert state.issued_template(-1) is None
+
+    def test_dict_round_trip_keeps_int_indexes(self):
+        state = _state()
+        state.answered = {0: True, 2: False}
+        state.current_streak = 1
+        data = state.to_dict()
+        assert data["answered"] == {"0": True, "2": False}
+        assert SessionState.from_dict(data) == state
+
+    def test_from_dict_defaults_missing_streak(self):
+        data = _state().to_dict()
+        del data["current_streak"]
+        assert SessionState.from_dict(data).current_streak == 0
+
+
+class TestMemorySessionStore:
+
+    def test_record_answer_once_per_index(self):
+        async def run():
+            store = MemorySessionStore(maxsize=10, ttl=60)
+            await store.put(_state())
+            await store.record_answer("s1", 0, True, 50, 1)
+            await store.record_answer("s1", 0, True, 50, 2)
+            await store.record_answer("s1", 1, False, 0, 0)
+            return await store.get("s1")
+        state = asyncio.run(run())
+        assert state.answered == {0: True, 1: False}
+        assert state.score == 50
+        assert state.current_streak == 0
+
+    def test_record_answer_takes_streak_from_the_session_row(self):
+        async def run():
+            store = MemorySessionStore(maxsize=10, ttl=60)
+            await store.put(_state())
+            streaks = []
+            # Answers recorded elsewhere put the row's streak ahead of this copy
+            for index, (is_correct, streak_after) in enumerate([(True, 1), (True, 4), (False, 0)]):
+                await store.record_answer("s1", index, is_correct, 10, streak_after)
+                streaks.append((await store.get("s1")).current_streak)
+            return streaks
+        assert asyncio.run(run()) == [1, 4, 0]
+
+    def test_close_and_delete(self):
+        async def run():
+            store = MemorySessionStore(maxsize=10, ttl=60)
+            await store.put(_state())
+            await store.close("s1")
+            closed = (await store.get("s1")).closed
+            await store.delete("s1")
+            return closed, await store.get("s1")
+        closed, gone = asyncio.run(run())
+        assert closed is True and gone is None
@@ -0,0 +1,127 @@
+"""
+Unit tests for recording answers from the sessions router.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+from functools import partial
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from ofta_core.api import sessions
+from ofta_core.api.sessions import SubmitAnswerRequest, _record_attempt
+from ofta_core.utils.scoring import score_answer
+from ofta_core.utils.session_state import MemorySessionStore, SessionState
+from ofta_core.utils.user_identity import get_current_user_id
+
+KEY = {"dob": None, "star_sign": "Leo"}
+
+
+class FakeSessionDB:
+    """The session row as _INSERT_ATTEMPT_SQL sees it."""
+
+    def __init__(self, current_streak=0, ended=False):
+        self.current_streak = current_streak
+        self.ended = ended
+        self.answered = set()
+        self.inserts = []
+
+    async def fetch_one(self, sql, params=None):
+        if self.ended:
+            return {"current_streak": None, "recorded": False}
+        streak = self.current_streak
+        if params["streak_before"] != streak or params["question_index"] in self.answered:
+            return {"current_streak": streak, "recorded": False}
+        self.answered.add(params["question_index"])
+        self.inserts.append(params)
+        self.current_streak = params["streak_at_time"] if params["is_correct"] else 0
+        return {"current_streak": streak, "recorded": True}
+
+
+def _record(db, streak_before, index=0):
+    request = SubmitAnswerRequest(question_template_id="t1", question_index=index,
+                                  user_answer={"sign": "Leo"}, response_time_ms=2000)
+    score = partial(score_answer, "REVERSE_SIGN", KEY, request.user_answer, 0, 2000)
+    return asyncio.run(_record_attempt(db, None, "s1", request, score, streak_before))
+
+
+class TestRecordAttempt:
+
+    def test_streak_comes_from_the_session_row(self):
+        # Session state on this worker is behind: four correct answers landed elsewhere
+        db = FakeSessionDB(current_streak=4)
+        scored = _record(db, streak_before=0)
+        assert scored.streak_at_time == 5
+        assert scored.score_awarded == 75
+        assert db.inserts[0]["streak_at_time"] == 5
+
+    def test_ended_session_is_refused(self):
+        with pytest.raises(HTTPException) as exc:
+            _record(FakeSessionDB(ended=True), streak_before=0)
+        assert exc.value.status_code == 409
+        assert exc.value.detail == "Session has already ended"
+
+    def test_repeat_index_is_refused(self):
+        db = FakeSessionDB()
+        _record(db, streak_before=0)
+        with pytest.raises(HTTPException) as exc:
+            _record(db, streak_before=1)
+        assert exc.value.detail == "Answer already submitted for this question"
+        assert len(db.inserts) == 1
+
+
+class FailingStateStore(MemorySessionStore):
+    """State reads work, state writes fail (e.g. the postgres backend is unreachable)."""
+
+    async def record_answer(self, *args):
+        raise ConnectionError("state write failed")
+
+
+class TestSubmitAnswerState:
+
+    def _submit(self, monkeypatch, store, db):
+        monkeypatch.setattr(sessions, "get_async_db", lambda: db)
+        monkeypatch.setattr(sessions, "get_attempt_writer", lambda: None)
+        monkeypatch.setattr(sessions, "get_session_store", lambda: store)
+        request = SubmitAnswerRequest(question_template_id="t1", question_index=0,
+                                      user_answer={"sign": "Leo"}, response_time_ms=2000)
+        return asyncio.run(sessions.submit_answer("s1", request, user_id="u1"))
+
+    def _state(self):
+        return SessionState(session_id="s1", user_id="u1", mode="REVERSE_SIGN",
+                            questions=["t1"], answer_keys={"t1": KEY})
+
+    def test_failed_state_write_still_returns_the_score(self, monkeypatch):
+        store = FailingStateStore(maxsize=10, ttl=60)
+        asyncio.run(store.put(self._state()))
+        db = FakeSessionDB()
+        response = self._submit(monkeypatch, store, db)
+        assert response.is_correct and response.score_awarded > 0
+        assert len(db.inserts) == 1
+        # The next answer takes the database path
+        assert asyncio.run(store.get("s1")) is None
+
+    def test_state_streak_follows_the_session_row(self, monkeypatch):
+        store = MemorySessionStore(maxsize=10, ttl=60)
+        asyncio.run(store.put(self._state()))
+        db = FakeSessionDB(current_streak=3)
+        self._submit(monkeypatch, store, db)
+        assert asyncio.run(store.get("s1")).current_streak == db.current_streak == 4
+
+
+class TestStartSession:
+
+    def test_malformed_pack_date_is_a_bad_request(self, monkeypatch):
+        app = FastAPI()
+        app.state.limiter = sessions.limiter
+        app.include_router(sessions.router, prefix="/v1/sessions")
+        app.dependency_overrides[get_current_user_id] = lambda: "u1"
+        monkeypatch.setattr(sessions, "mode_enabled", lambda mode: True)
+        monkeypatch.setattr(sessions, "get_async_db", lambda: pytest.fail("no query for a bad date"))
+
+        response = TestClient(app).post(
+            "/v1/sessions/start", json={"mode": "DAILY_CHALLENGE", "pack_date": "2026-13-01"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid date format. Use YYYY-MM-DD"
@@ -0,0 +1,118 @@
+"""
+Unit tests for the shared cache tier.
+Two LoadingCaches on one MemoryCacheBackend stand in for two workers.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import uuid
+
+from ofta_core.utils.cache import LoadingCache, key_str, matches_prefix
+from ofta_core.utils.shared_cache import MemoryCacheBackend
+
+
+def _workers(backend):
+    return (
+        LoadingCache(maxsize=10, ttl=60, name="lb", backend=backend),
+        LoadingCache(maxsize=10, ttl=60, name="lb", backend=backend),
+    )
+
+
+class TestSharedCache:
+
+    def test_key_prefixes(self):
+        assert key_str(("daily", "2025-01-01", 50, 0, None)) == "daily|2025-01-01|50|0|None"
+        assert matches_prefix("daily|2025-01-01|50|0|None", "daily|2025-01-01")
+        assert matches_prefix("daily|2025-01-01", "daily|2025-01-01")
+        assert not matches_prefix("daily|2025-01-011|50", "daily|2025-01-01")
+
+    def test_second_worker_reads_the_shared_entry(self):
+        a, b = _workers(MemoryCacheBackend())
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return [{"user_id": uuid.UUID(int=1), "score": 5}], 1
+
+        async def run():
+            first = await a.get_or_load(("daily", "d1"), loader)
+            second = await b.get_or_load(("daily", "d1"), loader)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert len(calls) == 1
+        assert b.stats()["shared_hits"] == 1
+        # Both workers see the JSON round-tripped value
+        assert first == second == [[{"user_id": str(uuid.UUID(int=1)), "score": 5}], 1]
+
+    def test_invalidate_prefix_reaches_other_workers(self):
+        a, b = _workers(MemoryCacheBackend())
+        version = {"n": 0}
+
+        async def loader():
+            version["n"] += 1
+            return version["n"]
+
+        async def run():
+            await a.get_or_load(("daily", "d1", 10), loader)
+            await b.get_or_load(("daily", "d1", 10), loader)
+            await b.get_or_load(("daily", "d2", 10), loader)
+            await a.invalidate_prefix("daily", "d1")
+            assert len(b) == 1
+            return (await b.get_or_load(("daily", "d1", 10), loader),
+                    await a.get_or_load(("daily", "d1", 10), loader))
+
+        assert asyncio.run(run()) == (3, 3)
+
+    def test_other_namespaces_untouched(self):
+        backend = MemoryCacheBackend()
+        lb = LoadingCache(maxsize=10, ttl=60, name="lb", backend=backend)
+        packs = LoadingCache(maxsize=10, ttl=60, name="packs", backend=backend)
+
+        async def loader():
+            return 1
+
+        async def run():
+            await lb.get_or_load("d1", loader)
+            await packs.get_or_load("d1", loader)
+            await lb.invalidate_prefix("d1")
+
+        asyncio.run(run())
+        assert len(lb) == 0 and len(packs) == 1
+        assert backend.stats()["size"] == 1
+
+    def test_load_overtaken_by_invalidation_is_not_written_back(self):
+        backend = MemoryCacheBackend()
+        a, b = _workers(backend)
+        release = asyncio.Event()
+
+        async def slow_loader():
+            await release.wait()
+            return "old"
+
+        async def fresh_loader():
+            return "new"
+
+        async def run():
+            load = asyncio.ensure_future(a.get_or_load(("daily", "d1"), slow_loader))
+            await asyncio.sleep(0)
+            await b.invalidate_prefix("daily", "d1")   # a write lands mid-load
+            release.set()
+            assert await load == "old"                 # the waiting caller still gets an answer
+            return await b.get_or_load(("daily", "d1"), fresh_loader)
+
+        assert asyncio.run(run()) == "new"
+        assert a.stats()["stale_loads"] == 1
+        assert len(a) == 0
+
+    def test_ban_reaches_cached_identities_on_every_worker(self):
+        from ofta_core.utils import user_identity
+        from ofta_core.utils.shared_cache import get_cache_backend
+
+        user_identity.remember_user("fb-1", "u-1")
+        # What another worker's forget_user() delivers here over NOTIFY
+        get_cache_backend()._deliver(user_identity.user_id_cache.name, "fb-1")
+        assert user_identity.user_id_cache.get("fb-1") is None
+
+        user_identity.remember_user("fb-2", "u-2")
+        asyncio.run(user_identity.forget_user("fb-2"))
+        assert user_identity.user_id_cache.get("fb-2") is None
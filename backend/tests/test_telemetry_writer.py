@@ -0,0 +1,183 @@
+"""
+Unit tests for the batched telemetry writer.
+Tests are designed to work without a database connection.
+"""
+import asyncio
+import json
+
+import pytest
+
+from ofta_core.api.telemetry import TelemetryEvent
+from ofta_core.utils import telemetry_writer
+from ofta_core.utils.telemetry_writer import TelemetryWriter, encode_event_data, insert_events
+
+
+class RejectedRow(Exception):
+    sqlstate = "22P05"   # untranslatable character, e.g. U+0000 in jsonb
+
+
+class FakeDB:
+    def __init__(self, fail=False, reject=()):
+        self.fail = fail
+        self.reject = set(reject)
+        self.inserts = 0
+        self.batches = []
+        self.labels = {}            # (kind, value) -> id
+        self.label_lookups = 0
+        self.partition_checks = 0
+
+    async def execute(self, sql, params=None):
+        self.inserts += 1
+        if self.fail:
+            raise ConnectionError("db down")
+        if any(d and d.get("i") in self.reject for d in params["event_data"]):
+            raise RejectedRow("invalid byte sequence")
+        self.batches.append(params)
+
+    async def select(self, sql, params=None):
+        self.label_lookups += 1
+        rows = []
+        for kind, value in zip(params["kind"], params["value"]):
+            label_id = self.labels.setdefault((kind, value), len(self.labels) + 1)
+            rows.append({"id": label_id, "kind": kind, "value": value})
+        return rows
+
+    async def fetch_scalar(self, sql, params=None):
+        self.partition_checks += 1
+        return 0
+
+    def event_types(self):
+        names = {i: v for (k, v), i in self.labels.items() if k == "event_type"}
+        return [names[i] for b in self.batches for i in b["event_type_id"]]
+
+
+@pytest.fixture(autouse=True)
+def _fresh_labels():
+    telemetry_writer._label_ids.clear()
+
+
+def _rows(n, start=0):
+    return [{"event_type": f"e{i}", "event_data": {"i": i}} for i in range(start, start + n)]
+
+
+class TestTelemetryWriter:
+
+    def test_offer_drops_past_capacity(self):
+        writer = TelemetryWriter(FakeDB(), max_queue=5, batch_size=10)
+        assert writer.offer(_rows(3)) == 3
+        assert writer.offer(_rows(4, start=3)) == 2
+        assert writer.offer(_rows(1)) == 0
+        assert writer.stats()["queued"] == 5
+        assert writer.accepted == 5 and writer.dropped == 3
+
+    def test_flush_writes_batches_in_order(self):
+        db = FakeDB()
+        writer = TelemetryWriter(db, max_queue=100, batch_size=4)
+        writer.offer(_rows(10))
+
+        async def run():
+            while writer.stats()["queued"]:
+                assert await writer.flush()
+
+        asyncio.run(run())
+        assert [len(b["event_type_id"]) for b in db.batches] == [4, 4, 2]
+        assert db.event_types() == [f"e{i}" for i in range(10)]
+        # Parallel arrays, one per column
+        assert db.batches[0]["event_data"][1] == {"i": 1}
+        assert db.batches[0]["user_id"] == [None] * 4
+        assert db.batches[0]["device_os_id"] == [None] * 4
+        assert writer.rows_flushed == 10
+
+    def test_labels_interned_once(self):
+        db = FakeDB()
+        rows = [
+            {"event_type": "tap", "device_os": "ios", "app_version": "1.2.0"},
+            {"event_type": "tap", "device_os": "android", "app_version": "1.2.0"},
+        ]
+
+        async def run():
+            await insert_events(db, rows)
+            await insert_events(db, rows)
+
+        asyncio.run(run())
+        assert db.label_lookups == 1
+        assert len(db.labels) == 4
+        first, second = db.batches
+        assert first == second
+        assert first["event_type_id"][0] == first["event_type_id"][1]
+        assert first["device_os_id"][0] != first["device_os_id"][1]
+
+    def test_event_data_encoded_once(self):
+        assert encode_event_data(None) is None
+        text = encode_event_data({"screen": "home", "n": [1, 2]})
+        assert isinstance(text, str)
+        assert json.loads(text) == {"screen": "home", "n": [1, 2]}
+
+    def test_failed_flush_requeues_at_head(self):
+        db = FakeDB(fail=True)
+        writer = TelemetryWriter(db, max_queue=5, batch_size=3)
+        writer.offer(_rows(3))
+
+        async def run():
+            assert not await writer.flush()
+            writer.offer(_rows(3, start=3))   # arrivals meanwhile take the room
+            db.fail = False
+            while writer.stats()["queued"]:
+                await writer.flush()
+
+        asyncio.run(run())
+        assert writer.flush_failures == 1
+        assert db.event_types() == ["e0", "e1", "e2", "e3", "e4"]
+        assert writer.dropped == 1
+
+    def test_flusher_runs_on_size_and_stop_drains(self):
+        db = FakeDB()
+        writer = TelemetryWriter(db, max_queue=100, batch_size=5, flush_interval=60)
+
+        async def run():
+            await writer.start()
+            writer.offer(_rows(5))
+            for _ in range(10):
+                await asyncio.sleep(0)
+            flushed_on_size = len(db.event_types())
+            writer.offer(_rows(2, start=5))
+            await writer.stop()
+            return flushed_on_size
+
+        assert asyncio.run(run()) == 5
+        assert db.event_types() == [f"e{i}" for i in range(7)]
+        assert writer.stats()["queued"] == 0
+        # Partitions are checked once per day, not per flush
+        assert db.partition_checks == 1
+
+    def test_rejected_rows_are_split_out_and_dropped(self):
+        db = FakeDB(reject={2, 5})
+        writer = TelemetryWriter(db, max_queue=100, batch_size=8)
+        writer.offer(_rows(8))
+        assert asyncio.run(writer.flush())
+        assert db.event_types() == ["e0", "e1", "e3", "e4", "e6", "e7"]
+        assert writer.rows_rejected == 2 and writer.dropped == 2
+        assert writer.rows_flushed == 6
+        assert writer.stats()["queued"] == 0
+
+    def test_batch_failing_repeatedly_is_dropped(self):
+        db = FakeDB(fail=True)
+        writer = TelemetryWriter(db, max_queue=10, batch_size=3, max_attempts=3)
+        writer.offer(_rows(5))
+
+        async def run():
+            for _ in range(3):
+                assert not await writer.flush()
+            db.fail = False
+            assert await writer.flush()
+
+        asyncio.run(run())
+        assert writer.dropped == 3
+        assert db.event_types() == ["e3", "e4"]
+
+    def test_nul_is_stripped_on_receipt(self):
+        event = TelemetryEvent(event_type="tap\x00", device_os="ios\x00",
+                               event_data={"k\x00": ["a\x00b", {"n": "\x00"}], "i": 1})
+        assert event.event_type == "tap" and event.device_os == "ios"
+        assert event.event_data == {"k": ["ab", {"n": ""}], "i": 1}
+        assert "\\u0000" not in encode_event_data(event.event_data)
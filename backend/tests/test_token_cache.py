@@ -0,0 +1,46 @@
+"""
+Unit tests for the verified Firebase ID-token cache.
+Tests are designed to work without Firebase credentials.
+"""
+import time
+
+from ofta_core.utils import firebase_auth
+
+
+class TestTokenCache:
+
+    def setup_method(self):
+        firebase_auth.token_cache.clear()
+        self.calls = 0
+
+    def _fake_verify(self, exp_in: float):
+        def verify(token):
+            self.calls += 1
+            return {"uid": f"u-{token}", "exp": time.time() + exp_in}
+        return verify
+
+    def test_repeat_token_skips_verification(self, monkeypatch):
+        monkeypatch.setattr(firebase_auth.auth, "verify_id_token", self._fake_verify(3600))
+        first = firebase_auth._verify_id_token_cached("tok")
+        second = firebase_auth._verify_id_token_cached("tok")
+        assert first == second and first["uid"] == "u-tok"
+        assert self.calls == 1
+        firebase_auth._verify_id_token_cached("other")
+        assert self.calls == 2
+
+    def test_expired_token_is_not_cached(self, monkeypatch):
+        monkeypatch.setattr(firebase_auth.auth, "verify_id_token", self._fake_verify(-5))
+        firebase_auth._verify_id_token_cached("tok")
+        firebase_auth._verify_id_token_cached("tok")
+        assert self.calls == 2
+
+    def test_entry_ttl_capped_at_exp(self, monkeypatch):
+        monkeypatch.setattr(firebase_auth.auth, "verify_id_token", self._fake_verify(30))
+        firebase_auth._verify_id_token_cached("tok")
+        (expires_at, _), = firebase_auth.token_cache._data.values()
+        assert expires_at - time.monotonic() <= 30
+
+    def test_raw_token_is_not_stored(self, monkeypatch):
+        monkeypatch.setattr(firebase_auth.auth, "verify_id_token", self._fake_verify(3600))
+        firebase_auth._verify_id_token_cached("secret-token")
+        assert all(isinstance(k, bytes) and k != b"secret-token" for k in firebase_auth.token_cache._data)
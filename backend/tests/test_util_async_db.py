@@ -0,0 +1,43 @@
+"""
+Unit tests for the async connector's parameter rewriting.
+Tests are designed to work without a database connection.
+"""
+from datetime import date
+
+from ofta_core.utils.util_async_db import _compile, as_date
+
+
+class TestCompile:
+
+    def test_named_params_become_positional(self):
+        sql, args = _compile(
+            "SELECT * FROM t WHERE a = :a AND b = :b",
+            {"a": 1, "b": "x"},
+        )
+        assert sql == "SELECT * FROM t WHERE a = $1 AND b = $2"
+        assert args == [1, "x"]
+
+    def test_repeated_param_reuses_position(self):
+        sql, args = _compile(
+            "SELECT :score + s.total, GREATEST(s.best, :score) WHERE id = :id",
+            {"score": 10, "id": "u"},
+        )
+        assert sql == "SELECT $1 + s.total, GREATEST(s.best, $1) WHERE id = $2"
+        assert args == [10, "u"]
+
+    def test_casts_are_left_alone(self):
+        sql, args = _compile(
+            "SELECT qt.id::text || :seed, CAST(:data AS jsonb), '{}'::jsonb",
+            {"seed": "2025-01-01", "data": {"a": 1}},
+        )
+        assert sql == "SELECT qt.id::text || $1, CAST($2 AS jsonb), '{}'::jsonb"
+        assert args == ["2025-01-01", {"a": 1}]
+
+    def test_unknown_names_and_no_params(self):
+        assert _compile("SELECT '10:30', :missing", {"x": 1}) == ("SELECT '10:30', :missing", [])
+        assert _compile("SELECT 1", None) == ("SELECT 1", [])
+
+    def test_as_date(self):
+        assert as_date("2025-03-04") == date(2025, 3, 4)
+        assert as_date(date(2025, 3, 4)) == date(2025, 3, 4)
+        assert as_date(None) is None
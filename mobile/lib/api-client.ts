@@ -177,9 +177,16 @@ class APIClient {
     // Leaderboard
     // ────────────────────────────────────────────────
 
-    async getDailyLeaderboard(date: string, limit = 100) {
+    async getDailyLeaderboard(date: string, limit = 100, cursor?: string) {
         const { data } = await this.client.get(`/v1/leaderboards/daily/${date}`, {
-            params: { limit },
+            params: { limit, cursor },
+        })
+        return data
+    }
+
+    async getDailyAroundMe(date: string, n = 5) {
+        const { data } = await this.client.get(`/v1/leaderboards/daily/${date}/around-me`, {
+            params: { n },
         })
         return data
     }
@@ -193,9 +200,16 @@ class APIClient {
     // Leaderboard (extended)
     // ────────────────────────────────────────────────
 
-    async getAllTimeLeaderboard(limit = 100) {
+    async getAllTimeLeaderboard(limit = 100, cursor?: string) {
         const { data } = await this.client.get('/v1/leaderboards/all-time', {
-            params: { limit },
+            params: { limit, cursor },
+        })
+        return data
+    }
+
+    async getAllTimeAroundMe(n = 5) {
+        const { data } = await this.client.get('/v1/leaderboards/all-time/around-me', {
+            params: { n },
         })
         return data
     }